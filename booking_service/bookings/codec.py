@@ -0,0 +1,378 @@
+"""
+Compact binary encoding for Kafka events, described by versioned schemas.
+
+The schemas live as JSON files in `event_schemas/`, which acts as a local,
+file-backed schema registry. Each file has a numeric id that is unique
+across every subject and version, a subject, a version, the event types it
+covers and an ordered list of fields. Every service ships the same files,
+so ids agree between producers and consumers.
+
+A binary message looks like this:
+
+    0x00 | flags | varint schema id | body
+
+The body holds the event type, the idempotency key and then the payload.
+Payload fields are written in schema order after a presence bitmap, with no
+field names. Arrays of records (batched flights, `userBookings`) are
+written column by column, which keeps like values together for compression
+and lets a whole UUID column be decoded in one pass. If the body is COMPRESS_MIN_BYTES or longer it is
+zlib-compressed, and `flags` records that. A field set to None is written as
+absent. A JSON message always starts with '{', so `decode_event` accepts both
+formats. Events with no schema, or whose payload does not fit the schema, are
+still sent as the JSON envelope.
+"""
+import json
+import pathlib
+import re
+import zlib
+
+from django.conf import settings
+
+MAGIC = b'\x00'
+FLAG_ZLIB = 0x01
+COMPRESS_MIN_BYTES = 512
+
+SCHEMA_DIR = pathlib.Path(__file__).resolve().parent / 'event_schemas'
+
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z')
+
+
+class EncodeError(ValueError):
+    """The payload does not match its schema."""
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class SchemaRegistry:
+    def __init__(self, path=SCHEMA_DIR):
+        self.path = pathlib.Path(path)
+        self._by_id = None
+        self._by_event_type = None
+        self._readers = {}
+
+    def _load(self):
+        by_id, latest = {}, {}
+        for schema_file in sorted(self.path.glob('*.json')):
+            schema = json.loads(schema_file.read_text())
+            if schema['id'] in by_id:
+                raise ValueError(f"Duplicate event schema id {schema['id']} in {schema_file.name}")
+            by_id[schema['id']] = schema
+            for event_type in schema['event_types']:
+                current = latest.get(event_type)
+                if current is None or schema['version'] > current['version']:
+                    latest[event_type] = schema
+        self._by_id, self._by_event_type = by_id, latest
+
+    def get(self, schema_id):
+        if self._by_id is None:
+            self._load()
+        try:
+            return self._by_id[schema_id]
+        except KeyError:
+            raise DecodeError(f"Unknown event schema id {schema_id}")
+
+    def reader(self, schema_id):
+        """Compiled payload reader for a schema id."""
+        reader = self._readers.get(schema_id)
+        if reader is None:
+            reader = self._readers[schema_id] = compile_reader(self.get(schema_id))
+        return reader
+
+    def for_event_type(self, event_type):
+        """Latest schema covering `event_type`, or None."""
+        if self._by_event_type is None:
+            self._load()
+        return self._by_event_type.get(event_type)
+
+
+registry = SchemaRegistry()
+
+
+# -- primitives --------------------------------------------------------------
+
+def _write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise DecodeError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_string(out, value):
+    if not isinstance(value, str):
+        raise EncodeError(f"Expected a string, got {type(value).__name__}")
+    raw = value.encode('utf-8')
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_string(data, pos):
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length].decode('utf-8'), pos + length
+
+
+def _write_uuid(out, value):
+    # Only canonical strings survive the round trip unchanged
+    if not isinstance(value, str) or not _UUID_RE.match(value):
+        raise EncodeError(f"Expected a canonical UUID string, got {value!r}")
+    out += bytes.fromhex(value.replace('-', ''))
+
+
+def _write_value(out, field_type, value):
+    if field_type == 'string':
+        _write_string(out, value)
+    elif field_type == 'uuid':
+        _write_uuid(out, value)
+    elif field_type == 'int':
+        if not isinstance(value, int) or isinstance(value, bool) or not -(1 << 63) <= value < (1 << 63):
+            raise EncodeError(f"Expected a 64-bit integer, got {value!r}")
+        # Zigzag, so small negative numbers stay short
+        _write_varint(out, (value << 1) ^ (value >> 63))
+    elif isinstance(field_type, dict) and 'items' in field_type:
+        if not isinstance(value, list):
+            raise EncodeError(f"Expected a list, got {type(value).__name__}")
+        _write_varint(out, len(value))
+        if isinstance(field_type['items'], dict) and 'fields' in field_type['items']:
+            _write_record_columns(out, field_type['items']['fields'], value)
+        else:
+            for item in value:
+                _write_value(out, field_type['items'], item)
+    elif isinstance(field_type, dict) and 'fields' in field_type:
+        _write_record(out, field_type['fields'], value)
+    else:
+        raise EncodeError(f"Unsupported schema type {field_type!r}")
+
+
+def _check_record(fields, record):
+    if not isinstance(record, dict):
+        raise EncodeError(f"Expected an object, got {type(record).__name__}")
+    unknown = record.keys() - {field['name'] for field in fields}
+    if unknown:
+        raise EncodeError(f"Fields not in schema: {', '.join(sorted(unknown))}")
+
+
+def _write_record(out, fields, record):
+    _check_record(fields, record)
+    bitmap = bytearray((len(fields) + 7) // 8)
+    present = []
+    for index, field in enumerate(fields):
+        if record.get(field['name']) is not None:
+            bitmap[index // 8] |= 1 << (index % 8)
+            present.append(field)
+        elif not field.get('optional'):
+            raise EncodeError(f"Missing required field {field['name']}")
+    out += bitmap
+    for field in present:
+        _write_value(out, field['type'], record[field['name']])
+
+
+def _write_record_columns(out, fields, records):
+    """
+    An array of records, one column per field: a presence bitmap over the
+    records (optional fields only), then the values of the records that have one.
+    """
+    for record in records:
+        _check_record(fields, record)
+    for field in fields:
+        values = [record.get(field['name']) for record in records]
+        if field.get('optional'):
+            bitmap = bytearray((len(values) + 7) // 8)
+            for index, value in enumerate(values):
+                if value is not None:
+                    bitmap[index // 8] |= 1 << (index % 8)
+            out += bitmap
+            values = [value for value in values if value is not None]
+        elif any(value is None for value in values):
+            raise EncodeError(f"Missing required field {field['name']}")
+        for value in values:
+            _write_value(out, field['type'], value)
+
+
+def _read_uuid(data, pos):
+    # Formatting the hex directly is several times faster than uuid.UUID(bytes=...)
+    h = data[pos:pos + 16].hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}', pos + 16
+
+
+def _read_int(data, pos):
+    n, pos = _read_varint(data, pos)
+    return (n >> 1) ^ -(n & 1), pos
+
+
+_PRIMITIVE_READERS = {'string': _read_string, 'uuid': _read_uuid, 'int': _read_int}
+
+
+def compile_reader(field_type):
+    """
+    A `read(data, pos) -> (value, pos)` function for a schema type, built once
+    per schema so decoding does not re-interpret the schema for every value.
+    """
+    if isinstance(field_type, str):
+        return _PRIMITIVE_READERS[field_type]
+    if 'items' in field_type and isinstance(field_type['items'], dict) and 'fields' in field_type['items']:
+        return _compile_record_columns_reader(field_type['items']['fields'])
+    if 'items' in field_type:
+        read_item = compile_reader(field_type['items'])
+
+        def read_array(data, pos):
+            count, pos = _read_varint(data, pos)
+            items = []
+            for _ in range(count):
+                item, pos = read_item(data, pos)
+                items.append(item)
+            return items, pos
+        return read_array
+
+    fields = [(index // 8, 1 << (index % 8), field['name'], compile_reader(field['type']))
+              for index, field in enumerate(field_type['fields'])]
+    bitmap_size = (len(fields) + 7) // 8
+
+    def read_record(data, pos):
+        bitmap = data[pos:pos + bitmap_size]
+        pos += bitmap_size
+        record = {}
+        for byte, bit, name, read in fields:
+            if bitmap[byte] & bit:
+                record[name], pos = read(data, pos)
+        return record, pos
+    return read_record
+
+
+# Where each of a UUID's 32 hex digits goes in its 36-character string form
+_UUID_DIGIT_OFFSETS = [digit + sum(digit >= dash for dash in (8, 12, 16, 20)) for digit in range(32)]
+# Below this many UUIDs, formatting them one by one is cheaper
+_UUID_COLUMN_MIN = 16
+
+
+def _read_uuid_column(data, pos, count):
+    end = pos + 16 * count
+    if count < _UUID_COLUMN_MIN:
+        return [_read_uuid(data, start)[0] for start in range(pos, end, 16)], end
+    # Lay the whole column out as 'uuid,uuid,...' with strided slice
+    # assignments, one per hex digit, instead of formatting each UUID
+    digits = data[pos:end].hex().encode('ascii')
+    out = bytearray(b'-' * (37 * count))
+    for digit, offset in enumerate(_UUID_DIGIT_OFFSETS):
+        out[offset::37] = digits[digit::32]
+    out[36::37] = b',' * count
+    return out[:-1].decode('ascii').split(','), end
+
+
+def _compile_column_reader(field_type):
+    """A `read(data, pos, count) -> (values, pos)` function for one column."""
+    if field_type == 'uuid':
+        return _read_uuid_column
+
+    read = compile_reader(field_type)
+
+    def read_column(data, pos, count):
+        values = []
+        for _ in range(count):
+            value, pos = read(data, pos)
+            values.append(value)
+        return values, pos
+    return read_column
+
+
+def _compile_record_columns_reader(fields):
+    columns = [(field['name'], field.get('optional', False), _compile_column_reader(field['type']))
+               for field in fields]
+
+    names = [name for name, _, _ in columns]
+    if not any(optional for _, optional, _ in columns):
+        def read_required_columns(data, pos):
+            count, pos = _read_varint(data, pos)
+            values = []
+            for _, _, read_column in columns:
+                column, pos = read_column(data, pos, count)
+                values.append(column)
+            return [dict(zip(names, row)) for row in zip(*values)], pos
+        return read_required_columns
+
+    def read_record_columns(data, pos):
+        count, pos = _read_varint(data, pos)
+        records = [{} for _ in range(count)]
+        bitmap_size = (count + 7) // 8
+        for name, optional, read_column in columns:
+            if optional:
+                bitmap = data[pos:pos + bitmap_size]
+                pos += bitmap_size
+                present = [i for i in range(count) if bitmap[i >> 3] & (1 << (i & 7))]
+                values, pos = read_column(data, pos, len(present))
+                for index, value in zip(present, values):
+                    records[index][name] = value
+            else:
+                values, pos = read_column(data, pos, count)
+                for record, value in zip(records, values):
+                    record[name] = value
+        return records, pos
+    return read_record_columns
+
+
+# -- envelopes ---------------------------------------------------------------
+
+def _json_envelope(event_type, idempotency_key, data):
+    return json.dumps({
+        'event_type': event_type,
+        'idempotency_key': str(idempotency_key),
+        'data': data,
+    }).encode('utf-8')
+
+
+def encode_event(event_type, idempotency_key, data):
+    """
+    Kafka message value for an event, binary when EVENT_ENCODING is 'binary'
+    and the event has a schema it fits, the JSON envelope otherwise.
+    """
+    schema = registry.for_event_type(event_type) if settings.EVENT_ENCODING == 'binary' else None
+    if schema is None:
+        return _json_envelope(event_type, idempotency_key, data)
+    body = bytearray()
+    try:
+        _write_string(body, event_type)
+        _write_uuid(body, str(idempotency_key))
+        _write_record(body, schema['fields'], data)
+    except EncodeError:
+        return _json_envelope(event_type, idempotency_key, data)
+
+    flags = 0
+    if len(body) >= COMPRESS_MIN_BYTES:
+        body = zlib.compress(body)
+        flags |= FLAG_ZLIB
+    header = bytearray(MAGIC)
+    header.append(flags)
+    _write_varint(header, schema['id'])
+    return bytes(header + body)
+
+
+def decode_event(value):
+    """The {'event_type', 'idempotency_key', 'data'} envelope of a message in either format."""
+    if value[:1] != MAGIC:
+        return json.loads(value.decode('utf-8'))
+    try:
+        flags = value[1]
+        schema_id, pos = _read_varint(value, 2)
+        read_payload = registry.reader(schema_id)
+        body = value[pos:]
+        if flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        event_type, pos = _read_string(body, 0)
+        idempotency_key, pos = _read_uuid(body, pos)
+        data, pos = read_payload(body, pos)
+    except (IndexError, zlib.error, UnicodeDecodeError) as e:
+        raise DecodeError(f"Malformed event: {e}")
+    return {'event_type': event_type, 'idempotency_key': idempotency_key, 'data': data}
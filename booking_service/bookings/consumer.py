@@ -1,18 +1,122 @@
-import json
 import threading
 import time
+import uuid
 from django.conf import settings
-from .producer import publish_event
+from .codec import decode_event
+from .keyed_consumer import consume
+from .outbox import publish_event
 from .models import Booking
 from opentelemetry import trace
 from opentelemetry.propagate import extract
 from confluent_kafka import Consumer, KafkaError
 
 
+BATCH_SUFFIX = '_batch'
+
+tracer = trace.get_tracer(__name__)
+
+
+def enriched_key(source_key, flight_id):
+    """
+    Idempotency key of the enriched event for one flight of the source event
+    `source_key`. It is the same on every redelivery, so the notification
+    service drops the repeat; None (a fresh key) if the source has no key.
+    """
+    if not source_key:
+        return None
+    return uuid.uuid5(uuid.UUID(str(source_key)), str(flight_id))
+
+
+def enrich_flight_event(event_type, payload, source_key=None):
+    """Republish a flight event to the notification service with the affected user bookings."""
+    flight_id = payload.get("flight_id")
+
+    # Find all active (non-cancelled) bookings for this flight
+    active_bookings = Booking.objects.filter(
+        flight_id=flight_id,
+        status='CONFIRMED'
+    )
+
+    # Extract user IDs and booking IDs from active bookings
+    booking_data = list(active_bookings.values('user_id', 'booking_id'))
+
+    print(f"Found {len(booking_data)} active bookings for flight {flight_id}")
+
+    if booking_data:
+        # Create enriched event data
+        enriched_payload = payload.copy()
+        enriched_payload['userBookings'] = [
+            {'user_id': str(item['user_id']), 'booking_id': str(item['booking_id'])}
+            for item in booking_data
+        ]
+
+        print(f"Enriched payload: {enriched_payload}")
+
+        # Publish enriched event to notification service
+        publish_event(event_type, enriched_payload, idempotency_key=enriched_key(source_key, flight_id))
+
+        print(f" [x] Enriched flight event {event_type} for {len(booking_data)} users")
+    else:
+        print(f" [x] No active bookings found for flight {flight_id}")
+
+
+def enrich_flight_event_batch(event_type, payload, source_key=None):
+    """
+    Expand a batch of flight events (published by bulk status changes) into
+    per-flight enriched events, looking up bookings for the whole batch at once.
+    """
+    flights = payload.get("flights", [])
+    bookings_by_flight = {}
+    for item in Booking.objects.filter(
+        flight_id__in=[flight["flight_id"] for flight in flights],
+        status='CONFIRMED'
+    ).values('flight_id', 'user_id', 'booking_id'):
+        bookings_by_flight.setdefault(str(item['flight_id']), []).append(
+            {'user_id': str(item['user_id']), 'booking_id': str(item['booking_id'])}
+        )
+
+    for flight in flights:
+        user_bookings = bookings_by_flight.get(str(flight["flight_id"]))
+        if user_bookings:
+            enriched_payload = flight.copy()
+            enriched_payload['userBookings'] = user_bookings
+            publish_event(
+                event_type, enriched_payload, idempotency_key=enriched_key(source_key, flight["flight_id"])
+            )
+    print(f" [x] Enriched {event_type} batch: {len(bookings_by_flight)} of {len(flights)} flights have bookings")
+
+
+def handle_flight_message(message):
+    """Decode one flight_events message and enrich it under its trace context."""
+    data = decode_event(message.value())
+    event_type = data.get("event_type")
+    idempotency_key = data.get("idempotency_key")
+    payload = data.get("data")
+
+    print(f"Booking Consumer received: {event_type} - {payload}")
+
+    headers = {k: (v.decode("utf-8") if v else "") for k, v in (message.headers() or [])}
+    context = extract(headers)
+
+    with tracer.start_as_current_span("kafka.consume", context=context, attributes={
+        "messaging.system": "kafka",
+        "messaging.destination": "flight_events",
+        "messaging.destination_kind": "topic",
+        "messaging.kafka.message_key": (message.key() or b"").decode("utf-8"),
+        "messaging.kafka.partition": message.partition(),
+        "messaging.message_id": idempotency_key,
+    }):
+        if event_type.endswith(BATCH_SUFFIX):
+            enrich_flight_event_batch(event_type[:-len(BATCH_SUFFIX)], payload, idempotency_key)
+        else:
+            enrich_flight_event(event_type, payload, idempotency_key)
+
+
 def start_flight_event_consumer():
     """
-    Starts a Kafka consumer for flight events in a separate thread.
-    Listens for flight events and enriches them with user IDs from active bookings.
+    Starts a Kafka consumer for flight events.
+    Listens for flight events and enriches them with user IDs from active bookings,
+    processing partitions in parallel while keeping per-flight order.
     """
     print("Starting flight event consumer (Resilient)")
     max_retries = 10
@@ -27,12 +131,8 @@ def start_flight_event_consumer():
                 "auto.offset.reset": "earliest",
             })
 
-            consumer.subscribe(["flight_events"])
-
             print("Booking Service Flight Consumer connected. Waiting for messages in flight_events")
 
-            tracer = trace.get_tracer(__name__)
-
             # Start a background thread to periodically update liveness file
             stop_event = threading.Event()
 
@@ -49,69 +149,7 @@ def start_flight_event_consumer():
             t.start()
 
             try:
-                while True:
-                    message = consumer.poll(1.0)
-                    if message is None:
-                        continue
-                    if message.error():
-                        print(f" [!] Kafka error: {message.error()}")
-                        continue
-
-                    try:
-                        data = json.loads(message.value().decode("utf-8"))
-                        event_type = data.get("event_type")
-                        idempotency_key = data.get("idempotency_key")
-                        payload = data.get("data")
-
-                        print(f"Booking Consumer received: {event_type} - {payload}")
-
-                        headers = {k: (v.decode("utf-8") if v else "") for k, v in (message.headers() or [])}
-                        context = extract(headers)
-
-                        with tracer.start_as_current_span("kafka.consume", context=context, attributes={
-                            "messaging.system": "kafka",
-                            "messaging.destination": "flight_events",
-                            "messaging.destination_kind": "topic",
-                            "messaging.kafka.message_key": event_type,
-                            "messaging.message_id": idempotency_key,
-                        }):
-                            flight_id = payload.get("flight_id")
-
-                            # Find all active (non-cancelled) bookings for this flight
-                            active_bookings = Booking.objects.filter(
-                                flight_id=flight_id,
-                                status='CONFIRMED'
-                            )
-
-                            # Extract user IDs and booking IDs from active bookings
-                            booking_data = list(active_bookings.values('user_id', 'booking_id'))
-
-                            print(f"Found {len(booking_data)} active bookings for flight {flight_id}")
-
-                            if booking_data:
-                                # Create enriched event data
-                                enriched_payload = payload.copy()
-                                enriched_payload['userBookings'] = [
-                                    {'user_id': str(item['user_id']), 'booking_id': str(item['booking_id'])}
-                                    for item in booking_data
-                                ]
-
-                                print(f"Enriched payload: {enriched_payload}")
-
-                                # Publish enriched event to notification service
-                                publish_event(event_type, enriched_payload)
-
-                                print(f" [x] Enriched flight event {event_type} for {len(booking_data)} users")
-                            else:
-                                print(f" [x] No active bookings found for flight {flight_id}")
-
-                        consumer.commit(message=message)
-
-                    except Exception as e:
-                        print(f" [!] Error processing flight event: {e}")
-                        # Commit offset to drop the problematic message
-                        consumer.commit(message=message)
-
+                consume(consumer, ["flight_events"], handle_flight_message, settings.KAFKA_CONSUMER_WORKERS)
             finally:
                 stop_event.set()
                 consumer.close()
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from prometheus_client import start_http_server
+
+from bookings.outbox import RelayError, create_producer, relay_batch, update_backlog
+
+
+class Command(BaseCommand):
+    help = 'Relay outbox events to Kafka in ordered batches (at-least-once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help='Expose Prometheus metrics on this port')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit; fails on the first failed batch')
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'])
+        producer = create_producer()
+        self.stdout.write(self.style.SUCCESS('Starting outbox relay...'))
+        while True:
+            try:
+                relayed = relay_batch(producer, batch_size=options['batch_size'])
+            except RelayError as e:
+                if options['once']:
+                    raise CommandError(f'Outbox relay failed: {e}')
+                self.stderr.write(f'Outbox relay failed, retrying: {e}')
+                time.sleep(options['interval'])
+                continue
+            if relayed == options['batch_size']:
+                continue
+            update_backlog()
+            if options['once']:
+                return
+            time.sleep(options['interval'])
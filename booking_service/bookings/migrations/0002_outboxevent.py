@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 17:55
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=100)),
+                ('event_type', models.CharField(max_length=100)),
+                ('idempotency_key', models.UUIDField(default=uuid.uuid4)),
+                ('payload', models.JSONField()),
+                ('headers', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='booking',
+            options={'ordering': ['-booking_date']},
+        ),
+    ]
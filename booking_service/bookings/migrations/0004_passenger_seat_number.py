@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_outboxevent_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='passenger',
+            name='seat_number',
+            field=models.CharField(blank=True, max_length=4, null=True),
+        ),
+    ]
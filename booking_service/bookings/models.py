@@ -28,6 +28,29 @@ class Passenger(models.Model):
     last_name = models.CharField(max_length=100)
     email = models.EmailField()
     passport_number = models.CharField(max_length=50, blank=True, null=True)
+    # Chosen seat, e.g. '12C', on flights with a seat map
+    seat_number = models.CharField(max_length=4, blank=True, null=True)
 
     def __str__(self):
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"
+
+class OutboxEvent(models.Model):
+    """
+    A domain event waiting to be relayed to Kafka (see bookings.outbox).
+
+    Written in the same transaction as the change it describes and deleted
+    once the broker has acknowledged it.
+    """
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=100)
+    # Kafka message key; events for the same entity share a key and a partition
+    key = models.CharField(max_length=100, blank=True, default='')
+    idempotency_key = models.UUIDField(default=uuid.uuid4)
+    payload = models.JSONField()
+    # Trace context captured when the event was recorded
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} ({self.idempotency_key})"
@@ -0,0 +1,121 @@
+"""
+Transactional outbox for booking domain events.
+
+`publish_event` records the event as an OutboxEvent row in the caller's
+transaction, so an event exists if and only if the change it describes was
+committed. The `relay_outbox` command drains the table to Kafka in id order,
+in batches, and deletes each batch only after every message in it has been
+acknowledged (at-least-once; consumers deduplicate on `idempotency_key`).
+
+Events are keyed by the booking they are about, or, for flight events
+enriched with bookings, by the flight, so all events for one entity land on
+the same partition and are consumed in order.
+"""
+import functools
+import logging
+import time
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+from opentelemetry.propagate import inject
+from prometheus_client import Counter, Gauge, Histogram
+
+from .codec import encode_event
+from .models import OutboxEvent
+from .producer import producer_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOPIC = 'booking_events'
+
+EVENTS_RELAYED = Counter('outbox_events_relayed_total', 'Outbox events acknowledged by Kafka', ['topic'])
+RELAY_FAILURES = Counter('outbox_relay_failures_total', 'Outbox batches that failed and will be retried')
+RELAY_BATCH_SECONDS = Histogram('outbox_relay_batch_seconds', 'Time to relay one outbox batch')
+RELAY_BATCH_SIZE = Histogram(
+    'outbox_relay_batch_size', 'Events sent per outbox batch', buckets=(1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+DELIVERY_SECONDS = Histogram(
+    'outbox_delivery_seconds', 'Time from an event being recorded to its acknowledgement by Kafka',
+)
+BACKLOG = Gauge('outbox_backlog', 'Outbox events waiting to be relayed')
+
+
+class RelayError(Exception):
+    pass
+
+
+def event_key(body):
+    return str(body.get('booking_id') or body.get('flight_id') or '')
+
+
+def publish_event(event_type, body, exchange=DEFAULT_TOPIC, key=None, idempotency_key=None):
+    """
+    Record an event for delivery once the current transaction commits, keyed
+    by `event_key(body)` unless a key is given. Events derived from another
+    event pass an `idempotency_key` that is the same every time it is handled.
+    """
+    headers = {}
+    inject(headers)
+    OutboxEvent.objects.create(
+        topic=exchange, event_type=event_type, key=event_key(body) if key is None else key,
+        payload=body, headers=headers, idempotency_key=idempotency_key or uuid.uuid4(),
+    )
+
+
+def create_producer():
+    from confluent_kafka import Producer
+    return Producer(producer_config())
+
+
+def encode(event):
+    """Kafka (value, key, headers) for an outbox row."""
+    value = encode_event(event.event_type, event.idempotency_key, event.payload)
+    headers = [(k, str(v).encode('utf-8')) for k, v in event.headers.items()]
+    # Events that are not about one entity fall back to their type as the key
+    return value, (event.key or event.event_type).encode('utf-8'), headers
+
+
+def relay_batch(producer, batch_size=500, timeout=30):
+    """
+    Send the oldest `batch_size` events and delete them once all are acknowledged.
+
+    Rows stay locked while the batch is in flight, so concurrent relays queue
+    behind each other instead of reordering events. Returns the number relayed;
+    raises RelayError (leaving the batch in place) if any delivery fails.
+    """
+    started = time.monotonic()
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update().order_by('id')[:batch_size])
+        if not events:
+            return 0
+        RELAY_BATCH_SIZE.observe(len(events))
+
+        failures = []
+
+        def delivered(created_at, err, msg):
+            if err is not None:
+                failures.append(err)
+            else:
+                DELIVERY_SECONDS.observe(max(0.0, (timezone.now() - created_at).total_seconds()))
+
+        for event in events:
+            value, key, headers = encode(event)
+            producer.produce(event.topic, value=value, key=key, headers=headers,
+                             on_delivery=functools.partial(delivered, event.created_at))
+            producer.poll(0)
+        pending = producer.flush(timeout)
+        if failures or pending:
+            RELAY_FAILURES.inc()
+            raise RelayError(f"{len(failures)} failed and {pending} unacknowledged of {len(events)} events")
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+
+    for event in events:
+        EVENTS_RELAYED.labels(topic=event.topic).inc()
+    RELAY_BATCH_SECONDS.observe(time.monotonic() - started)
+    return len(events)
+
+
+def update_backlog():
+    BACKLOG.set(OutboxEvent.objects.count())
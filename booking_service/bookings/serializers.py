@@ -4,10 +4,11 @@ from .models import Booking, Passenger
 class PassengerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Passenger
-        fields = ['first_name', 'last_name', 'email', 'passport_number']
+        fields = ['first_name', 'last_name', 'email', 'passport_number', 'seat_number']
         extra_kwargs = {
             'email': {'required': False},
-            'passport_number': {'required': False}
+            'passport_number': {'required': False},
+            'seat_number': {'required': False}
         }
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -20,10 +21,23 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = ['booking_id', 'flight_id', 'status', 'booking_date', 'passengers', 'passengers_list', 'passengers_details']
         read_only_fields = ['booking_id', 'status', 'booking_date', 'passengers_details']
 
+    def validate_passengers_list(self, value):
+        seat_numbers = [p['seat_number'].upper() for p in value if p.get('seat_number')]
+        if len(set(seat_numbers)) != len(seat_numbers):
+            raise serializers.ValidationError("Each passenger needs a different seat.")
+        if seat_numbers and len(seat_numbers) != len(value):
+            raise serializers.ValidationError("Choose a seat for every passenger or for none.")
+        for passenger in value:
+            if passenger.get('seat_number'):
+                passenger['seat_number'] = passenger['seat_number'].upper()
+        return value
+
     def create(self, validated_data):
         # Extract passengers data
         passengers_data = validated_data.pop('passengers_list', [])
         passengers_count = validated_data.pop('passengers', len(passengers_data) if passengers_data else 1)
+        # Seats assigned by the flight service when none were chosen, one per passenger
+        assigned_seats = iter(validated_data.pop('assigned_seats', ()))
         
         # user_id is passed manually in perform_create within the view
         # Correctly create booking without passing 'passengers' reverse relation
@@ -31,6 +45,8 @@ class BookingSerializer(serializers.ModelSerializer):
         
         if passengers_data:
             for passenger_data in passengers_data:
+                if not passenger_data.get('seat_number'):
+                    passenger_data['seat_number'] = next(assigned_seats, None)
                 Passenger.objects.create(booking=booking, **passenger_data)
         else:
             # Fallback to dummy passengers if no list provided (backward compatibility)
@@ -39,7 +55,8 @@ class BookingSerializer(serializers.ModelSerializer):
                     booking=booking,
                     first_name=f"Passenger{i+1}",
                     last_name="Doe",
-                    email=f"passenger{i+1}@example.com"
+                    email=f"passenger{i+1}@example.com",
+                    seat_number=next(assigned_seats, None),
                 )
             
         return booking
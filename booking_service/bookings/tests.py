@@ -1,14 +1,18 @@
 import uuid
 import datetime
-from django.test import TestCase
+import time
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from unittest.mock import patch, Mock
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from bookings.models import Booking, Passenger
+from bookings.models import Booking, OutboxEvent, Passenger
 from bookings.serializers import BookingSerializer, PassengerSerializer
+from bookings.consumer import enrich_flight_event, enrich_flight_event_batch
+from bookings.codec import decode_event, encode_event
+from bookings.keyed_consumer import KeyedWorkerPool, OffsetTracker
 from django.conf import settings
 
 
@@ -92,7 +96,7 @@ class BookingAPITests(APITestCase):
 	@patch("bookings.views.publish_event")
 	@patch("bookings.views.requests.post")
 	def test_create_booking_success(self, mock_post, mock_publish):
-		mock_post.return_value = Mock(status_code=200, text="OK")
+		mock_post.return_value = Mock(status_code=200, text="OK", json=lambda: {"remaining_seats": 8})
 		data = {
 			"flight_id": str(self.flight_id),
 			"passengers": 2,
@@ -106,13 +110,64 @@ class BookingAPITests(APITestCase):
 		self.assertEqual(Booking.objects.count(), 1)
 		booking = Booking.objects.first()
 		self.assertEqual(booking.user_id, self.user_id)
-		# Two seat reservations were attempted
-		self.assertEqual(mock_post.call_count, 2)
-		expected_url = f"{settings.FLIGHT_SERVICE_URL}/api/v1/flights/{self.flight_id}/reserve_seat/"
-		called_urls = [call.args[0] for call in mock_post.call_args_list]
-		self.assertTrue(all(url == expected_url for url in called_urls))
+		# Both seats were reserved in a single call
+		self.assertEqual(mock_post.call_count, 1)
+		expected_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{self.flight_id}/reserve_seats/"
+		self.assertEqual(mock_post.call_args.args[0], expected_url)
+		self.assertEqual(mock_post.call_args.kwargs["json"], {"seats": 2})
 		mock_publish.assert_called_once()
 
+	@patch("bookings.views.requests.post")
+	def test_create_booking_records_outbox_event(self, mock_post):
+		mock_post.return_value = Mock(status_code=200, text="OK", json=lambda: {"remaining_seats": 8})
+		data = {"flight_id": str(self.flight_id), "passengers": 1}
+		res = self.client.post(self.list_url, data, format="json", **self._headers(role="CLIENT"))
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		event = OutboxEvent.objects.get()
+		self.assertEqual((event.topic, event.event_type), ("booking_events", "booking_created"))
+		self.assertEqual(event.key, str(Booking.objects.get().booking_id))
+		self.assertEqual(event.payload["booking_id"], str(Booking.objects.get().booking_id))
+
+	@patch("bookings.views.requests.post")
+	def test_create_booking_claims_chosen_seats(self, mock_post):
+		mock_post.return_value = Mock(status_code=200, text="OK", json=lambda: {"remaining_seats": 8})
+		data = {
+			"flight_id": str(self.flight_id),
+			"passengers_list": [
+				{"first_name": "Ada", "last_name": "L", "seat_number": "12a"},
+				{"first_name": "Alan", "last_name": "T", "seat_number": "12B"},
+			],
+		}
+		res = self.client.post(self.list_url, data, format="json", **self._headers(role="CLIENT"))
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(mock_post.call_args.kwargs["json"], {"seats": 2, "seat_numbers": ["12A", "12B"]})
+		self.assertEqual(
+			sorted(Passenger.objects.values_list("seat_number", flat=True)), ["12A", "12B"]
+		)
+		data["passengers_list"][1]["seat_number"] = "12A"
+		res = self.client.post(self.list_url, data, format="json", **self._headers(role="CLIENT"))
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	@patch("bookings.views.requests.post")
+	def test_create_booking_records_assigned_seats(self, mock_post):
+		mock_post.return_value = Mock(status_code=200, text="OK", json=lambda: {"seat_numbers": ["1A", "1B"]})
+		data = {"flight_id": str(self.flight_id), "passengers": 2}
+		res = self.client.post(self.list_url, data, format="json", **self._headers(role="CLIENT"))
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(mock_post.call_args.kwargs["json"], {"seats": 2})
+		self.assertEqual(sorted(Passenger.objects.values_list("seat_number", flat=True)), ["1A", "1B"])
+
+	@override_settings(DATABASE_REPLICAS=["replica_1"])
+	@patch("bookings.views.requests.post")
+	def test_writes_pin_client_to_primary(self, mock_post):
+		mock_post.return_value = Mock(status_code=200, text="OK", json=lambda: {"remaining_seats": 8})
+		res = self.client.get(self.list_url, **self._headers(role="CLIENT"))
+		self.assertNotIn(settings.DATABASE_REPLICA_PIN_COOKIE, res.cookies)
+		data = {"flight_id": str(self.flight_id), "passengers": 1}
+		res = self.client.post(self.list_url, data, format="json", **self._headers(role="CLIENT"))
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(res.cookies[settings.DATABASE_REPLICA_PIN_COOKIE]["max-age"], settings.DATABASE_REPLICA_PIN_SECONDS)
+
 	@patch("bookings.views.publish_event")
 	@patch("bookings.views.requests.post")
 	def test_create_booking_reserve_failure(self, mock_post, mock_publish):
@@ -140,8 +195,10 @@ class BookingAPITests(APITestCase):
 		booking.refresh_from_db()
 		self.assertEqual(booking.status, "CANCELLED")
 		# Release called once for the passenger
-		expected_release_url = f"{settings.FLIGHT_SERVICE_URL}/{booking.flight_id}/release_seat/"
-		mock_post.assert_called_with(expected_release_url, headers={'X-Service-API-Key': settings.SERVICE_API_KEY})
+		expected_release_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{booking.flight_id}/release_seats/"
+		mock_post.assert_called_once_with(
+			expected_release_url, json={"seats": 1}, headers={'X-Service-API-Key': settings.SERVICE_API_KEY}
+		)
 		mock_publish.assert_called_once()
 
 	@patch("bookings.views.requests.get")
@@ -161,3 +218,113 @@ class BookingAPITests(APITestCase):
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
 		data = getattr(res, "data", None) or res.json()
 		self.assertEqual(data.get("status"), "healthy")
+
+
+class FlightEventEnrichmentTests(TestCase):
+	def test_batch_expands_to_flights_with_bookings(self):
+		booked_flight, empty_flight = uuid.uuid4(), uuid.uuid4()
+		booking = Booking.objects.create(user_id=uuid.uuid4(), flight_id=booked_flight)
+		Booking.objects.create(user_id=uuid.uuid4(), flight_id=booked_flight, status="CANCELLED")
+		payload = {
+			"flights": [
+				{"flight_id": str(booked_flight), "flight_number": "AA1", "status": "cancelled"},
+				{"flight_id": str(empty_flight), "flight_number": "AA2", "status": "cancelled"},
+			]
+		}
+		with patch("bookings.consumer.publish_event") as publish, self.assertNumQueries(1):
+			enrich_flight_event_batch("flight_cancelled", payload)
+		publish.assert_called_once()
+		event_type, body = publish.call_args.args
+		self.assertEqual(event_type, "flight_cancelled")
+		self.assertEqual(body["flight_number"], "AA1")
+		self.assertEqual(body["userBookings"], [{"user_id": str(booking.user_id), "booking_id": str(booking.booking_id)}])
+
+
+	def test_redelivered_events_keep_their_idempotency_keys(self):
+		flights = [uuid.uuid4(), uuid.uuid4()]
+		for flight_id in flights:
+			Booking.objects.create(user_id=uuid.uuid4(), flight_id=flight_id)
+		source_key = uuid.uuid4()
+		payload = {"flights": [{"flight_id": str(flight_id), "status": "cancelled"} for flight_id in flights]}
+		for _ in range(2):
+			enrich_flight_event_batch("flight_cancelled", payload, source_key)
+			enrich_flight_event("flight_delayed", {"flight_id": str(flights[0])}, source_key)
+		keys = [event.idempotency_key for event in OutboxEvent.objects.order_by("id")]
+		self.assertEqual(keys[:3], keys[3:])
+		self.assertEqual(len(set(keys[:2])), 2)
+
+
+class FakeMessage:
+	def __init__(self, partition, offset, key):
+		self._partition, self._offset, self._key = partition, offset, key
+
+	def topic(self):
+		return "flight_events"
+
+	def partition(self):
+		return self._partition
+
+	def offset(self):
+		return self._offset
+
+	def key(self):
+		return self._key
+
+
+class KeyedConsumerTests(TestCase):
+	def test_commits_only_contiguous_offsets(self):
+		tracker = OffsetTracker()
+		for offset in (5, 6, 7):
+			tracker.add("flight_events", 0, offset)
+		tracker.done("flight_events", 0, 6)
+		self.assertEqual(tracker.committable(), [])
+		tracker.done("flight_events", 0, 5)
+		self.assertEqual(tracker.committable(), [("flight_events", 0, 7)])
+		self.assertEqual(tracker.committable(), [])
+		self.assertEqual(tracker.pending(), 1)
+
+	def test_same_key_is_processed_in_order(self):
+		handled = []
+
+		def handler(message):
+			if message.offset() == 0:
+				# A slow first message must not let later ones with its key overtake it
+				time.sleep(0.05)
+			handled.append((message.key(), message.offset()))
+
+		pool = KeyedWorkerPool(handler, workers=4)
+		for offset in range(20):
+			pool.submit(FakeMessage(offset % 2, offset, b"flight-%d" % (offset % 3)))
+		pool.stop()
+
+		for key in (b"flight-0", b"flight-1", b"flight-2"):
+			offsets = [offset for k, offset in handled if k == key]
+			self.assertEqual(offsets, sorted(offsets))
+		self.assertEqual(len(handled), 20)
+		self.assertEqual(sorted(pool.tracker.committable()), [("flight_events", 0, 19), ("flight_events", 1, 20)])
+
+
+class EventCodecTests(TestCase):
+	def test_enriched_flight_event_round_trips(self):
+		payload = {
+			"flight_id": str(uuid.uuid4()),
+			"flight_number": "AA1",
+			"status": "delayed",
+			"new_departure_time": "2030-01-01T12:00:00+00:00",
+			"timestamp": "2030-01-01T09:00:00",
+			"userBookings": [{"user_id": str(uuid.uuid4()), "booking_id": str(uuid.uuid4())} for _ in range(100)],
+		}
+		value = encode_event("flight_delayed", uuid.uuid4(), payload)
+		self.assertEqual(value[:1], b"\x00")
+		self.assertEqual(decode_event(value)["data"], payload)
+
+	def test_booking_event_round_trips(self):
+		payload = {
+			"booking_id": str(uuid.uuid4()),
+			"user_id": str(uuid.uuid4()),
+			"email": "user@example.com",
+			"flight_id": str(uuid.uuid4()),
+			"status": "CONFIRMED",
+			"timestamp": "2030-01-01T09:00:00",
+		}
+		self.assertEqual(decode_event(encode_event("booking_created", uuid.uuid4(), payload))["data"], payload)
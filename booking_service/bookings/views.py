@@ -1,5 +1,6 @@
 import requests
 from django.conf import settings
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -8,10 +9,11 @@ from opentelemetry.propagate import inject
 
 from .models import Booking
 from .serializers import BookingSerializer
-from .producer import publish_event
+from .outbox import publish_event
+from .replicas import ReplicaReadMixin
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'post', 'delete']  # Exclude PUT and PATCH
@@ -37,36 +39,45 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         flight_id = serializer.validated_data['flight_id']
-        seats_needed = serializer.validated_data['passengers']
+        passengers = serializer.validated_data.get('passengers_list')
+        # One seat per listed passenger, which is what the serializer creates
+        seats_needed = len(passengers) if passengers else serializer.validated_data.get('passengers', 1)
+        payload = {'seats': seats_needed}
+        seat_numbers = [p['seat_number'] for p in passengers or () if p.get('seat_number')]
+        if seat_numbers:
+            payload['seat_numbers'] = seat_numbers
         
-        flight_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{flight_id}/reserve_seat/"
+        flight_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{flight_id}/reserve_seats/"
 
         headers = {'X-Service-API-Key': settings.SERVICE_API_KEY}
         inject(headers)
-        for _ in range(seats_needed):
-            response = requests.post(flight_url, headers=headers)
-            if response.status_code != 200:
-                return Response(
-                    {
-                        "error": "Failed to reserve seat",
-                        "upstream_status": response.status_code,
-                        "upstream_response": response.text,
-                    },
-                    status=response.status_code
-                )
+        # One all-or-nothing reservation for every passenger, claiming their chosen seats
+        response = requests.post(flight_url, json=payload, headers=headers)
+        if response.status_code != 200:
+            return Response(
+                {
+                    "error": "Failed to reserve seat",
+                    "upstream_status": response.status_code,
+                    "upstream_response": response.text,
+                },
+                status=response.status_code
+            )
 
         serializer.validated_data['user_id'] = request.user.id
-        booking = serializer.save()
-
-        event_data = {
-            "booking_id": str(booking.booking_id),
-            "user_id": str(booking.user_id),
-            "email": getattr(request.user, 'email', 'N/A'), 
-            "flight_id": str(booking.flight_id),
-            "status": "CONFIRMED",
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        publish_event('booking_created', event_data)
+        # Seats the flight service picked on a seat map, so cancelling gives back the same ones
+        assigned = [] if seat_numbers else response.json().get('seat_numbers') or []
+        with transaction.atomic():
+            booking = serializer.save(assigned_seats=assigned)
+
+            event_data = {
+                "booking_id": str(booking.booking_id),
+                "user_id": str(booking.user_id),
+                "email": getattr(request.user, 'email', 'N/A'),
+                "flight_id": str(booking.flight_id),
+                "status": "CONFIRMED",
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+            publish_event('booking_created', event_data)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -97,26 +108,30 @@ class BookingViewSet(viewsets.ModelViewSet):
                 return Response({"error": "Cannot cancel booking after flight departure"}, status=status.HTTP_400_BAD_REQUEST)
 
             seats_to_release = booking.passengers.count() or 1
+            payload = {'seats': seats_to_release}
+            seat_numbers = [n for n in booking.passengers.values_list('seat_number', flat=True) if n]
+            if seat_numbers:
+                payload['seat_numbers'] = seat_numbers
             
-            flight_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{booking.flight_id}/release_seat/"
+            flight_url = f"{settings.FLIGHT_ADMIN_SERVICE_URL}/{booking.flight_id}/release_seats/"
             
             headers = {'X-Service-API-Key': settings.SERVICE_API_KEY}
             inject(headers)
-            for _ in range(seats_to_release):
-                requests.post(flight_url, headers=headers)
-
-            booking.status = 'CANCELLED'
-            booking.save()
-
-            event_data = {
-                "booking_id": str(booking.booking_id),
-                "user_id": str(booking.user_id),
-                "email": getattr(request.user, 'email', 'N/A'),
-                "flight_id": str(booking.flight_id),
-                "status": "CANCELLED",
-                "timestamp": datetime.datetime.now().isoformat()
-            }
-            publish_event('booking_cancelled', event_data)
+            requests.post(flight_url, json=payload, headers=headers)
+
+            with transaction.atomic():
+                booking.status = 'CANCELLED'
+                booking.save()
+
+                event_data = {
+                    "booking_id": str(booking.booking_id),
+                    "user_id": str(booking.user_id),
+                    "email": getattr(request.user, 'email', 'N/A'),
+                    "flight_id": str(booking.flight_id),
+                    "status": "CANCELLED",
+                    "timestamp": datetime.datetime.now().isoformat()
+                }
+                publish_event('booking_cancelled', event_data)
 
             return Response({"status": "Booking cancelled successfully"}, status=status.HTTP_200_OK)
 
@@ -43,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bookings.replicas.ReplicaPinMiddleware',
     'django_prometheus.middleware.PrometheusAfterMiddleware',
 ]
 
@@ -72,6 +73,22 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
 }
 
+# Read replicas (comma-separated URLs), used by the read-only API actions
+# through bookings.replicas.ReplicaRouter
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['bookings.replicas.ReplicaRouter']
+# Replicas further behind than this are skipped until they catch up
+DATABASE_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DATABASE_REPLICA_MAX_LAG_SECONDS', 2.0))
+DATABASE_REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('DATABASE_REPLICA_LAG_CHECK_SECONDS', 2.0))
+# After a write, the client reads from the primary for this long
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 5))
+DATABASE_REPLICA_PIN_COOKIE = 'db_primary_pin'
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -123,6 +140,15 @@ KAFKA_BROKERS = os.environ.get(
     'KAFKA_BROKERS',
     'kafka.airlines.svc.cluster.local:9092'
 ).split(',')
+# 'binary' sends events that have a schema in event_schemas/ in the compact
+# binary encoding; 'json' keeps the JSON envelope. Consumers read both.
+EVENT_ENCODING = os.environ.get('EVENT_ENCODING', 'binary')
+# How long librdkafka waits to fill a batch before sending it
+KAFKA_PRODUCER_LINGER_MS = int(os.environ.get('KAFKA_PRODUCER_LINGER_MS', 20))
+# Partitions ensure_kafka_topics creates (or grows) each event topic to
+KAFKA_TOPIC_PARTITIONS = int(os.environ.get('KAFKA_TOPIC_PARTITIONS', 12))
+# Threads processing consumed events in parallel, one key per thread at a time
+KAFKA_CONSUMER_WORKERS = int(os.environ.get('KAFKA_CONSUMER_WORKERS', 8))
 
 # CORS settings for frontend access
 CORS_ALLOWED_ORIGINS = [
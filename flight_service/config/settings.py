@@ -42,6 +42,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'flights.replicas.ReplicaPinMiddleware',
     'django_prometheus.middleware.PrometheusAfterMiddleware',
 ]
 
@@ -70,6 +71,22 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
 }
 
+# Read replicas (comma-separated URLs), used by the read-only API actions
+# through flights.replicas.ReplicaRouter
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['flights.replicas.ReplicaRouter']
+# Replicas further behind than this are skipped until they catch up
+DATABASE_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DATABASE_REPLICA_MAX_LAG_SECONDS', 2.0))
+DATABASE_REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('DATABASE_REPLICA_LAG_CHECK_SECONDS', 2.0))
+# After a write, the client reads from the primary for this long
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', 5))
+DATABASE_REPLICA_PIN_COOKIE = 'db_primary_pin'
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -79,6 +96,40 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 1000,
 }
 
+# Keyset pagination for flight listings (flights.pagination)
+FLIGHT_PAGE_SIZE = int(os.environ.get('FLIGHT_PAGE_SIZE', 50))
+FLIGHT_MAX_PAGE_SIZE = int(os.environ.get('FLIGHT_MAX_PAGE_SIZE', 500))
+
+# Seat holds (flights.holds)
+SEAT_HOLD_TTL_SECONDS = int(os.environ.get('SEAT_HOLD_TTL_SECONDS', 600))
+
+# Flight schedules (flights.schedules): how many days ahead flights are generated
+FLIGHT_SCHEDULE_HORIZON_DAYS = int(os.environ.get('FLIGHT_SCHEDULE_HORIZON_DAYS', 120))
+
+# Connection search (flights.routes)
+FLIGHT_MIN_CONNECTION_MINUTES = int(os.environ.get('FLIGHT_MIN_CONNECTION_MINUTES', 60))
+FLIGHT_MAX_CONNECTION_MINUTES = int(os.environ.get('FLIGHT_MAX_CONNECTION_MINUTES', 720))
+FLIGHT_ROUTE_GRAPH_SYNC_SECONDS = float(os.environ.get('FLIGHT_ROUTE_GRAPH_SYNC_SECONDS', 1.0))
+
+# Airport departures boards (flights.departures): how long departed flights stay listed
+FLIGHT_DEPARTURES_LOOKBACK_MINUTES = int(os.environ.get('FLIGHT_DEPARTURES_LOOKBACK_MINUTES', 30))
+FLIGHT_DEPARTURES_SYNC_SECONDS = float(os.environ.get('FLIGHT_DEPARTURES_SYNC_SECONDS', 1.0))
+
+# Where the public search reads flights: 'projection' (flights.search_rows), 'flights',
+# or 'columnar' (flights.columnar, in memory; requires numpy)
+FLIGHT_SEARCH_BACKEND = os.environ.get('FLIGHT_SEARCH_BACKEND', 'projection')
+FLIGHT_COLUMNAR_SYNC_SECONDS = float(os.environ.get('FLIGHT_COLUMNAR_SYNC_SECONDS', 1.0))
+
+# Redis (optional). Used for the shared tier of the search cache (flights.cache).
+REDIS_URL = os.environ.get('REDIS_URL')
+FLIGHT_SEARCH_CACHE_ENABLED = os.environ.get('FLIGHT_SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+FLIGHT_SEARCH_CACHE_TTL = int(os.environ.get('FLIGHT_SEARCH_CACHE_TTL', 300))
+FLIGHT_SEARCH_CACHE_LOCAL_ENTRIES = int(os.environ.get('FLIGHT_SEARCH_CACHE_LOCAL_ENTRIES', 1024))
+
+# Hot-flight seat inventory (flights.hot_inventory): 'redis', 'memory' or unset
+HOT_INVENTORY_STORE = os.environ.get('HOT_INVENTORY_STORE') or None
+HOT_INVENTORY_FLUSH_INTERVAL = float(os.environ.get('HOT_INVENTORY_FLUSH_INTERVAL', 0.5))
+
 # DRF YASG Configuration
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -124,6 +175,15 @@ KAFKA_BROKERS = os.environ.get(
     'KAFKA_BROKERS',
     'kafka.airlines.svc.cluster.local:9092'
 ).split(',')
+# 'binary' sends events that have a schema in event_schemas/ in the compact
+# binary encoding; 'json' keeps the JSON envelope. Consumers read both.
+EVENT_ENCODING = os.environ.get('EVENT_ENCODING', 'binary')
+# How long librdkafka waits to fill a batch before sending it
+KAFKA_PRODUCER_LINGER_MS = int(os.environ.get('KAFKA_PRODUCER_LINGER_MS', 20))
+# Partitions ensure_kafka_topics creates (or grows) each event topic to
+KAFKA_TOPIC_PARTITIONS = int(os.environ.get('KAFKA_TOPIC_PARTITIONS', 12))
+# Flight events are keyed by one of this many hash buckets of the flight id
+FLIGHT_EVENT_KEY_BUCKETS = int(os.environ.get('FLIGHT_EVENT_KEY_BUCKETS', 256))
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -4,7 +4,7 @@ from django.http import JsonResponse
 from django.conf.urls.static import static
 from django.conf import settings
 from rest_framework.routers import DefaultRouter
-from flights.views import PublicLocationViewSet, PublicFlightViewSet, AdminLocationViewSet, AdminFlightViewSet
+from flights.views import PublicLocationViewSet, PublicFlightViewSet, AdminLocationViewSet, AdminFlightViewSet, AdminFlightScheduleViewSet
 
 def health_check(request):
     return JsonResponse({'status': 'healthy'})
@@ -36,6 +36,7 @@ public_router.register(r'flights', PublicFlightViewSet)
 admin_router = DefaultRouter()
 admin_router.register(r'locations', AdminLocationViewSet)
 admin_router.register(r'flights', AdminFlightViewSet)
+admin_router.register(r'schedules', AdminFlightScheduleViewSet)
 
 urlpatterns = [
     # 1. Django Admin
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Location, Flight
+from .models import Location, Flight, FlightSchedule, OutboxEvent
 
 # Register your models here.
 admin.site.register(Location)
 admin.site.register(Flight)
+admin.site.register(FlightSchedule)
+admin.site.register(OutboxEvent)
@@ -0,0 +1,209 @@
+"""
+Two-tier result cache: an in-process LRU in front of Redis.
+
+Entries are never deleted explicitly. Each entry depends on a set of tags
+(e.g. `loc:<location_id>`) and is stored under the tag versions observed
+*before* the underlying query ran; invalidation bumps the versions of the
+affected tags, which makes every dependent entry unreachable on all pods.
+Without REDIS_URL, versions and entries are process-local.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'flights:v:{}'
+# Versions restart from zero if the version store is emptied; the epoch is
+# regenerated with them so validators built from versions never repeat.
+EPOCH_KEY = 'flights:v:epoch'
+_local_epoch = uuid.uuid4().hex
+
+_local_versions = {}
+_local_versions_lock = threading.Lock()
+
+
+def _redis():
+    if not getattr(settings, 'FLIGHT_SEARCH_CACHE_ENABLED', True):
+        return None
+    return get_redis()
+
+
+def tag_versions(tags):
+    """Current version of each tag, or None if the version store is unreachable."""
+    redis = _redis()
+    if redis is not None:
+        try:
+            return tuple(int(v or 0) for v in redis.mget([VERSION_KEY.format(tag) for tag in tags]))
+        except Exception as e:
+            logger.warning("Cache version lookup failed: %s", e)
+            return None
+    with _local_versions_lock:
+        return tuple(_local_versions.get(tag, 0) for tag in tags)
+
+
+def tag_validator(tags):
+    """
+    Opaque string identifying the current state of `tags` across processes,
+    for HTTP validators. None if the version store is unreachable.
+    """
+    tags = tuple(sorted(tags))
+    redis = _redis()
+    if redis is not None:
+        try:
+            epoch, *versions = redis.mget([EPOCH_KEY] + [VERSION_KEY.format(tag) for tag in tags])
+            if epoch is None:
+                redis.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+                epoch = redis.get(EPOCH_KEY)
+            versions = [int(v or 0) for v in versions]
+        except Exception as e:
+            logger.warning("Cache version lookup failed: %s", e)
+            return None
+    else:
+        epoch = _local_epoch
+        with _local_versions_lock:
+            versions = [_local_versions.get(tag, 0) for tag in tags]
+    return hashlib.sha1(repr((epoch, tags, versions)).encode('utf-8')).hexdigest()
+
+
+def bump_tags(tags):
+    """Invalidate every cache entry that depends on any of `tags`."""
+    tags = set(tags)
+    if not tags:
+        return
+    with _local_versions_lock:
+        for tag in tags:
+            _local_versions[tag] = _local_versions.get(tag, 0) + 1
+    redis = _redis()
+    if redis is not None:
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(VERSION_KEY.format(tag))
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Cache invalidation failed for %s: %s", sorted(tags), e)
+
+
+def flight_tags(departure_location_id, arrival_location_id):
+    """Tags touched by a change to a flight on the given route."""
+    return {
+        'all',
+        f'loc:{departure_location_id}',
+        f'loc:{arrival_location_id}',
+        route_tag(departure_location_id, arrival_location_id),
+    }
+
+
+def route_tag(departure_location_id, arrival_location_id):
+    return f'route:{departure_location_id}:{arrival_location_id}'
+
+
+class LRU:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedCache:
+    """
+    Bytes cache keyed by an arbitrary string and invalidated through tags.
+
+    Usage::
+
+        value, stamp = cache.lookup(key, tags)
+        if value is None:
+            value = compute()
+            cache.store(stamp, value)
+    """
+
+    def __init__(self, namespace, max_entries=1024, ttl=300):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRU(max_entries)
+
+    def lookup(self, key, tags):
+        if not getattr(settings, 'FLIGHT_SEARCH_CACHE_ENABLED', True):
+            return None, None
+        tags = tuple(sorted(tags))
+        versions = tag_versions(tags)
+        if versions is None:
+            return None, None
+        stamp = (key, tags, versions)
+
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == (tags, versions) and entry[1] > time.monotonic():
+            return entry[2], stamp
+
+        redis = _redis()
+        if redis is not None:
+            try:
+                value = redis.get(self._redis_key(stamp))
+            except Exception as e:
+                logger.warning("Cache read failed: %s", e)
+                value = None
+            if value is not None:
+                self._store_local(stamp, value)
+                return value, stamp
+        return None, stamp
+
+    def store(self, stamp, value):
+        if stamp is None:
+            return
+        self._store_local(stamp, value)
+        redis = _redis()
+        if redis is not None:
+            try:
+                redis.set(self._redis_key(stamp), value, ex=self.ttl)
+            except Exception as e:
+                logger.warning("Cache write failed: %s", e)
+
+    def clear_local(self):
+        self.local.clear()
+
+    def _store_local(self, stamp, value):
+        key, tags, versions = stamp
+        self.local.set(key, ((tags, versions), time.monotonic() + self.ttl, value))
+
+    def _redis_key(self, stamp):
+        key, tags, versions = stamp
+        digest = hashlib.sha1(repr((key, tags, versions)).encode('utf-8')).hexdigest()
+        return f'flights:{self.namespace}:{digest}'
+
+
+search_cache = VersionedCache(
+    'search',
+    max_entries=getattr(settings, 'FLIGHT_SEARCH_CACHE_LOCAL_ENTRIES', 1024),
+    ttl=getattr(settings, 'FLIGHT_SEARCH_CACHE_TTL', 300),
+)
+location_cache = VersionedCache(
+    'locations',
+    max_entries=getattr(settings, 'FLIGHT_SEARCH_CACHE_LOCAL_ENTRIES', 1024),
+    ttl=getattr(settings, 'FLIGHT_SEARCH_CACHE_TTL', 300),
+)
@@ -0,0 +1,286 @@
+"""
+In-process columnar flight search (FLIGHT_SEARCH_BACKEND = 'columnar').
+
+Every flight departing from load time onwards is held as NumPy columns
+(origin, destination, departure, duration, local departure date, price,
+available seats, status and the flight id), so a search is a handful of
+vectorized comparisons, a lexsort of the matches and a slice, with no
+database round trip. Rendered rows are kept next to the columns in the
+shape the ORM path returns, so pages, cursors and bodies are identical.
+
+Like the route graph (see flights.routes) the index is loaded on first use
+and then kept current from flight change events and the shared Redis
+changelog. Searches that can reach flights departing before the index was
+loaded fall back to the database (see `covers`).
+
+NumPy is optional: without it this backend is unavailable.
+"""
+import datetime
+import decimal
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .fast_read import FLIGHT_VALUES
+from .models import Flight
+from .routes import ChangelogSynced, flight_key
+from .search_rows import zone
+
+# column -> dtype; the flight id is split into two words that sort like the UUID
+COLUMNS = (
+    ('origin', 'int32'),
+    ('destination', 'int32'),
+    ('departure', 'int64'),
+    ('duration', 'int64'),
+    ('local_date', 'int32'),
+    ('price', 'int64'),
+    ('seats', 'int32'),
+    ('status', 'int8'),
+    ('id_high', 'uint64'),
+    ('id_low', 'uint64'),
+)
+# keyset ordering field -> the columns it sorts by
+SORT_COLUMNS = {
+    'departure_time': ('departure',),
+    'price': ('price',),
+    'duration': ('duration',),
+    'flight_id': ('id_high', 'id_low'),
+}
+STATUS_CODES = {value: code for code, (value, _) in enumerate(Flight.STATUS_CHOICES)}
+ROW_VALUES = FLIGHT_VALUES + ('duration',)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+WORD = (1 << 64) - 1
+# Local dates start at most 14 hours before the same UTC date (UTC+14)
+MAX_UTC_OFFSET = datetime.timedelta(hours=14)
+INITIAL_CAPACITY = 1024
+
+
+def micros(value):
+    """An aware datetime or a timedelta as integer microseconds."""
+    if isinstance(value, datetime.datetime):
+        value -= EPOCH
+    return value // MICROSECOND
+
+
+def cents(price, rounding=decimal.ROUND_HALF_EVEN):
+    return int((decimal.Decimal(price) * 100).to_integral_value(rounding))
+
+
+class FlightColumns(ChangelogSynced):
+    sync_setting = 'FLIGHT_COLUMNAR_SYNC_SECONDS'
+
+    def __init__(self):
+        super().__init__()
+        self._covered_from = None
+        self._clear()
+
+    def _clear(self):
+        # Slots are reused: `_slots` maps flight id strings to positions in the
+        # columns, `_rows` holds each slot's rendered row, `_live` its liveness.
+        self._slots = {}
+        self._free = []
+        self._size = 0
+        self._rows = []
+        self._locations = {}
+        self._columns = {name: np.zeros(0, dtype) for name, dtype in COLUMNS} if np else {}
+        self._live = np.zeros(0, bool) if np else None
+
+    # -- maintenance -------------------------------------------------------
+
+    def load(self):
+        """Rebuild the columns from every flight departing from now onwards."""
+        if np is None:
+            raise ImproperlyConfigured("FLIGHT_SEARCH_BACKEND 'columnar' requires numpy")
+        started = time.time()
+        covered_from = timezone.now()
+        rows = Flight.objects.filter(departure_time__gte=covered_from).values(
+            *ROW_VALUES, 'departure_location__timezone',
+        )
+        with self._lock:
+            records, kept = [], []
+            self._clear()
+            for row in rows.iterator(chunk_size=5000):
+                records.append(self._record(row))
+                kept.append(row)
+            capacity = max(INITIAL_CAPACITY, len(records) * 2)
+            for index, (name, dtype) in enumerate(COLUMNS):
+                column = np.zeros(capacity, dtype)
+                column[:len(records)] = [record[index] for record in records]
+                self._columns[name] = column
+            self._live = np.zeros(capacity, bool)
+            self._live[:len(records)] = True
+            self._rows = kept
+            self._slots = {str(row['flight_id']): slot for slot, row in enumerate(kept)}
+            self._size = len(records)
+            self._covered_from = covered_from
+            self._loaded = True
+            self._synced_at = started
+
+    def apply(self, flight_ids):
+        """Re-read the given flights and update, add or drop their slots."""
+        keys = {flight_key(flight_id) for flight_id in flight_ids}
+        if not keys or not self._loaded:
+            return
+        # Read before taking the lock, so searches are not held up by the query
+        rows = Flight.objects.filter(
+            pk__in=keys, departure_time__gte=self._covered_from,
+        ).values(*ROW_VALUES, 'departure_location__timezone')
+        current = {str(row['flight_id']): row for row in rows}
+        with self._lock:
+            for key in keys:
+                row = current.get(key)
+                slot = self._slots.get(key)
+                if row is None:
+                    if slot is not None:
+                        self._drop(key, slot)
+                    continue
+                if slot is None:
+                    slot = self._allocate(key)
+                for (name, _), value in zip(COLUMNS, self._record(row)):
+                    self._columns[name][slot] = value
+                self._rows[slot] = row
+                self._live[slot] = True
+
+    def _record(self, row):
+        """Column values for a row; pops the departure time zone from it."""
+        timezone_name = row.pop('departure_location__timezone')
+        departure = row['departure_time']
+        return (
+            self._location_code(row['departure_location_id']),
+            self._location_code(row['arrival_location_id']),
+            micros(departure),
+            micros(row['arrival_time'] - departure),
+            departure.astimezone(zone(timezone_name)).date().toordinal(),
+            cents(row['price']),
+            row['available_seats'],
+            STATUS_CODES.get(row['status'], -1),
+            row['flight_id'].int >> 64,
+            row['flight_id'].int & WORD,
+        )
+
+    def _location_code(self, location_id):
+        return self._locations.setdefault(str(location_id), len(self._locations))
+
+    def _allocate(self, key):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._live):
+                self._grow(max(INITIAL_CAPACITY, self._size * 2))
+            slot = self._size
+            self._size += 1
+            self._rows.append(None)
+        self._slots[key] = slot
+        return slot
+
+    def _grow(self, capacity):
+        for name, dtype in COLUMNS:
+            column = np.zeros(capacity, dtype)
+            column[:self._size] = self._columns[name][:self._size]
+            self._columns[name] = column
+        live = np.zeros(capacity, bool)
+        live[:self._size] = self._live[:self._size]
+        self._live = live
+
+    def _drop(self, key, slot):
+        del self._slots[key]
+        self._live[slot] = False
+        self._rows[slot] = None
+        self._free.append(slot)
+
+    # -- search ------------------------------------------------------------
+
+    def covers(self, plan):
+        """Whether every flight `plan` can match is in the index (loading it if needed)."""
+        self.sync()
+        bounds = []
+        if plan.departure_from is not None:
+            bounds.append(plan.departure_from)
+        if plan.local_date is not None:
+            bounds.append(datetime.datetime.combine(
+                plan.local_date, datetime.time.min, tzinfo=datetime.timezone.utc) - MAX_UTC_OFFSET)
+        return plan.is_empty or (bool(bounds) and max(bounds) >= self._covered_from)
+
+    def fetch(self, plan, fields, values, reverse, limit):
+        """
+        Up to `limit` rows matching `plan` strictly after the keyset `values`,
+        ordered by `fields` (see FlightKeysetPagination.paginate_fetch).
+        """
+        if plan.is_empty:
+            return []
+        with self._lock:
+            n = self._size
+            columns = {name: column[:n] for name, column in self._columns.items()}
+            mask = self._live[:n].copy()
+            if plan.origin_ids is not None:
+                mask &= np.isin(columns['origin'], self._codes(plan.origin_ids))
+            if plan.destination_ids is not None:
+                mask &= np.isin(columns['destination'], self._codes(plan.destination_ids))
+            if plan.departure_from is not None:
+                mask &= columns['departure'] >= micros(plan.departure_from)
+            if plan.departure_until is not None:
+                mask &= columns['departure'] < micros(plan.departure_until)
+            if plan.local_date is not None:
+                mask &= columns['local_date'] == plan.local_date.toordinal()
+            if plan.min_price is not None:
+                mask &= columns['price'] >= cents(plan.min_price, decimal.ROUND_CEILING)
+            if plan.max_price is not None:
+                mask &= columns['price'] <= cents(plan.max_price, decimal.ROUND_FLOOR)
+            if plan.min_duration is not None:
+                mask &= columns['duration'] >= micros(plan.min_duration)
+            if plan.max_duration is not None:
+                mask &= columns['duration'] <= micros(plan.max_duration)
+            if plan.min_seats is not None:
+                mask &= columns['seats'] >= plan.min_seats
+            if plan.statuses is not None:
+                mask &= np.isin(columns['status'], [STATUS_CODES[value] for value in plan.statuses])
+
+            # Every field of a keyset ordering has the same direction
+            descending = fields[0][1] != reverse
+            keys = [(columns[name], value) for name, value in self._sort_keys(fields, values)]
+            if values is not None:
+                after = np.zeros(n, bool)
+                equal = np.ones(n, bool)
+                for column, value in keys:
+                    after |= equal & (column < value if descending else column > value)
+                    equal &= column == value
+                mask &= after
+
+            matches = np.flatnonzero(mask)
+            # lexsort sorts by its last key first
+            order = np.lexsort([column[matches] for column, _ in reversed(keys)])
+            if descending:
+                order = order[::-1]
+            return [self._rows[slot] for slot in matches[order[:limit]]]
+
+    def _codes(self, location_ids):
+        return [self._locations[key] for key in map(str, location_ids) if key in self._locations]
+
+    def _sort_keys(self, fields, values):
+        """(column name, scalar) pairs for the ordering; scalars are None without a cursor."""
+        keys = []
+        for index, (name, _) in enumerate(fields):
+            names = SORT_COLUMNS[name]
+            scalars = [None] * len(names) if values is None else _scalars(name, values[index])
+            keys += zip(names, scalars)
+        return keys
+
+
+def _scalars(name, value):
+    if name == 'flight_id':
+        return [value.int >> 64, value.int & WORD]
+    if name == 'price':
+        return [cents(value)]
+    return [micros(value)]
+
+
+flight_columns = FlightColumns()
+
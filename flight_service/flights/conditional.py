@@ -0,0 +1,31 @@
+"""
+Conditional GET support built on the cache tag versions (flights.cache).
+
+A response's ETag is derived from the versions of the tags its content
+depends on, which every write already bumps, so a matching If-None-Match is
+answered with 304 before any query runs or anything is serialized.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+
+from .cache import tag_validator
+
+
+def version_etag(scope, tags):
+    """Weak ETag for content identified by `scope` that depends on `tags`, or None."""
+    validator = tag_validator(tags)
+    if validator is None:
+        return None
+    # Weak, because the same content is also served gzip-encoded.
+    return 'W/"%s"' % hashlib.sha1(f'{scope}|{validator}'.encode('utf-8')).hexdigest()
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already has `etag`, else None."""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
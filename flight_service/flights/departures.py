@@ -0,0 +1,132 @@
+"""
+Live departures boards, one per airport, held in memory.
+
+Every flight departing from FLIGHT_DEPARTURES_LOOKBACK_MINUTES ago onwards is
+kept, whatever its status, in a per-location list ordered by departure time,
+so "the next N departures from X" is a bisect and a slice. Like the route
+graph (see flights.routes) the board is loaded once and then kept current
+from flight change events and the shared Redis changelog; reading it does
+not touch the database.
+"""
+import bisect
+import datetime
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .fast_read import format_datetime, location_map
+from .models import Flight
+from .routes import ChangelogSynced, flight_key
+
+DEPARTURE_VALUES = (
+    'flight_id', 'flight_number', 'departure_location_id', 'arrival_location_id',
+    'departure_time', 'arrival_time', 'status',
+)
+
+
+class Departure(NamedTuple):
+    flight_id: object
+    flight_number: str
+    origin_id: object
+    destination_id: object
+    departure_time: datetime.datetime
+    arrival_time: datetime.datetime
+    status: str
+
+
+def lookback():
+    return datetime.timedelta(minutes=getattr(settings, 'FLIGHT_DEPARTURES_LOOKBACK_MINUTES', 30))
+
+
+class DeparturesBoard(ChangelogSynced):
+    sync_setting = 'FLIGHT_DEPARTURES_SYNC_SECONDS'
+
+    def __init__(self):
+        super().__init__()
+        # flight id string -> Departure, and location id -> sorted [(departure_time, flight id string)]
+        self._flights = {}
+        self._boards = {}
+
+    def load(self):
+        """Rebuild every board from the database."""
+        started = time.time()
+        rows = Flight.objects.filter(
+            departure_time__gte=timezone.now() - lookback()
+        ).values_list(*DEPARTURE_VALUES).order_by('departure_location_id', 'departure_time', 'flight_id')
+
+        flights, boards = {}, {}
+        for row in rows.iterator(chunk_size=5000):
+            departure = Departure(*row)
+            key = str(departure.flight_id)
+            flights[key] = departure
+            boards.setdefault(departure.origin_id, []).append((departure.departure_time, key))
+        with self._lock:
+            self._flights = flights
+            self._boards = boards
+            self._loaded = True
+            self._synced_at = started
+
+    def apply(self, flight_ids):
+        """Re-read the given flights and move, add or drop their entries."""
+        keys = {flight_key(flight_id) for flight_id in flight_ids}
+        if not keys or not self._loaded:
+            return
+        # Read before taking the lock, so boards are not held up by the query
+        rows = Flight.objects.filter(pk__in=keys).values_list(*DEPARTURE_VALUES)
+        current = {str(row[0]): Departure(*row) for row in rows}
+        with self._lock:
+            for key in keys:
+                departure = current.get(key)
+                if departure is not None and self._flights.get(key) == departure:
+                    # Nothing on the board changed, e.g. only seats were sold
+                    continue
+                self._remove(key)
+                if departure is not None:
+                    bisect.insort(self._boards.setdefault(departure.origin_id, []), (departure.departure_time, key))
+                    self._flights[key] = departure
+
+    def _remove(self, key):
+        departure = self._flights.pop(key, None)
+        if departure is None:
+            return
+        board = self._boards.get(departure.origin_id, [])
+        entry = (departure.departure_time, key)
+        index = bisect.bisect_left(board, entry)
+        if index < len(board) and board[index] == entry:
+            board.pop(index)
+
+    def next_departures(self, location_id, limit, now=None):
+        """Up to `limit` flights leaving `location_id`, from the lookback window onwards."""
+        since = (now or timezone.now()) - lookback()
+        with self._lock:
+            board = self._boards.get(location_id)
+            if not board:
+                return []
+            # Entries that have dropped out of the window are pruned as they are passed
+            stale = bisect.bisect_left(board, (since, ''))
+            for _, key in board[:stale]:
+                del self._flights[key]
+            del board[:stale]
+            return [self._flights[key] for _, key in board[:limit]]
+
+
+def render_departures(departures):
+    locations = location_map.get()
+    if any(departure.destination_id not in locations for departure in departures):
+        locations = location_map.reload()
+    return [
+        {
+            'flight_id': str(departure.flight_id),
+            'flight_number': departure.flight_number,
+            'arrival_location': locations[departure.destination_id],
+            'departure_time': format_datetime(departure.departure_time),
+            'arrival_time': format_datetime(departure.arrival_time),
+            'status': departure.status,
+        }
+        for departure in departures
+    ]
+
+
+departures_board = DeparturesBoard()
@@ -0,0 +1,81 @@
+"""
+Fare calendar: the lowest price and seat summary per day of a month.
+
+One grouped aggregate over the (departure_location, departure_time) index
+per route-month. Results are cached as rendered JSON under the route tags of
+every origin/destination pair involved, so a change to a flight on one route
+only invalidates the calendars that include that route.
+"""
+import datetime
+
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+from .cache import route_tag, search_cache
+from .fast_read import dumps, format_price
+from .models import Flight
+from .search import SearchError, departure_range, resolve_location_ids
+
+BOOKABLE_STATUSES = ('scheduled', 'delayed', 'boarding')
+
+
+def parse_month(value):
+    """First day of a YYYY-MM month."""
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        raise SearchError(f"Invalid month '{value}', expected YYYY-MM.")
+
+
+def month_range(month):
+    """Half-open [start, end) UTC range covering one calendar month."""
+    next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return departure_range(month)[0], departure_range(next_month)[0]
+
+
+def calendar_days(origin_ids, destination_ids, month):
+    start, end = month_range(month)
+    rows = (
+        Flight.objects
+        .filter(
+            departure_location_id__in=origin_ids,
+            arrival_location_id__in=destination_ids,
+            departure_time__gte=start,
+            departure_time__lt=end,
+            status__in=BOOKABLE_STATUSES,
+        )
+        .annotate(day=TruncDate('departure_time', tzinfo=datetime.timezone.utc))
+        .values('day')
+        .annotate(
+            min_price=Min('price', filter=Q(available_seats__gt=0)),
+            flights=Count('flight_id'),
+            available_seats=Sum('available_seats'),
+        )
+        .order_by('day')
+    )
+    return [
+        {
+            "date": row['day'].isoformat(),
+            # None when every flight that day is sold out
+            "min_price": format_price(row['min_price']) if row['min_price'] is not None else None,
+            "flights": row['flights'],
+            "available_seats": row['available_seats'],
+        }
+        for row in rows
+    ]
+
+
+def fare_calendar(origin, destination, month_value):
+    """Rendered calendar JSON for free-text origin/destination terms and a YYYY-MM month."""
+    month = parse_month(month_value)
+    origin_ids = resolve_location_ids(origin)
+    destination_ids = resolve_location_ids(destination)
+
+    tags = {route_tag(o, d) for o in origin_ids for d in destination_ids} | {'locations'}
+    key = f"calendar:{','.join(sorted(origin_ids))}:{','.join(sorted(destination_ids))}:{month:%Y-%m}"
+    body, stamp = search_cache.lookup(key, tags)
+    if body is None:
+        days = calendar_days(origin_ids, destination_ids, month) if origin_ids and destination_ids else []
+        body = dumps({"month": f"{month:%Y-%m}", "days": days})
+        search_cache.store(stamp, body)
+    return body
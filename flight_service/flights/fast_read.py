@@ -0,0 +1,148 @@
+"""
+High-throughput read path for flight listings.
+
+Produces exactly the JSON that FlightReadSerializer + JSONRenderer produce,
+without model instances, nested serializers or per-row Location queries:
+flights are projected with `.values()`, locations come from a shared
+in-process map that reloads when the `locations` cache tag changes, and the
+result is encoded with orjson when it is installed.
+"""
+import decimal
+import gzip
+import json
+import threading
+
+from django.utils import timezone
+
+from .cache import tag_versions
+from .models import Location
+from .serializers import LocationSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Column order matches FlightReadSerializer.Meta.fields.
+FLIGHT_VALUES = (
+    'flight_id', 'departure_location_id', 'arrival_location_id', 'flight_number',
+    'departure_time', 'arrival_time', 'total_seats', 'available_seats', 'price',
+    'status', 'created_at', 'updated_at',
+)
+LOCATION_VALUES = (
+    'location_id', 'name', 'airport_code', 'city', 'country', 'timezone', 'latitude', 'longitude',
+)
+
+_CENT = decimal.Decimal('0.01')
+_PRICE_CONTEXT = decimal.Context(prec=10)
+
+
+class LocationMap:
+    """Every Location, pre-rendered, keyed by id. The table is small and rarely changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._locations = {}
+
+    def get(self):
+        version = tag_versions(['locations'])
+        if version is None or version != self._version:
+            self.reload(version)
+        return self._locations
+
+    def reload(self, version=None):
+        locations = {
+            row['location_id']: {
+                'location_id': str(row['location_id']),
+                'name': row['name'],
+                'airport_code': row['airport_code'],
+                'city': row['city'],
+                'country': row['country'],
+                'timezone': row['timezone'],
+                'latitude': row['latitude'],
+                'longitude': row['longitude'],
+            }
+            for row in Location.objects.values(*LOCATION_VALUES)
+        }
+        with self._lock:
+            self._locations = locations
+            self._version = version
+        return locations
+
+
+location_map = LocationMap()
+
+
+class LocationListBody:
+    """The public location list as JSON, plus a gzip copy, rebuilt only when its ETag changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = (None, None, None)
+
+    def get(self, etag):
+        """(json_bytes, gzip_bytes) for the location list at `etag`."""
+        entry = self._entry
+        if etag is None or entry[0] != etag:
+            body = dumps(LocationSerializer(Location.objects.all(), many=True).data)
+            entry = (etag, body, gzip.compress(body, compresslevel=9, mtime=0))
+            if etag is not None:
+                with self._lock:
+                    self._entry = entry
+        return entry[1], entry[2]
+
+
+location_list_body = LocationListBody()
+
+
+def format_datetime(value):
+    # Mirrors rest_framework.fields.DateTimeField.to_representation
+    value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_price(value):
+    # Mirrors rest_framework.fields.DecimalField(max_digits=10, decimal_places=2)
+    return '{:f}'.format(value.quantize(_CENT, context=_PRICE_CONTEXT))
+
+
+def render_flights(rows):
+    """Turn `Flight.objects.values(*FLIGHT_VALUES)` rows into serializer-shaped dicts."""
+    locations = location_map.get()
+    rendered = []
+    for row in rows:
+        departure = locations.get(row['departure_location_id'])
+        arrival = locations.get(row['arrival_location_id'])
+        if departure is None or arrival is None:
+            locations = location_map.reload()
+            departure = locations[row['departure_location_id']]
+            arrival = locations[row['arrival_location_id']]
+        rendered.append({
+            'flight_id': str(row['flight_id']),
+            'departure_location': departure,
+            'arrival_location': arrival,
+            'flight_number': row['flight_number'],
+            'departure_time': format_datetime(row['departure_time']),
+            'arrival_time': format_datetime(row['arrival_time']),
+            'total_seats': row['total_seats'],
+            'available_seats': row['available_seats'],
+            'price': format_price(row['price']),
+            'status': row['status'],
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+        })
+    return rendered
+
+
+def dumps(data):
+    """Byte-for-byte equivalent of rest_framework.renderers.JSONRenderer for plain data."""
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    # JSONRenderer escapes these so the output is also valid JavaScript.
+    return body.replace('\u2028'.encode('utf-8'), b'\\u2028').replace('\u2029'.encode('utf-8'), b'\\u2029')
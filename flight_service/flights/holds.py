@@ -0,0 +1,91 @@
+"""
+Time-limited seat holds.
+
+A hold takes seats from availability immediately (through flights.inventory)
+and gives them back unless it is confirmed before `expires_at`. Expired holds
+are released by `expire_holds`, which works in batches off the partial
+`seathold_active_expiry_idx` index rather than hold by hold.
+"""
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .inventory import InventoryError, release_seats, reserve_seats, return_seats, seat_transaction
+from .models import Flight, SeatHold
+from .seatmaps import ensure_unmapped
+from .signals import notify_flights_changed
+
+
+class HoldNotActive(InventoryError):
+    def __init__(self, hold_id):
+        super().__init__(f"Hold {hold_id} is not active")
+
+
+def create_hold(flight_id, seats, ttl_seconds=None):
+    """Reserve `seats` and record a hold for them. Returns (hold, remaining_seats)."""
+    ttl = ttl_seconds or getattr(settings, 'SEAT_HOLD_TTL_SECONDS', 600)
+    # A hold is a seat count, which a seat map could not account for
+    ensure_unmapped(flight_id)
+    with seat_transaction():
+        remaining = reserve_seats(flight_id, seats)
+        hold = SeatHold.objects.create(
+            flight_id=flight_id,
+            seats=seats,
+            expires_at=timezone.now() + datetime.timedelta(seconds=ttl),
+        )
+    return hold, remaining
+
+
+def confirm_hold(flight_id, hold_id):
+    """Turn an unexpired hold into a permanent reservation."""
+    confirmed = SeatHold.objects.filter(
+        pk=hold_id, flight_id=flight_id, status='active', expires_at__gt=timezone.now()
+    ).update(status='confirmed')
+    if not confirmed:
+        raise HoldNotActive(hold_id)
+
+
+def release_hold(flight_id, hold_id):
+    """Give a hold's seats back before it expires. Returns the remaining seat count."""
+    with seat_transaction():
+        hold = SeatHold.objects.select_for_update().filter(pk=hold_id, flight_id=flight_id, status='active').first()
+        if hold is None:
+            raise HoldNotActive(hold_id)
+        hold.status = 'released'
+        hold.save(update_fields=['status'])
+        return release_seats(flight_id, hold.seats)
+
+
+def expire_holds(batch_size=500, now=None):
+    """
+    Expire one batch of overdue holds and return their seats.
+
+    Seats are returned with one UPDATE per affected flight. Rows are locked
+    with SKIP LOCKED where supported, so several sweepers can run at once.
+    Returns the number of holds expired.
+    """
+    now = now or timezone.now()
+    with seat_transaction():
+        overdue = SeatHold.objects.filter(status='active', expires_at__lte=now).order_by('expires_at')
+        if connection.features.has_select_for_update_skip_locked:
+            overdue = overdue.select_for_update(skip_locked=True)
+        batch = list(overdue.values_list('hold_id', 'flight_id', 'seats')[:batch_size])
+        if not batch:
+            return 0
+
+        SeatHold.objects.filter(pk__in=[hold_id for hold_id, _, _ in batch]).update(status='expired')
+
+        seats_by_flight = Counter()
+        for _, flight_id, seats in batch:
+            seats_by_flight[flight_id] += seats
+        for flight_id, seats in seats_by_flight.items():
+            return_seats(flight_id, seats, now)
+        notify_flights_changed(
+            Flight.objects.filter(pk__in=list(seats_by_flight)).values_list(
+                'flight_id', 'departure_location_id', 'arrival_location_id'
+            )
+        )
+    return len(batch)
@@ -0,0 +1,272 @@
+"""
+Hot-flight seat inventory.
+
+Flights flagged `hot_inventory` keep their live seat count in a seat store
+(Redis in production) instead of taking a Postgres row lock per reservation.
+Counts are changed atomically inside the store and the flight ids are marked
+dirty; `flush` writes the latest counts back to `Flight.available_seats` in
+one statement per batch, and `reconcile` re-aligns store and database after
+a restart.
+
+HOT_INVENTORY_STORE selects the store: 'redis', 'memory' (in-process, for
+tests and single-process development) or unset to disable the feature.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Flight
+from .redis_client import get_redis
+from .signals import notify_flights_changed
+
+# Results of SeatStore.take/give
+APPLIED = 1
+REJECTED = 0
+MISSING = -1
+
+KEY = 'flights:inv:{}'
+DIRTY_KEY = 'flights:inv:dirty'
+
+# KEYS[1] inventory hash, KEYS[2] dirty set; ARGV[1] seats, ARGV[2] flight id
+_TAKE_SCRIPT = """
+local available = redis.call('HGET', KEYS[1], 'available')
+if not available then return {-1, 0} end
+available = tonumber(available)
+local seats = tonumber(ARGV[1])
+if available < seats then return {0, available} end
+available = redis.call('HINCRBY', KEYS[1], 'available', -seats)
+redis.call('SADD', KEYS[2], ARGV[2])
+return {1, available}
+"""
+
+_GIVE_SCRIPT = """
+local inventory = redis.call('HMGET', KEYS[1], 'available', 'total')
+if not inventory[1] then return {-1, 0} end
+local available = tonumber(inventory[1])
+local seats = tonumber(ARGV[1])
+if available + seats > tonumber(inventory[2]) then return {0, available} end
+available = redis.call('HINCRBY', KEYS[1], 'available', seats)
+redis.call('SADD', KEYS[2], ARGV[2])
+return {1, available}
+"""
+
+# Atomically remove a flight from the store, returning its last count.
+_DROP_SCRIPT = """
+local available = redis.call('HGET', KEYS[1], 'available')
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[1])
+return available
+"""
+
+
+class RedisSeatStore:
+    def __init__(self, redis):
+        self.redis = redis
+        self._take = redis.register_script(_TAKE_SCRIPT)
+        self._give = redis.register_script(_GIVE_SCRIPT)
+        self._drop = redis.register_script(_DROP_SCRIPT)
+
+    def take(self, flight_id, seats):
+        state, available = self._take(keys=[KEY.format(flight_id), DIRTY_KEY], args=[seats, str(flight_id)])
+        return int(state), int(available)
+
+    def give(self, flight_id, seats):
+        state, available = self._give(keys=[KEY.format(flight_id), DIRTY_KEY], args=[seats, str(flight_id)])
+        return int(state), int(available)
+
+    def seed(self, flight_id, available, total):
+        """Load a flight's count unless the store already has one. Returns True if seeded."""
+        key = KEY.format(flight_id)
+        seeded = self.redis.hsetnx(key, 'available', available)
+        self.redis.hset(key, 'total', total)
+        return bool(seeded)
+
+    def get(self, flight_id):
+        available = self.redis.hget(KEY.format(flight_id), 'available')
+        return None if available is None else int(available)
+
+    def drop(self, flight_id):
+        available = self._drop(keys=[KEY.format(flight_id), DIRTY_KEY], args=[str(flight_id)])
+        return None if available is None else int(available)
+
+    def pop_dirty(self, count):
+        return [flight_id.decode('utf-8') for flight_id in self.redis.spop(DIRTY_KEY, count) or []]
+
+    def mark_dirty(self, flight_ids):
+        if flight_ids:
+            self.redis.sadd(DIRTY_KEY, *[str(flight_id) for flight_id in flight_ids])
+
+    def counts(self, flight_ids):
+        pipe = self.redis.pipeline(transaction=False)
+        for flight_id in flight_ids:
+            pipe.hget(KEY.format(flight_id), 'available')
+        return {
+            flight_id: int(available)
+            for flight_id, available in zip(flight_ids, pipe.execute())
+            if available is not None
+        }
+
+
+class InMemorySeatStore:
+    """Process-local stand-in for RedisSeatStore with the same semantics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inventory = {}
+        self._dirty = set()
+
+    def take(self, flight_id, seats):
+        return self._change(str(flight_id), -seats)
+
+    def give(self, flight_id, seats):
+        return self._change(str(flight_id), seats)
+
+    def _change(self, flight_id, delta):
+        with self._lock:
+            inventory = self._inventory.get(flight_id)
+            if inventory is None:
+                return MISSING, 0
+            available = inventory['available'] + delta
+            if available < 0 or available > inventory['total']:
+                return REJECTED, inventory['available']
+            inventory['available'] = available
+            self._dirty.add(flight_id)
+            return APPLIED, available
+
+    def seed(self, flight_id, available, total):
+        with self._lock:
+            inventory = self._inventory.get(str(flight_id))
+            if inventory is not None:
+                inventory['total'] = total
+                return False
+            self._inventory[str(flight_id)] = {'available': available, 'total': total}
+            return True
+
+    def get(self, flight_id):
+        with self._lock:
+            inventory = self._inventory.get(str(flight_id))
+            return None if inventory is None else inventory['available']
+
+    def drop(self, flight_id):
+        with self._lock:
+            self._dirty.discard(str(flight_id))
+            inventory = self._inventory.pop(str(flight_id), None)
+            return None if inventory is None else inventory['available']
+
+    def pop_dirty(self, count):
+        with self._lock:
+            return [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+
+    def mark_dirty(self, flight_ids):
+        with self._lock:
+            self._dirty.update(str(flight_id) for flight_id in flight_ids)
+
+    def counts(self, flight_ids):
+        with self._lock:
+            return {
+                flight_id: self._inventory[str(flight_id)]['available']
+                for flight_id in flight_ids
+                if str(flight_id) in self._inventory
+            }
+
+
+_store = None
+_store_kind = None
+
+
+def get_seat_store():
+    """The configured seat store, or None when hot inventory is disabled."""
+    global _store, _store_kind
+    kind = getattr(settings, 'HOT_INVENTORY_STORE', None)
+    if kind != _store_kind:
+        if kind == 'redis':
+            redis = get_redis()
+            _store = RedisSeatStore(redis) if redis is not None else None
+        elif kind == 'memory':
+            _store = InMemorySeatStore()
+        else:
+            _store = None
+        _store_kind = kind
+    return _store
+
+
+def enable(flight_id):
+    """Flag a flight as hot and seed the store from its current database count."""
+    store = get_seat_store()
+    if store is None:
+        raise RuntimeError("HOT_INVENTORY_STORE is not configured")
+    with transaction.atomic():
+        flight = Flight.objects.select_for_update().get(pk=flight_id)
+        if not flight.hot_inventory:
+            Flight.objects.filter(pk=flight_id).update(hot_inventory=True)
+        store.seed(flight_id, flight.available_seats, flight.total_seats)
+
+
+def disable(flight_id):
+    """Write the store's count back and return the flight to row-locked inventory."""
+    store = get_seat_store()
+    with transaction.atomic():
+        # Holding the row lock keeps database-path reservations out until
+        # the final count has been written.
+        Flight.objects.select_for_update().filter(pk=flight_id).exists()
+        available = store.drop(flight_id) if store is not None else None
+        updates = {'hot_inventory': False}
+        if available is not None:
+            updates.update(available_seats=available, updated_at=timezone.now())
+        Flight.objects.filter(pk=flight_id).update(**updates)
+        _notify([flight_id])
+
+
+def flush(batch_size=1000):
+    """Write back one batch of dirty counts. Returns the number of flights written."""
+    store = get_seat_store()
+    if store is None:
+        return 0
+    flight_ids = store.pop_dirty(batch_size)
+    if not flight_ids:
+        return 0
+    try:
+        counts = store.counts(flight_ids)
+        if counts:
+            with transaction.atomic():
+                Flight.objects.filter(pk__in=list(counts), hot_inventory=True).update(
+                    available_seats=Case(
+                        *[When(pk=flight_id, then=Value(available)) for flight_id, available in counts.items()],
+                        output_field=IntegerField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+                _notify(list(counts))
+    except Exception:
+        store.mark_dirty(flight_ids)
+        raise
+    return len(flight_ids)
+
+
+def reconcile():
+    """
+    Align store and database for every hot flight, e.g. on writer start-up.
+
+    A count already in the store is the newest value and is marked dirty so
+    the next flush writes it back; a flight missing from the store (Redis
+    restarted empty) is re-seeded from the database.
+    """
+    store = get_seat_store()
+    if store is None:
+        return 0
+    hot = list(Flight.objects.filter(hot_inventory=True).values_list('flight_id', 'available_seats', 'total_seats'))
+    for flight_id, available, total in hot:
+        store.seed(flight_id, available, total)
+    store.mark_dirty([flight_id for flight_id, _, _ in hot])
+    return len(hot)
+
+
+def _notify(flight_ids):
+    notify_flights_changed(
+        Flight.objects.filter(pk__in=flight_ids).values_list(
+            'flight_id', 'departure_location_id', 'arrival_location_id'
+        )
+    )
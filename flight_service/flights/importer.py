@@ -0,0 +1,223 @@
+"""
+Bulk flight import from CSV or NDJSON streams.
+
+Rows are validated in Python against an airport-code map loaded once per
+import (no per-row Location lookups) and inserted with `bulk_create`, one
+transaction per chunk. Invalid rows are reported and skipped; the rest of
+their chunk is still imported. Each chunk sends one `flights_changed`
+notification and records one `flights_imported` event in the outbox.
+"""
+import csv
+import datetime
+import decimal
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Flight, Location, normalize_airport_code
+from .outbox import publish_event
+from .signals import notify_flights_changed
+
+FIELDS = (
+    'flight_number', 'departure_location', 'arrival_location', 'departure_time',
+    'arrival_time', 'total_seats', 'available_seats', 'price',
+)
+REQUIRED_FIELDS = tuple(field for field in FIELDS if field != 'available_seats')
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = {
+    'csv': 'csv',
+    'text/csv': 'csv',
+    'ndjson': 'ndjson',
+    'jsonl': 'ndjson',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+_CENT = decimal.Decimal('0.01')
+_MAX_PRICE = decimal.Decimal('99999999.99')
+_FLIGHT_NUMBER_LENGTH = Flight._meta.get_field('flight_number').max_length
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; `errors` maps field names to messages."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _decode(lines):
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+
+def parse_csv(lines):
+    """Yield (line_number, row) pairs from CSV text with a header row."""
+    reader = csv.DictReader(_decode(lines))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_ndjson(lines):
+    """Yield (line_number, row) pairs from newline-delimited JSON objects."""
+    for line_number, line in enumerate(_decode(lines), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = RowError({'non_field_errors': f'Invalid JSON: {e}'})
+        else:
+            if not isinstance(row, dict):
+                row = RowError({'non_field_errors': 'Expected a JSON object.'})
+        yield line_number, row
+
+
+PARSERS = {'csv': parse_csv, 'ndjson': parse_ndjson}
+
+
+def _integer(value, field, errors):
+    # int() would truncate 7.5 and take True as 1
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        errors[field] = 'A valid integer is required.'
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        errors[field] = 'A valid integer is required.'
+        return None
+    if number < 0:
+        errors[field] = 'Ensure this value is greater than or equal to 0.'
+    return number
+
+
+def _datetime(value, field, errors):
+    try:
+        parsed = parse_datetime(str(value))
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        errors[field] = 'Datetime has wrong format. Use ISO 8601.'
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _price(value, errors):
+    try:
+        price = decimal.Decimal(str(value))
+    except decimal.InvalidOperation:
+        errors['price'] = 'A valid number is required.'
+        return None
+    if not price.is_finite() or price < 0 or price > _MAX_PRICE or price != price.quantize(_CENT):
+        errors['price'] = 'Ensure this is a non-negative amount with at most 2 decimal places.'
+        return None
+    return price
+
+
+def build_flight(row, location_ids):
+    """Validate one row and return an unsaved Flight, or raise RowError."""
+    errors = {}
+    for field in REQUIRED_FIELDS:
+        if row.get(field) in (None, ''):
+            errors[field] = 'This field is required.'
+    if errors:
+        raise RowError(errors)
+
+    flight_number = str(row['flight_number']).strip()
+    if len(flight_number) > _FLIGHT_NUMBER_LENGTH:
+        errors['flight_number'] = f'Ensure this field has no more than {_FLIGHT_NUMBER_LENGTH} characters.'
+
+    endpoints = {}
+    for field in ('departure_location', 'arrival_location'):
+        code = str(row[field])
+        endpoints[field] = location_ids.get(normalize_airport_code(code))
+        if endpoints[field] is None:
+            errors[field] = f"Location with airport code '{code}' does not exist."
+
+    departure_time = _datetime(row['departure_time'], 'departure_time', errors)
+    arrival_time = _datetime(row['arrival_time'], 'arrival_time', errors)
+    total_seats = _integer(row['total_seats'], 'total_seats', errors)
+    available = row.get('available_seats')
+    available_seats = total_seats if available in (None, '') else _integer(available, 'available_seats', errors)
+    price = _price(row['price'], errors)
+    if errors:
+        raise RowError(errors)
+
+    if endpoints['departure_location'] == endpoints['arrival_location']:
+        errors['non_field_errors'] = 'Departure and Arrival locations cannot be the same.'
+    elif available_seats > total_seats:
+        errors['non_field_errors'] = 'Available seats cannot exceed total seats.'
+    elif arrival_time <= departure_time:
+        errors['non_field_errors'] = 'Arrival time must be after departure time.'
+    if errors:
+        raise RowError(errors)
+
+    return Flight(
+        flight_number=flight_number,
+        departure_location_id=endpoints['departure_location'],
+        arrival_location_id=endpoints['arrival_location'],
+        departure_time=departure_time,
+        arrival_time=arrival_time,
+        total_seats=total_seats,
+        available_seats=available_seats,
+        price=price,
+    )
+
+
+def _save_chunk(flights):
+    with transaction.atomic():
+        Flight.objects.bulk_create(flights)
+        notify_flights_changed(
+            [(flight.flight_id, flight.departure_location_id, flight.arrival_location_id) for flight in flights]
+        )
+        event_data = {
+            "count": len(flights),
+            "flight_ids": [str(flight.flight_id) for flight in flights],
+            "first_departure_time": min(flight.departure_time for flight in flights).isoformat(),
+            "last_departure_time": max(flight.departure_time for flight in flights).isoformat(),
+            "timestamp": datetime.datetime.now().isoformat()
+        }
+        publish_event('flights_imported', event_data)
+
+
+def import_flights(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Import (line_number, row) pairs as produced by `parse_csv`/`parse_ndjson`.
+
+    Returns {"created", "failed", "errors"}; `errors` lists the first
+    MAX_REPORTED_ERRORS failures as {"line", "errors"}.
+    """
+    location_ids = dict(Location.objects.values_list('airport_code_key', 'location_id'))
+    created = failed = 0
+    errors = []
+    chunk = []
+
+    for line_number, row in rows:
+        try:
+            if isinstance(row, RowError):
+                raise row
+            chunk.append(build_flight(row, location_ids))
+        except RowError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "errors": e.errors})
+            continue
+        if len(chunk) >= chunk_size:
+            if not dry_run:
+                _save_chunk(chunk)
+            created += len(chunk)
+            chunk = []
+
+    if chunk:
+        if not dry_run:
+            _save_chunk(chunk)
+        created += len(chunk)
+    return {"created": created, "failed": failed, "errors": errors}
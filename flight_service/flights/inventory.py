@@ -0,0 +1,166 @@
+"""
+Seat inventory operations.
+
+Availability only ever changes through a single conditional UPDATE, so two
+concurrent requests can never both take the last seats: the row either still
+satisfies the guard when the UPDATE runs or it is left untouched. Flights in
+the hot inventory store are changed there instead (flights.hot_inventory).
+
+The store is not part of the database transaction. Callers that change seats
+and then write more rows use `seat_transaction()`, which gives store changes
+back if the transaction rolls back.
+"""
+import contextlib
+import contextvars
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .hot_inventory import APPLIED, MISSING, get_seat_store
+from .models import Flight
+from .signals import notify_flights_changed
+
+logger = logging.getLogger(__name__)
+
+# Hot store changes made in the current seat_transaction: [(flight_id, seats, inverse operation)]
+_hot_changes = contextvars.ContextVar('hot_inventory_changes', default=None)
+INVERSE = {'take': 'give', 'give': 'take'}
+
+
+class InventoryError(Exception):
+    """Base class for seat inventory failures."""
+
+
+class FlightNotFound(InventoryError):
+    pass
+
+
+class NotEnoughSeats(InventoryError):
+    def __init__(self, available_seats):
+        super().__init__("Flight is full" if available_seats < 1 else
+                         f"Only {available_seats} seats available")
+        self.available_seats = available_seats
+
+
+class ReleaseExceedsCapacity(InventoryError):
+    def __init__(self, available_seats):
+        super().__init__("Cannot release more seats than were reserved")
+        self.available_seats = available_seats
+
+
+class InventoryUnavailable(InventoryError):
+    def __init__(self):
+        super().__init__("Seat inventory is temporarily unavailable")
+
+
+def _apply(flight_id, guard, delta):
+    with transaction.atomic():
+        updated = Flight.objects.filter(pk=flight_id, **guard).update(
+            available_seats=F('available_seats') + delta,
+            updated_at=timezone.now(),
+        )
+        row = Flight.objects.filter(pk=flight_id).values(
+            'available_seats', 'departure_location_id', 'arrival_location_id'
+        ).first()
+        if row is None:
+            raise FlightNotFound(f"Flight {flight_id} not found")
+        if updated:
+            notify_flights_changed([(flight_id, row['departure_location_id'], row['arrival_location_id'])])
+    return bool(updated), row['available_seats']
+
+
+def _hot_apply(flight_id, seats, operation):
+    """
+    Apply to the hot inventory store; None if the flight is not held there.
+    Only flights flagged hot_inventory go to the store, so other flights keep
+    working while it is unreachable.
+    """
+    store = get_seat_store()
+    if store is None or not Flight.objects.filter(pk=flight_id, hot_inventory=True).exists():
+        return None
+    try:
+        state, available = getattr(store, operation)(flight_id, seats)
+    except Exception as e:
+        logger.warning("Seat store %s failed for flight %s: %s", operation, flight_id, e)
+        raise InventoryUnavailable()
+    if state == MISSING:
+        return None
+    changes = _hot_changes.get()
+    if state == APPLIED and changes is not None:
+        changes.append((flight_id, seats, INVERSE[operation]))
+    return state == APPLIED, available
+
+
+@contextlib.contextmanager
+def seat_transaction():
+    """
+    transaction.atomic() for seat changes followed by other writes: if the
+    block raises or fails to commit, hot store changes made inside it are
+    reverted, so seats do not leak from the store.
+    """
+    outer = _hot_changes.get()
+    changes = []
+    token = _hot_changes.set(changes)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        _revert(changes)
+        raise
+    finally:
+        _hot_changes.reset(token)
+    if outer is not None:
+        outer.extend(changes)
+
+
+def _revert(changes):
+    store = get_seat_store()
+    for flight_id, seats, operation in reversed(changes):
+        try:
+            getattr(store, operation)(flight_id, seats)
+        except Exception as e:
+            logger.error("Could not revert seat store change for flight %s (%s %s): %s",
+                         flight_id, operation, seats, e)
+
+
+def reserve_seats(flight_id, seats):
+    """Take `seats` seats, all or nothing. Returns the remaining seat count."""
+    hot = _hot_apply(flight_id, seats, 'take')
+    if hot is not None:
+        if not hot[0]:
+            raise NotEnoughSeats(hot[1])
+        return hot[1]
+    updated, remaining = _apply(flight_id, {'available_seats__gte': seats}, -seats)
+    if not updated:
+        raise NotEnoughSeats(remaining)
+    return remaining
+
+
+def release_seats(flight_id, seats):
+    """Give back `seats` seats without exceeding total_seats. Returns the remaining seat count."""
+    hot = _hot_apply(flight_id, seats, 'give')
+    if hot is not None:
+        if not hot[0]:
+            raise ReleaseExceedsCapacity(hot[1])
+        return hot[1]
+    updated, remaining = _apply(flight_id, {'available_seats__lte': F('total_seats') - seats}, seats)
+    if not updated:
+        raise ReleaseExceedsCapacity(remaining)
+    return remaining
+
+
+def return_seats(flight_id, seats, now=None):
+    """
+    Return seats from abandoned holds, capping at total_seats instead of failing.
+
+    Used by the hold sweeper, which batches its own change notifications.
+    """
+    if _hot_apply(flight_id, seats, 'give') is not None:
+        return
+    Flight.objects.filter(pk=flight_id).update(
+        available_seats=Least(F('available_seats') + seats, F('total_seats')),
+        updated_at=now or timezone.now(),
+    )
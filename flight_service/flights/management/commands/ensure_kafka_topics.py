@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.outbox import DEFAULT_TOPIC
+
+
+class Command(BaseCommand):
+    help = 'Create the event topic, or add partitions to it, so it has KAFKA_TOPIC_PARTITIONS partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=None)
+        parser.add_argument('--replication-factor', type=int, default=1)
+
+    def handle(self, *args, **options):
+        from confluent_kafka.admin import AdminClient, NewPartitions, NewTopic
+
+        partitions = options['partitions'] or settings.KAFKA_TOPIC_PARTITIONS
+        admin = AdminClient({"bootstrap.servers": ",".join(settings.KAFKA_BROKERS)})
+        topic = admin.list_topics(timeout=10).topics.get(DEFAULT_TOPIC)
+
+        if topic is None or topic.error is not None:
+            futures = admin.create_topics([NewTopic(
+                DEFAULT_TOPIC, num_partitions=partitions, replication_factor=options['replication_factor'],
+            )])
+            action = f'Created {DEFAULT_TOPIC} with {partitions} partitions'
+        elif len(topic.partitions) < partitions:
+            # Existing keys move partition, so in-flight ordering only holds from here on
+            futures = admin.create_partitions([NewPartitions(DEFAULT_TOPIC, partitions)])
+            action = f'Grew {DEFAULT_TOPIC} from {len(topic.partitions)} to {partitions} partitions'
+        else:
+            self.stdout.write(f'{DEFAULT_TOPIC} already has {len(topic.partitions)} partitions')
+            return
+
+        for future in futures.values():
+            try:
+                future.result()
+            except Exception as e:
+                raise CommandError(f'{action} failed: {e}')
+        self.stdout.write(self.style.SUCCESS(action))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from flights.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Release seats held by expired seat holds, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when there is nothing left to expire')
+        parser.add_argument('--once', action='store_true', help='Drain overdue holds once and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(self.style.SUCCESS('Starting seat hold sweeper...'))
+        while True:
+            total = 0
+            while True:
+                expired = expire_holds(batch_size=batch_size)
+                total += expired
+                if expired < batch_size:
+                    break
+            if total:
+                self.stdout.write(f'Expired {total} seat holds')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
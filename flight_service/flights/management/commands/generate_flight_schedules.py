@@ -0,0 +1,27 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.models import FlightSchedule
+from flights.schedules import generate, generate_all
+
+
+class Command(BaseCommand):
+    help = 'Generate dated flights from schedules over the rolling horizon (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', help='Only this schedule id')
+        parser.add_argument('--horizon-days', type=int, default=None,
+                            help='Days ahead to generate (default FLIGHT_SCHEDULE_HORIZON_DAYS)')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            try:
+                schedule = FlightSchedule.objects.get(pk=options['schedule'])
+            except (FlightSchedule.DoesNotExist, ValidationError):
+                raise CommandError(f"Schedule {options['schedule']} not found")
+            result = generate(schedule, horizon_days=options['horizon_days'])
+        else:
+            result = generate_all(horizon_days=options['horizon_days'])
+        self.stdout.write(self.style.SUCCESS(
+            'Flights created: {created}, updated: {updated}, removed: {removed}, cancelled: {cancelled}'.format(**result)
+        ))
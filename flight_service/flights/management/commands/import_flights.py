@@ -0,0 +1,41 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.importer import DEFAULT_CHUNK_SIZE, FORMATS, PARSERS, import_flights
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import flights from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate rows without saving them')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or FORMATS.get(path.rsplit('.', 1)[-1].lower())
+        if input_format is None:
+            raise CommandError('Cannot tell the input format from the file name; pass --format')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = import_flights(
+                PARSERS[input_format](stream),
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result['created']} flights, {result['failed']} rows failed"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from flights.search_rows import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Re-project every flight into the search table (FlightSearchRow)'
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search rows for {count} flights'))
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from flights import hot_inventory
+
+
+class Command(BaseCommand):
+    help = 'Write hot-flight seat counts back to Postgres in coalesced batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Seconds between flushes (default HOT_INVENTORY_FLUSH_INTERVAL)')
+
+    def handle(self, *args, **options):
+        if hot_inventory.get_seat_store() is None:
+            raise CommandError('HOT_INVENTORY_STORE is not configured')
+        interval = options['interval'] or settings.HOT_INVENTORY_FLUSH_INTERVAL
+
+        reconciled = hot_inventory.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Inventory writer started, reconciled {reconciled} hot flights'))
+        while True:
+            try:
+                while hot_inventory.flush(batch_size=options['batch_size']) == options['batch_size']:
+                    pass
+            except Exception as e:
+                self.stderr.write(f'Inventory flush failed: {e}')
+            time.sleep(interval)
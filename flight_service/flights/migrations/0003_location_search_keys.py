@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-17 17:31
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def populate_search_keys(apps, schema_editor):
+    # Historical models don't run Location.save(), so normalize inline.
+    Location = apps.get_model('flights', 'Location')
+    for location in Location.objects.all():
+        city = unicodedata.normalize('NFKD', location.city or '')
+        city = ''.join(ch for ch in city if not unicodedata.combining(ch))
+        location.airport_code_key = (location.airport_code or '').strip().upper()
+        location.city_key = ' '.join(city.casefold().split())
+        location.save(update_fields=['airport_code_key', 'city_key'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Substring city matches (`LIKE '%term%'`) need pg_trgm; other backends just scan.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS location_city_key_trgm_idx '
+        'ON flights_location USING gin (city_key gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS location_city_key_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0002_flight_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='airport_code_key',
+            field=models.CharField(default='', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='city_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flight_departure_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_location', 'departure_time'], name='flight_origin_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['arrival_location', 'departure_time'], name='flight_destination_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['airport_code_key'], name='location_code_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['city_key'], name='location_city_key_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0004_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='hot_inventory',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-17 17:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0005_flight_hot_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='service_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64),
+        ),
+        migrations.CreateModel(
+            name='FlightSchedule',
+            fields=[
+                ('schedule_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('flight_number', models.CharField(max_length=50)),
+                ('days_of_week', models.CharField(max_length=7)),
+                ('departure_local_time', models.TimeField()),
+                ('arrival_local_time', models.TimeField()),
+                ('arrival_day_offset', models.PositiveSmallIntegerField(default=0)),
+                ('valid_from', models.DateField()),
+                ('valid_until', models.DateField()),
+                ('total_seats', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('generated_until', models.DateField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('arrival_location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='scheduled_arrivals', to='flights.location')),
+                ('departure_location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='scheduled_departures', to='flights.location')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flights', to='flights.flightschedule'),
+        ),
+        migrations.AddConstraint(
+            model_name='flight',
+            constraint=models.UniqueConstraint(condition=models.Q(('schedule__isnull', False)), fields=('schedule', 'service_date'), name='flight_schedule_service_date_uniq'),
+        ),
+    ]
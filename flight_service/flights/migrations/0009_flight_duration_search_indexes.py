@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-17 18:30
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0008_outboxevent_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='duration',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('arrival_time'), '-', models.F('departure_time')), output_field=models.DurationField()),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_location', 'arrival_location', 'departure_time'], name='flight_route_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['price', 'flight_id'], name='flight_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_location', 'price', 'flight_id'], name='flight_origin_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['arrival_location', 'price', 'flight_id'], name='flight_dest_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['duration', 'flight_id'], name='flight_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_location', 'duration', 'flight_id'], name='flight_origin_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['arrival_location', 'duration', 'flight_id'], name='flight_dest_duration_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-17 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0009_flight_duration_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatMap',
+            fields=[
+                ('flight', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seat_map', serialize=False, to='flights.flight')),
+                ('columns', models.CharField(max_length=20)),
+                ('rows', models.PositiveSmallIntegerField()),
+                ('first_row', models.PositiveSmallIntegerField(default=1)),
+                ('occupied', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-17 19:40
+
+import datetime
+import zoneinfo
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_search_rows(apps, schema_editor):
+    # Historical models can't use flights.search_rows, so project inline.
+    Flight = apps.get_model('flights', 'Flight')
+    FlightSearchRow = apps.get_model('flights', 'FlightSearchRow')
+    zones = {}
+    rows = []
+    for flight in Flight.objects.select_related('departure_location').iterator(chunk_size=1000):
+        name = flight.departure_location.timezone
+        if name not in zones:
+            try:
+                zones[name] = zoneinfo.ZoneInfo(name)
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                zones[name] = datetime.timezone.utc
+        rows.append(FlightSearchRow(
+            flight_id=flight.flight_id,
+            flight_number=flight.flight_number,
+            departure_location_id=flight.departure_location_id,
+            arrival_location_id=flight.arrival_location_id,
+            departure_time=flight.departure_time,
+            arrival_time=flight.arrival_time,
+            duration=flight.arrival_time - flight.departure_time,
+            departure_date=flight.departure_time.astimezone(zones[name]).date(),
+            total_seats=flight.total_seats,
+            available_seats=flight.available_seats,
+            price=flight.price,
+            status=flight.status,
+            created_at=flight.created_at,
+            updated_at=flight.updated_at,
+        ))
+        if len(rows) >= 1000:
+            FlightSearchRow.objects.bulk_create(rows)
+            rows = []
+    FlightSearchRow.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0010_seatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightSearchRow',
+            fields=[
+                ('flight', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_row', serialize=False, to='flights.flight')),
+                ('flight_number', models.CharField(max_length=50)),
+                ('departure_time', models.DateTimeField()),
+                ('arrival_time', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('departure_date', models.DateField()),
+                ('total_seats', models.IntegerField()),
+                ('available_seats', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('arrival_location', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='flights.location')),
+                ('departure_location', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='flights.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['departure_time', 'flight'], name='fsr_time_idx'), models.Index(fields=['departure_location', 'departure_time'], name='fsr_origin_time_idx'), models.Index(fields=['arrival_location', 'departure_time'], name='fsr_dest_time_idx'), models.Index(fields=['departure_location', 'arrival_location', 'departure_time'], name='fsr_route_time_idx'), models.Index(fields=['departure_location', 'departure_date'], name='fsr_origin_date_idx'), models.Index(fields=['price', 'flight'], name='fsr_price_idx'), models.Index(fields=['departure_location', 'price', 'flight'], name='fsr_origin_price_idx'), models.Index(fields=['arrival_location', 'price', 'flight'], name='fsr_dest_price_idx'), models.Index(fields=['duration', 'flight'], name='fsr_duration_idx'), models.Index(fields=['departure_location', 'duration', 'flight'], name='fsr_origin_duration_idx'), models.Index(fields=['arrival_location', 'duration', 'flight'], name='fsr_dest_duration_idx')],
+            },
+        ),
+        migrations.RunPython(populate_search_rows, migrations.RunPython.noop),
+    ]
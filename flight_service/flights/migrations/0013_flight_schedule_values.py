@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0012_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='schedule_values',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
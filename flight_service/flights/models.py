@@ -1,16 +1,97 @@
 import uuid
+import unicodedata
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+
+def normalize_airport_code(value):
+    """Canonical form of an airport code used for exact, index-backed lookups."""
+    return (value or '').strip().upper()
+
+
+def normalize_city(value):
+    """Canonical form of a city name: accent-free, case-folded, single-spaced."""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.casefold().split())
+
+
 class Location(models.Model):
     location_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     airport_code = models.CharField(max_length=10, unique=True)
     city = models.CharField(max_length=255)
     country = models.CharField(max_length=255)
+    # IANA zone name; schedule local times are interpreted in it (see flights.schedules)
+    timezone = models.CharField(max_length=64, default='UTC')
+    # WGS 84 degrees, optional; used for nearby-airport search (see flights.nearby)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+
+    # Normalized search keys, maintained on save (see flights.search)
+    airport_code_key = models.CharField(max_length=10, editable=False, default='')
+    city_key = models.CharField(max_length=255, editable=False, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['airport_code_key'], name='location_code_key_idx'),
+            # varchar_pattern_ops lets Postgres serve `LIKE 'prefix%'` from a btree
+            models.Index(fields=['city_key'], name='location_city_key_prefix_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.airport_code_key = normalize_airport_code(self.airport_code)
+        self.city_key = normalize_city(self.city)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'airport_code' in update_fields:
+                update_fields.add('airport_code_key')
+            if 'city' in update_fields:
+                update_fields.add('city_key')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.airport_code} - {self.name}"
 
+
+class FlightSchedule(models.Model):
+    """A recurring flight; dated Flight rows are generated from it by flights.schedules."""
+    schedule_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    flight_number = models.CharField(max_length=50)
+
+    departure_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name='scheduled_departures'
+    )
+    arrival_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name='scheduled_arrivals'
+    )
+
+    # ISO weekdays the flight operates, e.g. "135" for Monday, Wednesday, Friday
+    days_of_week = models.CharField(max_length=7)
+    # Local to the departure / arrival airport respectively
+    departure_local_time = models.TimeField()
+    arrival_local_time = models.TimeField()
+    arrival_day_offset = models.PositiveSmallIntegerField(default=0)
+
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+
+    total_seats = models.IntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    is_active = models.BooleanField(default=True)
+
+    # Last service date materialized by the generator
+    generated_until = models.DateField(null=True, blank=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.flight_number} ({self.days_of_week}, {self.valid_from} - {self.valid_until})"
+
 class Flight(models.Model):
     STATUS_CHOICES = [
         ('scheduled', 'Scheduled'),
@@ -32,6 +113,11 @@ class Flight(models.Model):
     
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    duration = models.GeneratedField(
+        expression=models.F('arrival_time') - models.F('departure_time'),
+        output_field=models.DurationField(),
+        db_persist=True,
+    )
     
     total_seats = models.IntegerField()
     available_seats = models.IntegerField()
@@ -39,9 +125,159 @@ class Flight(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+
+    # Seat counts live in the hot inventory store and are written back in batches
+    # (see flights.hot_inventory)
+    hot_inventory = models.BooleanField(default=False)
+
+    # Set on flights generated from a FlightSchedule
+    schedule = models.ForeignKey(
+        FlightSchedule, on_delete=models.SET_NULL, null=True, blank=True, related_name='flights'
+    )
+    service_date = models.DateField(null=True, blank=True)
+    # The schedule's values for this date when last generated, so regeneration
+    # can tell a schedule change from an edit made to the flight itself
+    schedule_values = models.JSONField(null=True, blank=True, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['departure_time'], name='flight_departure_time_idx'),
+            models.Index(fields=['departure_location', 'departure_time'], name='flight_origin_time_idx'),
+            models.Index(fields=['arrival_location', 'departure_time'], name='flight_destination_time_idx'),
+            # Search sort orders (flights.search.SORTS), unfiltered and per origin or
+            # destination, ending in flight_id so keyset pages are index range scans.
+            # Date searches use the *_time_idx indexes and sort one day of flights.
+            models.Index(fields=['departure_location', 'arrival_location', 'departure_time'], name='flight_route_time_idx'),
+            models.Index(fields=['price', 'flight_id'], name='flight_price_idx'),
+            models.Index(fields=['departure_location', 'price', 'flight_id'], name='flight_origin_price_idx'),
+            models.Index(fields=['arrival_location', 'price', 'flight_id'], name='flight_dest_price_idx'),
+            models.Index(fields=['duration', 'flight_id'], name='flight_duration_idx'),
+            models.Index(fields=['departure_location', 'duration', 'flight_id'], name='flight_origin_duration_idx'),
+            models.Index(fields=['arrival_location', 'duration', 'flight_id'], name='flight_dest_duration_idx'),
+        ]
+        constraints = [
+            # One generated flight per schedule and day keeps regeneration idempotent
+            models.UniqueConstraint(fields=['schedule', 'service_date'], name='flight_schedule_service_date_uniq',
+                                    condition=models.Q(schedule__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_number} ({self.departure_location.airport_code} -> {self.arrival_location.airport_code})"
+
+
+class FlightSearchRow(models.Model):
+    """
+    Flattened copy of a flight for the public search (see flights.search_rows).
+
+    Rewritten in the same transaction as every change to its flight, so a
+    search page is one indexed read of this table with nothing to join.
+    """
+    flight = models.OneToOneField(Flight, on_delete=models.CASCADE, primary_key=True, related_name='search_row')
+    flight_number = models.CharField(max_length=50)
+    departure_location = models.ForeignKey(
+        Location, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    arrival_location = models.ForeignKey(
+        Location, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    departure_time = models.DateTimeField()
+    arrival_time = models.DateTimeField()
+    duration = models.DurationField()
+    # Calendar date of departure in the departure airport's time zone
+    departure_date = models.DateField()
+    total_seats = models.IntegerField()
+    available_seats = models.IntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The search access paths of Flight.Meta.indexes, plus the local departure date
+            models.Index(fields=['departure_time', 'flight'], name='fsr_time_idx'),
+            models.Index(fields=['departure_location', 'departure_time'], name='fsr_origin_time_idx'),
+            models.Index(fields=['arrival_location', 'departure_time'], name='fsr_dest_time_idx'),
+            models.Index(fields=['departure_location', 'arrival_location', 'departure_time'], name='fsr_route_time_idx'),
+            models.Index(fields=['departure_location', 'departure_date'], name='fsr_origin_date_idx'),
+            models.Index(fields=['price', 'flight'], name='fsr_price_idx'),
+            models.Index(fields=['departure_location', 'price', 'flight'], name='fsr_origin_price_idx'),
+            models.Index(fields=['arrival_location', 'price', 'flight'], name='fsr_dest_price_idx'),
+            models.Index(fields=['duration', 'flight'], name='fsr_duration_idx'),
+            models.Index(fields=['departure_location', 'duration', 'flight'], name='fsr_origin_duration_idx'),
+            models.Index(fields=['arrival_location', 'duration', 'flight'], name='fsr_dest_duration_idx'),
+        ]
+
+    def __str__(self):
+        return f"Search row of {self.flight_number} ({self.flight_id})"
+
+
+class SeatMap(models.Model):
+    """
+    Cabin layout of a flight and which of its seats are taken (see flights.seatmaps).
+
+    Seats are numbered row by row from `first_row`; bit n of `occupied` is set
+    while seat n is taken, so a whole cabin is one small row.
+    """
+    flight = models.OneToOneField(Flight, on_delete=models.CASCADE, primary_key=True, related_name='seat_map')
+    # Seat letters of one row, with '-' for each aisle, e.g. 'ABC-DEF'
+    columns = models.CharField(max_length=20)
+    rows = models.PositiveSmallIntegerField()
+    first_row = models.PositiveSmallIntegerField(default=1)
+    occupied = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Seat map of {self.flight_id} ({self.rows} x {self.columns})"
+
+
+class SeatHold(models.Model):
+    """Seats taken from a flight's availability for a limited time during checkout."""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+
+    hold_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='holds')
+    seats = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Only active holds are ever swept, so keep the index to those rows
+            models.Index(fields=['expires_at'], name='seathold_active_expiry_idx',
+                         condition=models.Q(status='active')),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.hold_id} - {self.seats} seats ({self.status})"
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event waiting to be relayed to Kafka (see flights.outbox).
+
+    Written in the same transaction as the change it describes and deleted
+    once the broker has acknowledged it.
+    """
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=100)
+    # Kafka message key; events for the same entity share a key and a partition
+    key = models.CharField(max_length=100, blank=True, default='')
+    idempotency_key = models.UUIDField(default=uuid.uuid4)
+    payload = models.JSONField()
+    # Trace context captured when the event was recorded
+    headers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
-        return f"{self.flight_number} ({self.departure_location.airport_code} -> {self.arrival_location.airport_code})"
\ No newline at end of file
+        return f"{self.event_type} ({self.idempotency_key})"
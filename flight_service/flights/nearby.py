@@ -0,0 +1,90 @@
+"""
+Nearby-airport lookups from an in-memory grid.
+
+Locations with coordinates are bucketed into CELL_DEGREES x CELL_DEGREES
+cells, so "every airport within r km" reads only the cells overlapping the
+circle's bounding box and checks great-circle distances for those. Like the
+autocomplete index (see flights.suggest) the grid is rebuilt from the
+location map whenever that reloads, i.e. after any location change.
+"""
+import math
+import threading
+import uuid
+
+from .fast_read import location_map
+
+CELL_DEGREES = 1.0
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+LONGITUDE_CELLS = round(360 / CELL_DEGREES)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _cell(latitude, longitude):
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES) % LONGITUDE_CELLS
+
+
+class NearbyIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None
+        # (row, column) -> [(location id, latitude, longitude)]
+        self._cells = {}
+
+    def _grid(self):
+        locations = location_map.get()
+        if locations is not self._source:
+            cells = {}
+            for pk, location in locations.items():
+                if location['latitude'] is not None and location['longitude'] is not None:
+                    cells.setdefault(_cell(location['latitude'], location['longitude']), []).append(
+                        (pk, location['latitude'], location['longitude'])
+                    )
+            with self._lock:
+                self._cells = cells
+                self._source = locations
+        return locations, self._cells
+
+    def within(self, location_ids, radius_km):
+        """
+        Ids of the given locations and of every location within `radius_km`
+        of any of them that has coordinates.
+        """
+        locations, cells = self._grid()
+        found = {str(pk) for pk in location_ids}
+        for pk in location_ids:
+            center = locations.get(uuid.UUID(str(pk)))
+            if center is None or center['latitude'] is None or center['longitude'] is None:
+                continue
+            found.update(str(near) for near in self._around(cells, center['latitude'], center['longitude'], radius_km))
+        return sorted(found)
+
+    def _around(self, cells, latitude, longitude, radius_km):
+        span = radius_km / KM_PER_DEGREE
+        low = math.floor(max(-90.0, latitude - span) / CELL_DEGREES)
+        high = math.floor(min(90.0, latitude + span) / CELL_DEGREES)
+        # A degree of longitude shrinks towards the poles; this bound is widest
+        # at the box's poleward edge, and near a pole every column is in range.
+        widest = abs(latitude) + span
+        lon_span = span / math.cos(math.radians(widest)) if widest < 90 else 180
+        if lon_span >= 180:
+            columns = range(LONGITUDE_CELLS)
+        else:
+            first = math.floor((longitude - lon_span) / CELL_DEGREES)
+            last = math.floor((longitude + lon_span) / CELL_DEGREES)
+            columns = {column % LONGITUDE_CELLS for column in range(first, last + 1)}
+        for row in range(low, high + 1):
+            for column in columns:
+                for pk, lat, lon in cells.get((row, column), ()):
+                    if distance_km(latitude, longitude, lat, lon) <= radius_km:
+                        yield pk
+
+
+nearby_index = NearbyIndex()
@@ -0,0 +1,116 @@
+"""
+Bulk flight status changes for irregular operations (delays, cancellations, boarding).
+
+Flights are selected and locked in one query and changed with one UPDATE.
+The change is announced as `<event>_batch` messages, grouped by the Kafka
+partition of the flights' event keys, each carrying up to EVENT_BATCH_SIZE
+per-flight event bodies. The booking
+service expands batches back into the per-flight events the notification
+service consumes.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .fast_read import location_map
+from .models import Flight
+from .outbox import flight_event_key, key_partition, publish_event
+from .signals import notify_flights_changed
+
+# Statuses a flight may move from, per target status
+ALLOWED_FROM = {
+    'delayed': ('scheduled', 'delayed', 'boarding'),
+    'cancelled': ('scheduled', 'delayed', 'boarding'),
+    'boarding': ('scheduled', 'delayed'),
+}
+EVENT_BATCH_SIZE = 500
+BATCH_SUFFIX = '_batch'
+
+
+def change_status(new_status, flight_ids=None, departure_location_id=None,
+                  departure_from=None, departure_until=None, delay=None):
+    """
+    Move the selected flights to `new_status`; `delay` (a timedelta) shifts
+    both departure and arrival times and is required for 'delayed'.
+
+    Flights are selected by id and/or by departure airport and departure
+    window; those not in an ALLOWED_FROM status are left alone. Returns the
+    ids of the flights changed.
+    """
+    if (new_status == 'delayed') != (delay is not None):
+        raise ValueError("A delay is required for, and only for, the 'delayed' status")
+
+    now = timezone.now()
+    with transaction.atomic():
+        flights = Flight.objects.select_for_update().filter(status__in=ALLOWED_FROM[new_status])
+        if flight_ids is not None:
+            flights = flights.filter(pk__in=flight_ids)
+        if departure_location_id is not None:
+            flights = flights.filter(departure_location_id=departure_location_id)
+        if departure_from is not None:
+            flights = flights.filter(departure_time__gte=departure_from)
+        if departure_until is not None:
+            flights = flights.filter(departure_time__lt=departure_until)
+        rows = list(flights.values(
+            'flight_id', 'flight_number', 'departure_location_id', 'arrival_location_id',
+            'departure_time', 'arrival_time',
+        ))
+        if not rows:
+            return []
+
+        updates = {'status': new_status, 'updated_at': now}
+        if delay is not None:
+            updates.update(departure_time=F('departure_time') + delay, arrival_time=F('arrival_time') + delay)
+        Flight.objects.filter(pk__in=[row['flight_id'] for row in rows]).update(**updates)
+
+        notify_flights_changed(
+            [(row['flight_id'], row['departure_location_id'], row['arrival_location_id']) for row in rows]
+        )
+        publish_batches(f'flight_{new_status}', _event_bodies(rows, new_status, delay))
+    return [row['flight_id'] for row in rows]
+
+
+def _event_bodies(rows, new_status, delay):
+    """Per-flight bodies in the shape AdminFlightViewSet publishes for single updates."""
+    locations = location_map.get()
+    if any(row[field] not in locations for row in rows for field in ('departure_location_id', 'arrival_location_id')):
+        locations = location_map.reload()
+    timestamp = datetime.datetime.now().isoformat()
+    bodies = []
+    for row in rows:
+        departure_time, arrival_time = row['departure_time'], row['arrival_time']
+        body = {
+            "flight_id": str(row['flight_id']),
+            "flight_number": row['flight_number'],
+            "departure_location": locations[row['departure_location_id']]['airport_code'],
+            "arrival_location": locations[row['arrival_location_id']]['airport_code'],
+            "status": new_status,
+            "timestamp": timestamp,
+        }
+        if delay is not None:
+            body["old_departure_time"] = departure_time.isoformat()
+            departure_time, arrival_time = departure_time + delay, arrival_time + delay
+            body["new_departure_time"] = departure_time.isoformat()
+        body["departure_time"] = departure_time.isoformat()
+        body["arrival_time"] = arrival_time.isoformat()
+        bodies.append(body)
+    return bodies
+
+
+def publish_batches(event_type, bodies):
+    # One run of batches per partition, keyed with the key of one of its
+    # flights, so each batch shares a partition with the single-flight events
+    # of every flight in it and a partition gets ceil(n / EVENT_BATCH_SIZE)
+    # messages however many key buckets there are.
+    by_partition = {}
+    for body in bodies:
+        key = flight_event_key(body["flight_id"])
+        by_partition.setdefault(key_partition(key), (key, []))[1].append(body)
+    for key, partition_bodies in by_partition.values():
+        for start in range(0, len(partition_bodies), EVENT_BATCH_SIZE):
+            publish_event(event_type + BATCH_SUFFIX, {
+                "flights": partition_bodies[start:start + EVENT_BATCH_SIZE],
+                "timestamp": datetime.datetime.now().isoformat(),
+            }, key=key)
@@ -0,0 +1,130 @@
+"""
+Transactional outbox for flight domain events.
+
+`publish_event` records the event as an OutboxEvent row in the caller's
+transaction, so an event exists if and only if the change it describes was
+committed. The `relay_outbox` command drains the table to Kafka in id order,
+in batches, and deletes each batch only after every message in it has been
+acknowledged (at-least-once; consumers deduplicate on `idempotency_key`).
+
+Events about a flight are keyed by `flight_event_key`, a hash bucket of the
+flight id, so every event for one flight lands on the same partition and is
+consumed in order. Bucketing rather than keying by the raw id lets a bulk
+status change be split into one batch message per bucket without losing that
+ordering against single-flight events.
+"""
+import functools
+import logging
+import time
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from opentelemetry.propagate import inject
+from prometheus_client import Counter, Gauge, Histogram
+
+from .codec import encode_event
+from .models import OutboxEvent
+from .producer import producer_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOPIC = 'flight_events'
+
+EVENTS_RELAYED = Counter('outbox_events_relayed_total', 'Outbox events acknowledged by Kafka', ['topic'])
+RELAY_FAILURES = Counter('outbox_relay_failures_total', 'Outbox batches that failed and will be retried')
+RELAY_BATCH_SECONDS = Histogram('outbox_relay_batch_seconds', 'Time to relay one outbox batch')
+RELAY_BATCH_SIZE = Histogram(
+    'outbox_relay_batch_size', 'Events sent per outbox batch', buckets=(1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+DELIVERY_SECONDS = Histogram(
+    'outbox_delivery_seconds', 'Time from an event being recorded to its acknowledgement by Kafka',
+)
+BACKLOG = Gauge('outbox_backlog', 'Outbox events waiting to be relayed')
+
+
+class RelayError(Exception):
+    pass
+
+
+def flight_event_key(flight_id):
+    bucket = zlib.crc32(str(flight_id).encode('utf-8')) % settings.FLIGHT_EVENT_KEY_BUCKETS
+    return f'flight-{bucket}'
+
+
+def key_partition(key):
+    """The partition Kafka sends `key` to, per the producer's consistent_random (CRC32) partitioner."""
+    return zlib.crc32(key.encode('utf-8')) % settings.KAFKA_TOPIC_PARTITIONS
+
+
+def publish_event(event_type, body, exchange=DEFAULT_TOPIC, key=None):
+    """
+    Record an event for delivery once the current transaction commits. The
+    Kafka key defaults to the flight's key when the body names a flight.
+    """
+    if key is None and body.get('flight_id'):
+        key = flight_event_key(body['flight_id'])
+    headers = {}
+    inject(headers)
+    OutboxEvent.objects.create(
+        topic=exchange, event_type=event_type, key=key or '', payload=body, headers=headers,
+    )
+
+
+def create_producer():
+    from confluent_kafka import Producer
+    return Producer(producer_config())
+
+
+def encode(event):
+    """Kafka (value, key, headers) for an outbox row."""
+    value = encode_event(event.event_type, event.idempotency_key, event.payload)
+    headers = [(k, str(v).encode('utf-8')) for k, v in event.headers.items()]
+    # Events that are not about one entity fall back to their type as the key
+    return value, (event.key or event.event_type).encode('utf-8'), headers
+
+
+def relay_batch(producer, batch_size=500, timeout=30):
+    """
+    Send the oldest `batch_size` events and delete them once all are acknowledged.
+
+    Rows stay locked while the batch is in flight, so concurrent relays queue
+    behind each other instead of reordering events. Returns the number relayed;
+    raises RelayError (leaving the batch in place) if any delivery fails.
+    """
+    started = time.monotonic()
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update().order_by('id')[:batch_size])
+        if not events:
+            return 0
+        RELAY_BATCH_SIZE.observe(len(events))
+
+        failures = []
+
+        def delivered(created_at, err, msg):
+            if err is not None:
+                failures.append(err)
+            else:
+                DELIVERY_SECONDS.observe(max(0.0, (timezone.now() - created_at).total_seconds()))
+
+        for event in events:
+            value, key, headers = encode(event)
+            producer.produce(event.topic, value=value, key=key, headers=headers,
+                             on_delivery=functools.partial(delivered, event.created_at))
+            producer.poll(0)
+        pending = producer.flush(timeout)
+        if failures or pending:
+            RELAY_FAILURES.inc()
+            raise RelayError(f"{len(failures)} failed and {pending} unacknowledged of {len(events)} events")
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+
+    for event in events:
+        EVENTS_RELAYED.labels(topic=event.topic).inc()
+    RELAY_BATCH_SECONDS.observe(time.monotonic() - started)
+    return len(events)
+
+
+def update_backlog():
+    BACKLOG.set(OutboxEvent.objects.count())
@@ -0,0 +1,156 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class FlightKeysetPagination(BasePagination):
+    """
+    Opaque keyset (seek) pagination over a unique ordering.
+
+    The cursor carries the ordering values of the row at the page boundary, so
+    the next page is `WHERE (departure_time, flight_id) > (...)` rather than an
+    OFFSET. Pages therefore stay stable when flights are inserted before the
+    cursor or delayed, and each page is a bounded index range scan.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # The last field must be unique so the ordering is total.
+    ordering = ('departure_time', 'flight_id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'FLIGHT_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'FLIGHT_MAX_PAGE_SIZE', 500)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        def fetch(fields, values, reverse, limit):
+            rows = queryset.order_by(*[('-' if desc != reverse else '') + name for name, desc in fields])
+            if values is not None:
+                rows = rows.filter(self._after(values, reverse))
+            return list(rows[:limit])
+        return self.paginate_fetch(fetch, queryset.model, request, view)
+
+    def paginate_fetch(self, fetch, model, request, view=None):
+        """
+        Paginate rows from any source that can seek: `fetch(fields, values,
+        reverse, limit)` returns up to `limit` rows strictly after `values` in
+        the ordering `fields` ([(name, descending)], flipped when `reverse`).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.get_ordering(request, None, view)
+        ]
+        self.model_fields = {name: model._meta.get_field(name) for name, _ in self.fields}
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        values, reverse = self.decode_cursor(encoded) if encoded else (None, False)
+
+        rows = fetch(self.fields, values, reverse, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_values = self.previous_values = None
+        if rows:
+            if has_more or reverse:
+                self.next_values = self._values(rows[-1])
+            if (has_more and reverse) or (encoded and not reverse):
+                self.previous_values = self._values(rows[0])
+        elif reverse and values is not None:
+            self.next_values = values
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.next_values, False))
+
+    def get_previous_link(self):
+        if self.previous_values is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.previous_values, True))
+
+    def _values(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.fields]
+        return [getattr(row, self.model_fields[name].attname) for name, _ in self.fields]
+
+    def _after(self, values, reverse):
+        """Lexicographic "strictly after `values`" condition for the ordering."""
+        condition = Q()
+        equal = {}
+        for (name, desc), value in zip(self.fields, values):
+            lookup = 'lt' if desc != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, values, reverse):
+        payload = {'k': [_to_json(value) for value in values]}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, encoded):
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            keys = payload['k']
+            if len(keys) != len(self.fields):
+                raise ValueError(keys)
+            values = [_to_python(self.model_fields[name], key) for (name, _), key in zip(self.fields, keys)]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+
+def _to_python(field, value):
+    # Generated fields (Flight.duration) convert through their output field
+    return getattr(field, 'output_field', field).to_python(value)
+
+
+def _to_json(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    return str(value)
@@ -0,0 +1,26 @@
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_url = None
+
+
+def get_redis():
+    """
+    Shared Redis client for the flight service, or None when REDIS_URL is unset.
+
+    Callers must treat Redis as optional and fall back to local state/Postgres
+    when it is not configured or unreachable.
+    """
+    global _client, _client_url
+    url = getattr(settings, 'REDIS_URL', None)
+    if not url:
+        return None
+    if _client is None or _client_url != url:
+        import redis
+        _client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        _client_url = url
+    return _client
@@ -0,0 +1,191 @@
+"""
+Read-replica routing.
+
+Replicas are configured with DATABASE_REPLICA_URLS and are only used inside
+`replica_reads()`, which views enter for their read-only actions (see
+ReplicaReadMixin). Everything else, including every write, every
+select_for_update and every query inside a transaction, goes to the primary.
+
+A replica is skipped while its measured lag exceeds
+DATABASE_REPLICA_MAX_LAG_SECONDS. Any request that writes sets a short-lived
+pin cookie, and for that long the client's reads also go to the primary, so
+users see their own writes even on a replica that is within the lag limit
+but has not replayed them yet.
+"""
+import contextlib
+import contextvars
+import logging
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+# Seconds behind the primary; 0 when the replica has replayed everything it received
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+_wrote = contextvars.ContextVar('wrote_to_primary', default=False)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+@contextlib.contextmanager
+def replica_reads(enabled=True):
+    """Route reads in this block to a replica, unless the client is pinned to the primary."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaLag:
+    """Per-replica lag, measured at most every DATABASE_REPLICA_LAG_CHECK_SECONDS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # alias -> (checked_at, lag seconds, or None if the replica is unreachable)
+        self._lags = {}
+
+    def usable(self, aliases):
+        max_lag = settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+        return [alias for alias in aliases if (lag := self.lag(alias)) is not None and lag <= max_lag]
+
+    def lag(self, alias):
+        now = time.monotonic()
+        checked_at, lag = self._lags.get(alias, (None, None))
+        if checked_at is not None and now - checked_at < settings.DATABASE_REPLICA_LAG_CHECK_SECONDS:
+            return lag
+        with self._lock:
+            checked_at, lag = self._lags.get(alias, (None, None))
+            if checked_at is None or now - checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_SECONDS:
+                lag = measure_lag(alias)
+                self._lags[alias] = (now, lag)
+        return lag
+
+
+def measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning("Replica %s lag check failed: %s", alias, e)
+        return None
+
+
+replica_lag = ReplicaLag()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or _pinned.get() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        replicas = replica_lag.usable(replica_aliases())
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinMiddleware:
+    """Pins a client to the primary for a while after any request of theirs that wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.DATABASE_REPLICA_PIN_COOKIE
+        pinned = _pinned.set(cookie in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() and replica_aliases():
+                response.set_cookie(
+                    cookie, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(pinned)
+
+
+class ReplicaReadMixin:
+    """Runs the viewset actions named in `replica_actions` inside `replica_reads()`."""
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        with replica_reads(action in self.replica_actions):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class DelayedCalls:
+    """
+    Callbacks run `delay` seconds after they are scheduled, in order, by one
+    daemon thread per process however many are waiting.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def schedule(self, delay, callback):
+        self._queue.put((time.monotonic() + delay, callback))
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='replica-lag-calls', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            # The delay is the same for every call, so the queue is in due order
+            due, callback = self._queue.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                callback()
+            except Exception:
+                logger.exception("Delayed replica-lag callback failed")
+
+
+_delayed_calls = DelayedCalls()
+
+
+def after_replica_lag(callback):
+    """
+    Run `callback` again once replicas have caught up, for caches that may
+    have been refilled from a replica that had not replayed a write yet.
+    """
+    if not replica_aliases():
+        return
+    _delayed_calls.schedule(settings.DATABASE_REPLICA_MAX_LAG_SECONDS, callback)
@@ -0,0 +1,244 @@
+"""
+Multi-leg connection search over an in-memory route graph.
+
+Each process keeps every bookable future flight as an edge between its
+departure and arrival Location, indexed per location by departure time, so a
+connection search is a bounded walk with bisect lookups instead of a series
+of origin/destination queries.
+
+The graph is loaded once and then kept current from flight change events:
+changes made in this process are applied through `flights_changed`, and their
+flight ids are also appended to a short Redis changelog that other processes
+replay (by re-reading just those flights) before they search. Without Redis
+the graph is process-local, which is all a single process needs.
+"""
+import bisect
+import datetime
+import logging
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Flight
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANGES_KEY = 'flights:routes:changes'
+# How long changelog entries are kept; a process that falls further behind reloads.
+CHANGES_RETENTION_SECONDS = 3600
+# Tolerance for clock skew between the processes writing the changelog
+CHANGES_SKEW_SECONDS = 5
+
+BOOKABLE_STATUSES = ('scheduled', 'delayed', 'boarding')
+EDGE_VALUES = (
+    'flight_id', 'departure_location_id', 'arrival_location_id', 'departure_time',
+    'arrival_time', 'available_seats', 'status',
+)
+
+# Upper bound on partial itineraries explored per search
+MAX_EXPANSIONS = 20000
+
+
+class Edge(NamedTuple):
+    flight_id: object
+    origin_id: object
+    destination_id: object
+    departure_time: datetime.datetime
+    arrival_time: datetime.datetime
+    available_seats: int
+    status: str
+
+
+def record_changes(flight_ids):
+    """Append changed flight ids to the shared changelog other processes replay."""
+    redis = get_redis()
+    if redis is None or not flight_ids:
+        return
+    now = time.time()
+    try:
+        pipe = redis.pipeline(transaction=False)
+        pipe.zadd(CHANGES_KEY, {str(flight_id): now for flight_id in flight_ids})
+        pipe.zremrangebyscore(CHANGES_KEY, '-inf', now - CHANGES_RETENTION_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Route changelog write failed: %s", e)
+
+
+class ChangelogSynced:
+    """
+    An in-memory flight index that is loaded once and then kept current by
+    replaying the shared changelog. Subclasses implement `load()`, which sets
+    `_loaded` and `_synced_at`, and `apply(flight_ids)`.
+    """
+    sync_setting = 'FLIGHT_ROUTE_GRAPH_SYNC_SECONDS'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._synced_at = 0.0
+
+    def sync(self):
+        """Load on first use, then replay the shared changelog (at most once per sync interval)."""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+                return
+            now = time.time()
+            interval = getattr(settings, self.sync_setting, 1.0)
+            if now - self._synced_at < interval:
+                return
+            redis = get_redis()
+            if redis is None:
+                self._synced_at = now
+                return
+            if now - self._synced_at > CHANGES_RETENTION_SECONDS - CHANGES_SKEW_SECONDS:
+                self.load()
+                return
+            try:
+                changed = redis.zrangebyscore(CHANGES_KEY, self._synced_at - CHANGES_SKEW_SECONDS, '+inf')
+            except Exception as e:
+                logger.warning("Flight changelog read failed: %s", e)
+                return
+            self._synced_at = now
+        # apply takes the lock itself, once it has read the changed flights
+        self.apply(changed)
+
+
+class RouteGraph(ChangelogSynced):
+    def __init__(self):
+        super().__init__()
+        self._edges = {}
+        # flight id string -> Edge, and location id -> sorted [(departure_time, flight id string)]
+        self._departures = {}
+
+    # -- maintenance -------------------------------------------------------
+
+    def load(self):
+        """Rebuild the whole graph from the database."""
+        started = time.time()
+        since = timezone.now() - datetime.timedelta(days=1)
+        rows = Flight.objects.filter(
+            departure_time__gte=since, status__in=BOOKABLE_STATUSES
+        ).values_list(*EDGE_VALUES).order_by('departure_location_id', 'departure_time', 'flight_id')
+
+        edges, departures = {}, {}
+        for row in rows.iterator(chunk_size=5000):
+            edge = _edge(row)
+            key = str(edge.flight_id)
+            edges[key] = edge
+            departures.setdefault(edge.origin_id, []).append((edge.departure_time, key))
+        with self._lock:
+            self._edges = edges
+            self._departures = departures
+            self._loaded = True
+            self._synced_at = started
+
+    def apply(self, flight_ids):
+        """Re-read the given flights and update, add or drop their edges."""
+        keys = {flight_key(flight_id) for flight_id in flight_ids}
+        if not keys:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            rows = Flight.objects.filter(pk__in=keys).values_list(*EDGE_VALUES)
+            current = {str(row[0]): _edge(row) for row in rows}
+            for key in keys:
+                self._remove(key)
+                edge = current.get(key)
+                if edge is not None and edge.status in BOOKABLE_STATUSES:
+                    self._add(edge)
+
+    def _add(self, edge):
+        departures = self._departures.setdefault(edge.origin_id, [])
+        bisect.insort(departures, (edge.departure_time, str(edge.flight_id)))
+        self._edges[str(edge.flight_id)] = edge
+
+    def _remove(self, key):
+        edge = self._edges.pop(key, None)
+        if edge is None:
+            return
+        departures = self._departures.get(edge.origin_id, [])
+        entry = (edge.departure_time, key)
+        index = bisect.bisect_left(departures, entry)
+        if index < len(departures) and departures[index] == entry:
+            departures.pop(index)
+
+    # -- search ------------------------------------------------------------
+
+    def departures(self, location_id, start, end):
+        """Edges leaving `location_id` with start <= departure_time < end."""
+        departures = self._departures.get(location_id, ())
+        index = bisect.bisect_left(departures, (start, ''))
+        while index < len(departures) and departures[index][0] < end:
+            yield self._edges[departures[index][1]]
+            index += 1
+
+    def connections(self, origin_ids, destination_ids, departure_from, departure_until,
+                    max_stops=2, seats=1, min_connection=None, max_connection=None, limit=50):
+        """
+        Itineraries (lists of edges) from any origin to any destination whose
+        first leg departs in [departure_from, departure_until), with at most
+        `max_stops` connections, each at least `min_connection` (and the
+        configured minimum) and at most `max_connection` long. Sorted by arrival, then duration and stops.
+        """
+        # Callers may ask for longer layovers, never shorter than the configured minimum
+        floor = datetime.timedelta(minutes=getattr(settings, 'FLIGHT_MIN_CONNECTION_MINUTES', 60))
+        min_connection = max(min_connection, floor) if min_connection else floor
+        max_connection = max_connection or datetime.timedelta(
+            minutes=getattr(settings, 'FLIGHT_MAX_CONNECTION_MINUTES', 720))
+        origin_ids = {_location_id(pk) for pk in origin_ids}
+        destination_ids = {_location_id(pk) for pk in destination_ids}
+
+        itineraries = []
+        expansions = 0
+        with self._lock:
+            # Depth-first with an explicit stack of partial itineraries
+            stack = [
+                [edge]
+                for origin_id in origin_ids
+                for edge in self.departures(origin_id, departure_from, departure_until)
+                if edge.available_seats >= seats
+            ]
+            while stack and expansions < MAX_EXPANSIONS:
+                path = stack.pop()
+                expansions += 1
+                last = path[-1]
+                if last.destination_id in destination_ids:
+                    itineraries.append(path)
+                    continue
+                if len(path) > max_stops:
+                    continue
+                visited = {leg.origin_id for leg in path}
+                for edge in self.departures(
+                        last.destination_id, last.arrival_time + min_connection, last.arrival_time + max_connection):
+                    if edge.available_seats >= seats and edge.destination_id not in visited:
+                        stack.append(path + [edge])
+
+        itineraries.sort(key=lambda path: (
+            path[-1].arrival_time, path[-1].arrival_time - path[0].departure_time, len(path)
+        ))
+        return itineraries[:limit]
+
+
+def _edge(row):
+    return Edge(*row)
+
+
+def flight_key(value):
+    """Edges are keyed by the canonical string form of their flight id."""
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return str(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+
+
+def _location_id(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+route_graph = RouteGraph()
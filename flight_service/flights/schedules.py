@@ -0,0 +1,273 @@
+"""
+Materialization of FlightSchedule templates into dated Flight rows.
+
+`generate` compares the dates a schedule should operate on inside the rolling
+horizon with the flights it has already generated, then applies only the
+difference: one `bulk_create` for new dates, one `bulk_update` for changed
+ones and one pass for dates that dropped out. Running it again with nothing
+changed writes nothing, and a daily run extends the horizon by a day.
+
+Each generated flight records the schedule's values for its date
+(`schedule_values`). A date is re-synced only when those values change, and
+then only the fields the flight still has at their old schedule value, so
+edits made to a flight by hand, such as a new price, survive regeneration.
+Delayed flights, departed flights and flights no longer `scheduled` are
+never re-synced. Flights with bookings keep their route, and a change of
+their times marks them `delayed` and publishes `flight_delayed` so
+passengers are told. A date that drops out of the schedule deletes its
+flight if no seats are booked, and cancels it (publishing `flight_cancelled`)
+otherwise. Hot inventory flights count as booked, since their database seat
+count lags the seat store.
+"""
+import datetime
+import decimal
+import uuid
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Flight, FlightSchedule
+from .outbox import publish_event
+from .signals import notify_flights_changed
+
+SYNCED_FIELDS = (
+    'flight_number', 'departure_location_id', 'arrival_location_id',
+    'departure_time', 'arrival_time', 'total_seats', 'available_seats', 'price',
+)
+# Statuses in which a flight may still be removed or cancelled with its date;
+# only `scheduled` flights are re-synced
+EDITABLE_STATUSES = ('scheduled', 'delayed')
+
+
+def service_dates(schedule, start, end):
+    """Dates in [start, end] on which the schedule operates."""
+    days = {int(day) for day in schedule.days_of_week}
+    date = max(start, schedule.valid_from)
+    end = min(end, schedule.valid_until)
+    while date <= end:
+        if date.isoweekday() in days:
+            yield date
+        date += datetime.timedelta(days=1)
+
+
+def flight_times(schedule, service_date, departure_zone, arrival_zone):
+    """Aware (departure_time, arrival_time) of the flight operating on `service_date`."""
+    departure = datetime.datetime.combine(service_date, schedule.departure_local_time, tzinfo=departure_zone)
+    arrival_date = service_date + datetime.timedelta(days=schedule.arrival_day_offset)
+    arrival = datetime.datetime.combine(arrival_date, schedule.arrival_local_time, tzinfo=arrival_zone)
+    return departure.astimezone(datetime.timezone.utc), arrival.astimezone(datetime.timezone.utc)
+
+
+def _horizon_days():
+    return getattr(settings, 'FLIGHT_SCHEDULE_HORIZON_DAYS', 120)
+
+
+def generate(schedule, horizon_days=None, now=None):
+    """
+    Bring a schedule's generated flights in line with it, up to `horizon_days` ahead.
+
+    Returns {"created", "updated", "removed", "cancelled"} counts.
+    """
+    now = now or timezone.now()
+    today = now.date()
+    end = today + datetime.timedelta(days=horizon_days or _horizon_days())
+    result = {"created": 0, "updated": 0, "removed": 0, "cancelled": 0}
+
+    with transaction.atomic():
+        schedule = FlightSchedule.objects.select_for_update().select_related(
+            'departure_location', 'arrival_location'
+        ).get(pk=schedule.pk)
+        departure_zone = ZoneInfo(schedule.departure_location.timezone)
+        arrival_zone = ZoneInfo(schedule.arrival_location.timezone)
+
+        wanted = {}
+        if schedule.is_active:
+            for date in service_dates(schedule, today, end):
+                departure_time, arrival_time = flight_times(schedule, date, departure_zone, arrival_zone)
+                if now < departure_time < arrival_time:
+                    wanted[date] = schedule_values(schedule, departure_time, arrival_time)
+
+        # Locked so seat counts cannot move between the comparison and the write
+        existing = {
+            flight.service_date: flight
+            for flight in Flight.objects.select_for_update().filter(
+                schedule=schedule, service_date__gte=today, departure_time__gt=now
+            ).only('flight_id', 'service_date', 'status', 'hot_inventory', 'schedule_values', *SYNCED_FIELDS)
+        }
+
+        # `restamped` flights only record new schedule values
+        created, updated, restamped, removed, cancelled = [], [], [], [], []
+        # (flight, old departure time) of booked flights whose times moved, and
+        # the routes updated flights had before, whose cached searches go stale too
+        retimed, previous = [], []
+        for date, values in wanted.items():
+            flight = existing.get(date)
+            if flight is None:
+                created.append(Flight(
+                    schedule=schedule,
+                    service_date=date,
+                    flight_number=schedule.flight_number,
+                    departure_location_id=schedule.departure_location_id,
+                    arrival_location_id=schedule.arrival_location_id,
+                    departure_time=values['departure_time'],
+                    arrival_time=values['arrival_time'],
+                    total_seats=schedule.total_seats,
+                    available_seats=schedule.total_seats,
+                    price=schedule.price,
+                    schedule_values=_stored(values),
+                ))
+            elif flight.status == 'scheduled' and flight.schedule_values != _stored(values):
+                before = (flight.flight_id, flight.departure_location_id, flight.arrival_location_id)
+                old_departure_time = flight.departure_time
+                # Flights generated before values were recorded adopt the current ones
+                last = _parsed(flight.schedule_values) if flight.schedule_values else values
+                changed = _sync(flight, last, values)
+                flight.schedule_values = _stored(values)
+                if changed:
+                    updated.append(flight)
+                    previous.append(before)
+                    if _has_bookings(flight) and flight.departure_time != old_departure_time:
+                        flight.status = 'delayed'
+                        retimed.append((flight, old_departure_time))
+                else:
+                    restamped.append(flight)
+
+        for date, flight in existing.items():
+            if date in wanted or flight.status not in EDITABLE_STATUSES:
+                continue
+            if not _has_bookings(flight):
+                removed.append(flight)
+            else:
+                flight.status = 'cancelled'
+                cancelled.append(flight)
+
+        if created:
+            Flight.objects.bulk_create(created)
+        if updated:
+            Flight.objects.bulk_update(updated, [*SYNCED_FIELDS, 'status', 'schedule_values', 'updated_at'])
+        if restamped:
+            Flight.objects.bulk_update(restamped, ['schedule_values'])
+        if cancelled:
+            Flight.objects.filter(pk__in=[flight.pk for flight in cancelled]).update(
+                status='cancelled', updated_at=now
+            )
+        if removed:
+            Flight.objects.filter(pk__in=[flight.pk for flight in removed]).delete()
+
+        FlightSchedule.objects.filter(pk=schedule.pk).update(generated_until=min(end, schedule.valid_until))
+
+        touched = created + updated + removed + cancelled
+        if touched:
+            notify_flights_changed(
+                [(flight.flight_id, flight.departure_location_id, flight.arrival_location_id) for flight in touched]
+                + previous
+            )
+        for flight, old_departure_time in retimed:
+            _publish_delayed(flight, old_departure_time)
+        for flight in cancelled:
+            _publish_cancelled(flight)
+
+    result.update(created=len(created), updated=len(updated), removed=len(removed), cancelled=len(cancelled))
+    return result
+
+
+def _has_bookings(flight):
+    return flight.hot_inventory or flight.available_seats < flight.total_seats
+
+
+def schedule_values(schedule, departure_time, arrival_time):
+    """The values a schedule gives the flight departing at `departure_time`."""
+    return {
+        'flight_number': schedule.flight_number,
+        'departure_location_id': schedule.departure_location_id,
+        'arrival_location_id': schedule.arrival_location_id,
+        'departure_time': departure_time,
+        'arrival_time': arrival_time,
+        'total_seats': schedule.total_seats,
+        'price': schedule.price,
+    }
+
+
+def _stored(values):
+    """`values` as kept in Flight.schedule_values."""
+    return {
+        **values,
+        'departure_location_id': str(values['departure_location_id']),
+        'arrival_location_id': str(values['arrival_location_id']),
+        'departure_time': values['departure_time'].isoformat(),
+        'arrival_time': values['arrival_time'].isoformat(),
+        'price': str(values['price']),
+    }
+
+
+def _parsed(stored):
+    return {
+        **stored,
+        'departure_location_id': uuid.UUID(stored['departure_location_id']),
+        'arrival_location_id': uuid.UUID(stored['arrival_location_id']),
+        'departure_time': datetime.datetime.fromisoformat(stored['departure_time']),
+        'arrival_time': datetime.datetime.fromisoformat(stored['arrival_time']),
+        'price': decimal.Decimal(stored['price']),
+    }
+
+
+def _sync(flight, last, values):
+    """
+    Apply the schedule values that changed since `last` to a generated flight,
+    skipping fields the flight no longer has at their `last` value (edited by
+    hand). True if anything changed.
+    """
+    changes = {
+        field: value for field, value in values.items()
+        if value != last[field] and getattr(flight, field) == last[field]
+    }
+    # Passengers are never moved to another route
+    if _has_bookings(flight):
+        changes.pop('departure_location_id', None)
+        changes.pop('arrival_location_id', None)
+    # Keep booked seats booked when the capacity changes; never go below them.
+    # Hot flights keep their counts in the seat store (flights.hot_inventory).
+    if 'total_seats' in changes:
+        booked = flight.total_seats - flight.available_seats
+        if changes['total_seats'] >= booked and not flight.hot_inventory:
+            changes['available_seats'] = changes['total_seats'] - booked
+        else:
+            del changes['total_seats']
+
+    for field, value in changes.items():
+        setattr(flight, field, value)
+    if changes:
+        flight.updated_at = timezone.now()
+    return bool(changes)
+
+
+def _publish_delayed(flight, old_departure_time):
+    publish_event('flight_delayed', {
+        "flight_id": str(flight.flight_id),
+        "flight_number": flight.flight_number,
+        "old_departure_time": old_departure_time.isoformat(),
+        "new_departure_time": flight.departure_time.isoformat(),
+        "status": "delayed",
+        "timestamp": datetime.datetime.now().isoformat()
+    })
+
+
+def _publish_cancelled(flight):
+    publish_event('flight_cancelled', {
+        "flight_id": str(flight.flight_id),
+        "flight_number": flight.flight_number,
+        "departure_time": flight.departure_time.isoformat(),
+        "status": "cancelled",
+        "timestamp": datetime.datetime.now().isoformat()
+    })
+
+
+def generate_all(horizon_days=None, now=None):
+    """Run `generate` for every schedule (inactive ones may still have flights to remove)."""
+    totals = {"created": 0, "updated": 0, "removed": 0, "cancelled": 0}
+    for schedule in FlightSchedule.objects.all().iterator():
+        for key, count in generate(schedule, horizon_days=horizon_days, now=now).items():
+            totals[key] += count
+    return totals
@@ -0,0 +1,267 @@
+"""
+Flight search planning.
+
+Origin/destination terms are resolved against the small Location table first,
+using the normalized keys maintained on Location, so the flight query itself
+only filters on indexed foreign keys and a half-open UTC departure range.
+`origin_within_km` widens the origin to every airport in that radius (see
+flights.nearby) before the query, so an area search is still one query.
+
+Price, duration, seat and status filters narrow the rows read from those
+ranges. Each sort order has a composite index, unfiltered and per origin or
+destination (see Flight.Meta.indexes), so keyset pages never sort the table.
+"""
+import datetime
+import decimal
+import json
+import re
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_time
+
+from .cache import location_cache
+from .fast_read import location_map
+from .models import Flight, Location, normalize_airport_code, normalize_city
+from .nearby import nearby_index
+from .search_rows import local_date_filter
+
+AIRPORT_CODE_RE = re.compile(r'^[A-Z0-9]{2,10}$')
+
+# sort parameter -> keyset ordering; a leading '-' reverses every field
+SORTS = {
+    'departure': ('departure_time', 'flight_id'),
+    'price': ('price', 'flight_id'),
+    'duration': ('duration', 'flight_id'),
+}
+STATUSES = {value for value, _ in Flight.STATUS_CHOICES}
+MAX_RADIUS_KM = 1000
+
+
+class SearchError(ValueError):
+    """Raised for search parameters that cannot be turned into a query."""
+
+
+def location_term_key(term):
+    """
+    Canonical form of an origin/destination term: the airport code it is
+    looked up by, if it can be one, and its city form. Terms that only differ
+    as airport codes (e.g. 'GRU' and 'Grü') stay apart.
+    """
+    code = normalize_airport_code(term)
+    return f'{code if AIRPORT_CODE_RE.match(code) else ""}|{normalize_city(term)}'
+
+
+def resolve_location_ids(term):
+    """
+    Resolve a free-text origin/destination term to location ids.
+
+    Strategies are tried from most to least selective and the first one that
+    matches wins: exact airport code, city prefix, then city substring.
+    Resolutions are cached until any location changes.
+    """
+    cached, stamp = location_cache.lookup(f'resolve:{location_term_key(term)}', ['locations'])
+    if cached is not None:
+        return json.loads(cached)
+    ids = [str(pk) for pk in _resolve_location_ids(term)]
+    location_cache.store(stamp, json.dumps(ids).encode('utf-8'))
+    return ids
+
+
+def _resolve_location_ids(term):
+    code = normalize_airport_code(term)
+    if AIRPORT_CODE_RE.match(code):
+        ids = list(Location.objects.filter(airport_code_key=code).values_list('location_id', flat=True))
+        if ids:
+            return ids
+
+    city = normalize_city(term)
+    if not city:
+        return []
+    ids = list(Location.objects.filter(city_key__startswith=city).values_list('location_id', flat=True))
+    if ids:
+        return ids
+    return list(Location.objects.filter(city_key__contains=city).values_list('location_id', flat=True))
+
+
+def cache_key(params, normalized=('origin', 'destination')):
+    """Canonical form of a query string, so equivalent searches share a cache entry."""
+    parts = []
+    for name in sorted(params.keys()):
+        value = params.get(name, '').strip()
+        if name in normalized:
+            value = location_term_key(value)
+        parts.append((name, value))
+    return json.dumps(parts, separators=(',', ':'))
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise SearchError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+def parse_decimal(name, value):
+    try:
+        number = decimal.Decimal(value)
+    except decimal.InvalidOperation:
+        number = None
+    if number is None or not number.is_finite() or number < 0:
+        raise SearchError(f"Invalid {name} '{value}', expected a non-negative number.")
+    return number
+
+
+def parse_int(name, value):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = -1
+    if number < 0:
+        raise SearchError(f"Invalid {name} '{value}', expected a non-negative integer.")
+    return number
+
+
+def parse_departure_bound(name, value, date):
+    """A time of day on the searched date (UTC), or a full ISO 8601 datetime."""
+    try:
+        moment = parse_datetime(value)
+        time = None if moment else parse_time(value)
+    except ValueError:
+        moment = time = None
+    if time is not None:
+        if date is None:
+            raise SearchError(f"{name} as a time of day requires a date.")
+        return datetime.datetime.combine(date, time, tzinfo=datetime.timezone.utc)
+    if moment is None:
+        raise SearchError(f"Invalid {name} '{value}', expected HH:MM or an ISO 8601 datetime.")
+    return timezone.make_aware(moment, datetime.timezone.utc) if timezone.is_naive(moment) else moment
+
+
+def parse_sort(value):
+    descending = value.startswith('-')
+    fields = SORTS.get(value.lstrip('-'))
+    if fields is None:
+        raise SearchError(f"Invalid sort '{value}', expected one of {', '.join(SORTS)}.")
+    return tuple('-' + field for field in fields) if descending else fields
+
+
+def departure_range(date):
+    """Half-open [start, end) UTC range covering one calendar day."""
+    start = datetime.datetime.combine(date, datetime.time.min, tzinfo=datetime.timezone.utc)
+    return start, start + datetime.timedelta(days=1)
+
+
+class FlightSearchPlan:
+    """
+    A resolved flight search: location id sets, a departure range and/or
+    local departure date, optional price/duration/seat/status filters and a
+    keyset ordering. It applies to Flight and FlightSearchRow querysets alike.
+
+    `None` for a location set means "unfiltered"; an empty list means the term
+    matched no location, so the search can short-circuit without a query.
+    """
+
+    def __init__(self, origin_ids=None, destination_ids=None, departure_from=None, departure_until=None):
+        self.origin_ids = origin_ids
+        self.destination_ids = destination_ids
+        self.departure_from = departure_from
+        self.departure_until = departure_until
+        self.local_date = None
+        self.min_price = self.max_price = None
+        self.min_duration = self.max_duration = None
+        self.min_seats = None
+        self.statuses = None
+        self.ordering = SORTS['departure']
+
+    @classmethod
+    def from_params(cls, params):
+        origin = params.get('origin')
+        destination = params.get('destination')
+        date = params.get('date')
+
+        plan = cls()
+        if origin:
+            plan.origin_ids = resolve_location_ids(origin)
+        if params.get('origin_within_km'):
+            if not origin:
+                raise SearchError("origin_within_km requires an origin.")
+            radius = parse_decimal('origin_within_km', params['origin_within_km'])
+            if radius > MAX_RADIUS_KM:
+                raise SearchError(f"origin_within_km can be at most {MAX_RADIUS_KM}.")
+            plan.origin_ids = nearby_index.within(plan.origin_ids, float(radius))
+        if destination:
+            plan.destination_ids = resolve_location_ids(destination)
+        date = parse_date(date) if date else None
+        if date:
+            plan.departure_from, plan.departure_until = departure_range(date)
+        if params.get('local_date'):
+            plan.local_date = parse_date(params['local_date'])
+
+        # The departure window narrows the date's range, or stands alone
+        if params.get('departure_after'):
+            after = parse_departure_bound('departure_after', params['departure_after'], date)
+            plan.departure_from = max(plan.departure_from, after) if plan.departure_from else after
+        if params.get('departure_before'):
+            before = parse_departure_bound('departure_before', params['departure_before'], date)
+            plan.departure_until = min(plan.departure_until, before) if plan.departure_until else before
+
+        if params.get('min_price'):
+            plan.min_price = parse_decimal('min_price', params['min_price'])
+        if params.get('max_price'):
+            plan.max_price = parse_decimal('max_price', params['max_price'])
+        if params.get('min_duration'):
+            plan.min_duration = datetime.timedelta(minutes=parse_int('min_duration', params['min_duration']))
+        if params.get('max_duration'):
+            plan.max_duration = datetime.timedelta(minutes=parse_int('max_duration', params['max_duration']))
+        if params.get('min_seats'):
+            plan.min_seats = parse_int('min_seats', params['min_seats'])
+        if params.get('status'):
+            plan.statuses = sorted({value.strip() for value in params['status'].split(',') if value.strip()})
+            unknown = [value for value in plan.statuses if value not in STATUSES]
+            if unknown:
+                raise SearchError(f"Invalid status '{unknown[0]}', expected any of {', '.join(sorted(STATUSES))}.")
+        if params.get('sort'):
+            plan.ordering = parse_sort(params['sort'])
+        return plan
+
+    @property
+    def cache_tags(self):
+        """Invalidation tags for results of this search (see flights.cache)."""
+        if self.origin_ids:
+            tags = {f'loc:{pk}' for pk in self.origin_ids}
+        elif self.destination_ids:
+            tags = {f'loc:{pk}' for pk in self.destination_ids}
+        else:
+            tags = {'all'}
+        return tags | {'locations'}
+
+    @property
+    def is_empty(self):
+        return self.origin_ids == [] or self.destination_ids == []
+
+    def apply(self, queryset):
+        if self.is_empty:
+            return queryset.none()
+        if self.origin_ids is not None:
+            queryset = queryset.filter(departure_location_id__in=self.origin_ids)
+        if self.destination_ids is not None:
+            queryset = queryset.filter(arrival_location_id__in=self.destination_ids)
+        if self.departure_from is not None:
+            queryset = queryset.filter(departure_time__gte=self.departure_from)
+        if self.departure_until is not None:
+            queryset = queryset.filter(departure_time__lt=self.departure_until)
+        if self.local_date is not None:
+            queryset = local_date_filter(queryset, self.local_date, location_map.get(), self.origin_ids)
+        if self.min_price is not None:
+            queryset = queryset.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            queryset = queryset.filter(price__lte=self.max_price)
+        if self.min_duration is not None:
+            queryset = queryset.filter(duration__gte=self.min_duration)
+        if self.max_duration is not None:
+            queryset = queryset.filter(duration__lte=self.max_duration)
+        if self.min_seats is not None:
+            queryset = queryset.filter(available_seats__gte=self.min_seats)
+        if self.statuses is not None:
+            queryset = queryset.filter(status__in=self.statuses)
+        return queryset
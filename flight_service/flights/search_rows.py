@@ -0,0 +1,114 @@
+"""
+The flight search projection (FlightSearchRow).
+
+Every flight change already sends `flights_changed` inside its transaction,
+whether it is a save, a bulk import, a status batch or a seat change. The
+receiver in flights.signals re-projects just those flights with one upsert,
+and a change of an airport's time zone is sent as a change of the flights
+leaving it.
+
+The public search reads this table when FLIGHT_SEARCH_BACKEND is
+'projection'. It holds everything the search filters, sorts and renders,
+including the local departure date, which the flights table can only match
+with one time range per time zone.
+"""
+import datetime
+import zoneinfo
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+
+from .models import Flight, FlightSearchRow
+
+BACKENDS = ('projection', 'flights', 'columnar')
+CHUNK_SIZE = 1000
+
+SOURCE_VALUES = (
+    'flight_id', 'flight_number', 'departure_location_id', 'arrival_location_id', 'departure_time',
+    'arrival_time', 'total_seats', 'available_seats', 'price', 'status', 'created_at', 'updated_at',
+)
+UPDATE_FIELDS = [
+    'flight_number', 'departure_location', 'arrival_location', 'departure_time', 'arrival_time', 'duration',
+    'departure_date', 'total_seats', 'available_seats', 'price', 'status', 'created_at', 'updated_at',
+]
+
+
+def zone(name):
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return datetime.timezone.utc
+
+
+def search_queryset():
+    """
+    Where the public search reads flights from, per FLIGHT_SEARCH_BACKEND.
+    Searches the columnar index does not cover (flights.columnar) read the projection.
+    """
+    backend = settings.FLIGHT_SEARCH_BACKEND
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"FLIGHT_SEARCH_BACKEND must be one of {', '.join(BACKENDS)}")
+    return Flight.objects.all() if backend == 'flights' else FlightSearchRow.objects.all()
+
+
+def local_date_filter(queryset, date, locations, origin_ids=None):
+    """Flights departing on `date` in their departure airport's time zone."""
+    if queryset.model is FlightSearchRow:
+        return queryset.filter(departure_date=date)
+    # The flights table only has UTC times: one range per time zone in play
+    by_zone = {}
+    for pk, location in locations.items():
+        if origin_ids is None or str(pk) in origin_ids:
+            by_zone.setdefault(location['timezone'], []).append(pk)
+    condition = Q(pk__in=[])
+    for name, location_ids in by_zone.items():
+        tz = zone(name)
+        start = datetime.datetime.combine(date, datetime.time.min, tzinfo=tz)
+        end = datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+        condition |= Q(departure_location_id__in=location_ids, departure_time__gte=start, departure_time__lt=end)
+    return queryset.filter(condition)
+
+
+def _row(values, timezone_name):
+    return FlightSearchRow(
+        flight_id=values['flight_id'],
+        flight_number=values['flight_number'],
+        departure_location_id=values['departure_location_id'],
+        arrival_location_id=values['arrival_location_id'],
+        departure_time=values['departure_time'],
+        arrival_time=values['arrival_time'],
+        duration=values['arrival_time'] - values['departure_time'],
+        departure_date=values['departure_time'].astimezone(zone(timezone_name)).date(),
+        total_seats=values['total_seats'],
+        available_seats=values['available_seats'],
+        price=values['price'],
+        status=values['status'],
+        created_at=values['created_at'],
+        updated_at=values['updated_at'],
+    )
+
+
+def refresh(flight_ids):
+    """Re-project the given flights; rows of deleted flights go with them."""
+    flight_ids = list(flight_ids)
+    for start in range(0, len(flight_ids), CHUNK_SIZE):
+        chunk = flight_ids[start:start + CHUNK_SIZE]
+        rows = [
+            _row(values, values['departure_location__timezone'])
+            for values in Flight.objects.filter(pk__in=chunk).values(*SOURCE_VALUES, 'departure_location__timezone')
+        ]
+        if rows:
+            FlightSearchRow.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['flight'], update_fields=UPDATE_FIELDS,
+            )
+        if len(rows) < len(chunk):
+            FlightSearchRow.objects.filter(pk__in=chunk).exclude(pk__in=[row.flight_id for row in rows]).delete()
+
+
+def rebuild():
+    """Re-project every flight. Returns the number of rows written."""
+    flight_ids = list(Flight.objects.values_list('flight_id', flat=True))
+    refresh(flight_ids)
+    FlightSearchRow.objects.exclude(pk__in=Flight.objects.values('pk')).delete()
+    return len(flight_ids)
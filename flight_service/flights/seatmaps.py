@@ -0,0 +1,227 @@
+"""
+Seat maps: per-seat inventory for flights that have a cabin layout.
+
+Each flight's taken seats are one bitmap in its SeatMap row, handled as a
+Python int, so checking, claiming and counting seats are bitwise operations
+over a few machine words instead of one row per seat. Claiming seats locks
+the SeatMap row and takes the same number of seats through flights.inventory
+in the same seat transaction: `available_seats` changes with the map, and a
+hot flight's store count is given back if the map write rolls back. A seat
+can never be sold twice and the seat count stays in step with the map.
+Reserving a count of seats on a mapped flight claims the lowest-numbered
+free ones (`reserve_unassigned`); giving seats back, and holds, which are
+never assigned seats, need numbers there and are refused without them.
+"""
+import re
+
+from django.db import transaction
+
+from .inventory import FlightNotFound, InventoryError, NotEnoughSeats, release_seats, reserve_seats, seat_transaction
+from .models import Flight, SeatMap
+
+COLUMNS_RE = re.compile(r'^[A-Z](-?[A-Z])*$')
+SEAT_RE = re.compile(r'^(\d{1,3})([A-Z])$')
+AISLE = '-'
+FREE, TAKEN = '.', 'X'
+
+
+class InvalidSeats(InventoryError):
+    """Seat numbers that do not exist on the flight, or that it has no map for."""
+
+
+class SeatNumbersRequired(InvalidSeats):
+    def __init__(self):
+        super().__init__("This flight has a seat map; name the seats")
+
+
+class SeatsTaken(InventoryError):
+    def __init__(self, seat_numbers):
+        super().__init__(f"Seats already taken: {', '.join(seat_numbers)}")
+        self.seat_numbers = seat_numbers
+
+
+class SeatsNotTaken(InventoryError):
+    def __init__(self, seat_numbers):
+        super().__init__(f"Seats are not taken: {', '.join(seat_numbers)}")
+        self.seat_numbers = seat_numbers
+
+
+class SeatMapInUse(InventoryError):
+    def __init__(self):
+        super().__init__("Cannot change the layout while seats are taken")
+
+
+class Layout:
+    def __init__(self, columns, rows, first_row=1):
+        self.columns = columns
+        self.letters = columns.replace(AISLE, '')
+        self.width = len(self.letters)
+        self.rows = rows
+        self.first_row = first_row
+        self.capacity = rows * self.width
+
+    @classmethod
+    def of(cls, seat_map):
+        return cls(seat_map.columns, seat_map.rows, seat_map.first_row)
+
+    def index(self, seat_number):
+        match = SEAT_RE.match(seat_number.strip().upper())
+        row = int(match.group(1)) - self.first_row if match else -1
+        column = self.letters.find(match.group(2)) if match else -1
+        if not 0 <= row < self.rows or column < 0:
+            raise InvalidSeats(f"No seat {seat_number} on this flight")
+        return row * self.width + column
+
+    def seat_number(self, index):
+        row, column = divmod(index, self.width)
+        return f"{row + self.first_row}{self.letters[column]}"
+
+    def mask(self, seat_numbers):
+        mask = 0
+        for seat_number in seat_numbers:
+            bit = 1 << self.index(seat_number)
+            if mask & bit:
+                raise InvalidSeats(f"Seat {seat_number} requested twice")
+            mask |= bit
+        return mask
+
+    def seat_numbers(self, mask):
+        numbers = []
+        while mask:
+            low = mask & -mask
+            numbers.append(self.seat_number(low.bit_length() - 1))
+            mask ^= low
+        return numbers
+
+    def first_free(self, occupied, count):
+        """Mask of the `count` lowest-numbered free seats, or None if fewer are free."""
+        free = ~occupied & ((1 << self.capacity) - 1)
+        mask = 0
+        for _ in range(count):
+            if not free:
+                return None
+            low = free & -free
+            mask |= low
+            free ^= low
+        return mask
+
+    def render(self, occupied):
+        """One string per row in the shape of `columns`: '.' free, 'X' taken, '-' aisle."""
+        row_mask = (1 << self.width) - 1
+        template = [c if c == AISLE else None for c in self.columns]
+        rendered = []
+        for row in range(self.rows):
+            bits = (occupied >> (row * self.width)) & row_mask
+            seats = iter(TAKEN if bits >> column & 1 else FREE for column in range(self.width))
+            rendered.append(''.join(c or next(seats) for c in template))
+        return rendered
+
+
+def occupied_bits(seat_map):
+    return int.from_bytes(bytes(seat_map.occupied), 'little')
+
+
+def _store(seat_map, bits, layout):
+    seat_map.occupied = bits.to_bytes((layout.capacity + 7) // 8, 'little')
+    seat_map.save(update_fields=['occupied', 'updated_at'])
+
+
+def _locked_map(flight_id):
+    seat_map = SeatMap.objects.select_for_update().filter(pk=flight_id).first()
+    if seat_map is None:
+        if not Flight.objects.filter(pk=flight_id).exists():
+            raise FlightNotFound(f"Flight {flight_id} not found")
+        raise InvalidSeats("This flight has no seat map")
+    return seat_map
+
+
+def set_layout(flight_id, columns, rows, first_row=1):
+    """Create or replace a flight's cabin layout; its capacity must match total_seats."""
+    layout = Layout(columns, rows, first_row)
+    with transaction.atomic():
+        flight = Flight.objects.select_for_update().filter(pk=flight_id).first()
+        if flight is None:
+            raise FlightNotFound(f"Flight {flight_id} not found")
+        if layout.capacity != flight.total_seats:
+            raise InvalidSeats(f"Layout has {layout.capacity} seats, the flight has {flight.total_seats}")
+        seat_map = SeatMap.objects.select_for_update().filter(pk=flight_id).first()
+        if flight.available_seats != flight.total_seats or seat_map is not None and occupied_bits(seat_map):
+            raise SeatMapInUse()
+        seat_map = seat_map or SeatMap(flight=flight)
+        seat_map.columns, seat_map.rows, seat_map.first_row = columns, rows, first_row
+        seat_map.occupied = bytes((layout.capacity + 7) // 8)
+        seat_map.save()
+    return seat_map
+
+
+def claim_seats(flight_id, seat_numbers):
+    """Take the given seats, all or nothing. Returns the remaining seat count."""
+    with seat_transaction():
+        seat_map = _locked_map(flight_id)
+        layout = Layout.of(seat_map)
+        mask = layout.mask(seat_numbers)
+        bits = occupied_bits(seat_map)
+        if bits & mask:
+            raise SeatsTaken(layout.seat_numbers(bits & mask))
+        remaining = reserve_seats(flight_id, len(seat_numbers))
+        _store(seat_map, bits | mask, layout)
+    return remaining
+
+
+def free_seats(flight_id, seat_numbers):
+    """Give back the given seats, all or nothing. Returns the remaining seat count."""
+    with seat_transaction():
+        seat_map = _locked_map(flight_id)
+        layout = Layout.of(seat_map)
+        mask = layout.mask(seat_numbers)
+        bits = occupied_bits(seat_map)
+        if mask & ~bits:
+            raise SeatsNotTaken(layout.seat_numbers(mask & ~bits))
+        remaining = release_seats(flight_id, len(seat_numbers))
+        _store(seat_map, bits & ~mask, layout)
+    return remaining
+
+
+def ensure_unmapped(flight_id):
+    """Refuse a count-only seat change on a flight with a seat map, whose bitmap it would skip."""
+    if SeatMap.objects.filter(pk=flight_id).exists():
+        raise SeatNumbersRequired()
+
+
+def reserve_unassigned(flight_id, seats):
+    """
+    Take `seats` seats without naming them. Returns the remaining seat count,
+    or on a flight with a seat map, which gets the lowest-numbered free seats,
+    (remaining seat count, the seat numbers taken).
+    """
+    if not SeatMap.objects.filter(pk=flight_id).exists():
+        return reserve_seats(flight_id, seats)
+    with seat_transaction():
+        seat_map = _locked_map(flight_id)
+        layout = Layout.of(seat_map)
+        bits = occupied_bits(seat_map)
+        mask = layout.first_free(bits, seats)
+        if mask is None:
+            raise NotEnoughSeats(layout.capacity - bits.bit_count())
+        remaining = reserve_seats(flight_id, seats)
+        _store(seat_map, bits | mask, layout)
+    return remaining, layout.seat_numbers(mask)
+
+
+def release_unassigned(flight_id, seats):
+    """release_seats for flights without a seat map."""
+    ensure_unmapped(flight_id)
+    return release_seats(flight_id, seats)
+
+
+def render_seat_map(seat_map):
+    layout = Layout.of(seat_map)
+    bits = occupied_bits(seat_map)
+    return {
+        "flight_id": str(seat_map.flight_id),
+        "columns": seat_map.columns,
+        "first_row": seat_map.first_row,
+        "rows": layout.render(bits),
+        "total_seats": layout.capacity,
+        "taken_seats": bits.bit_count(),
+    }
@@ -1,13 +1,30 @@
 from rest_framework import serializers
-from .models import Location, Flight
-from .producer import publish_event
+from .models import Location, Flight, FlightSchedule
+from .outbox import publish_event
+from django.db import transaction
 import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from django.utils import timezone
 
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
-        fields = '__all__'
+        fields = ['location_id', 'name', 'airport_code', 'city', 'country', 'timezone', 'latitude', 'longitude']
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ValueError, ZoneInfoNotFoundError):
+            raise serializers.ValidationError(f"Unknown time zone '{value}'.")
+        return value
+
+    def validate(self, data):
+        def value(field):
+            return data.get(field, getattr(self.instance, field, None))
+
+        if (value('latitude') is None) != (value('longitude') is None):
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return data
 
 class FlightReadSerializer(serializers.ModelSerializer):
     """ Serializer for Reading (GET) - includes nested location data """
@@ -16,7 +33,112 @@ class FlightReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Flight
-        fields = '__all__'
+        fields = ['flight_id', 'departure_location', 'arrival_location', 'flight_number',
+                  'departure_time', 'arrival_time', 'total_seats', 'available_seats', 'price',
+                  'status', 'created_at', 'updated_at']
+
+class SeatCountSerializer(serializers.Serializer):
+    """ Payload for the multi-seat reserve/release actions """
+    seats = serializers.IntegerField(min_value=1, max_value=500)
+
+class SeatSelectionSerializer(SeatCountSerializer):
+    """ Reserve/release payload that may name the seats, e.g. ["12A", "12B"] """
+    seat_numbers = serializers.ListField(child=serializers.CharField(max_length=4), required=False, max_length=500)
+
+    def validate(self, data):
+        if 'seat_numbers' in data and len(data['seat_numbers']) != data['seats']:
+            raise serializers.ValidationError("seat_numbers must name exactly `seats` seats.")
+        return data
+
+class SeatMapLayoutSerializer(serializers.Serializer):
+    """ Cabin layout: seat letters of one row with '-' for aisles, and a row count """
+    columns = serializers.RegexField(r'^[A-Z](-?[A-Z])*$', max_length=20)
+    rows = serializers.IntegerField(min_value=1, max_value=999)
+    first_row = serializers.IntegerField(min_value=1, max_value=999, default=1)
+
+class SeatHoldSerializer(SeatCountSerializer):
+    """ Payload for placing a seat hold; ttl defaults to SEAT_HOLD_TTL_SECONDS """
+    ttl_seconds = serializers.IntegerField(min_value=30, max_value=3600, required=False)
+
+class ConnectionQuerySerializer(serializers.Serializer):
+    """ Query parameters of the connections search """
+    origin = serializers.CharField()
+    destination = serializers.CharField()
+    date = serializers.CharField()
+    max_stops = serializers.IntegerField(min_value=0, max_value=2, default=2)
+    seats = serializers.IntegerField(min_value=1, max_value=500, default=1)
+    min_connection_minutes = serializers.IntegerField(min_value=0, max_value=1440, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+class DeparturesQuerySerializer(serializers.Serializer):
+    """ Query parameters of an airport departures board """
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class LocationSuggestQuerySerializer(serializers.Serializer):
+    """ Query parameters of location autocomplete """
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+class BulkFlightStatusSerializer(serializers.Serializer):
+    """ Bulk status change: by flight ids and/or departure airport and window """
+    status = serializers.ChoiceField(choices=['delayed', 'cancelled', 'boarding'])
+    flight_ids = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=5000)
+    departure_location = serializers.CharField(required=False)
+    departure_from = serializers.DateTimeField(required=False)
+    departure_until = serializers.DateTimeField(required=False)
+    delay_minutes = serializers.IntegerField(min_value=1, max_value=2880, required=False)
+
+    def validate_departure_location(self, value):
+        try:
+            return Location.objects.get(airport_code__iexact=value)
+        except Location.DoesNotExist:
+            raise serializers.ValidationError(f"Location with airport code '{value}' does not exist.")
+
+    def validate(self, data):
+        if 'flight_ids' not in data and 'departure_location' not in data:
+            raise serializers.ValidationError("Select flights with flight_ids and/or departure_location.")
+        if (data['status'] == 'delayed') != ('delay_minutes' in data):
+            raise serializers.ValidationError("delay_minutes is required for, and only for, status 'delayed'.")
+        return data
+
+class HotInventorySerializer(serializers.Serializer):
+    enabled = serializers.BooleanField()
+
+class FlightScheduleSerializer(serializers.ModelSerializer):
+    """ Recurring flight template - locations are given as airport codes """
+    departure_location = serializers.SlugRelatedField(slug_field='airport_code', queryset=Location.objects.all())
+    arrival_location = serializers.SlugRelatedField(slug_field='airport_code', queryset=Location.objects.all())
+
+    class Meta:
+        model = FlightSchedule
+        fields = ['schedule_id', 'flight_number', 'departure_location', 'arrival_location', 'days_of_week',
+                  'departure_local_time', 'arrival_local_time', 'arrival_day_offset', 'valid_from',
+                  'valid_until', 'total_seats', 'price', 'is_active', 'generated_until',
+                  'created_at', 'updated_at']
+
+    def validate_days_of_week(self, value):
+        """Accept ISO weekday digits in any order, stored sorted and de-duplicated"""
+        if not value or any(day not in '1234567' for day in value):
+            raise serializers.ValidationError("Use ISO weekday digits 1 (Monday) to 7 (Sunday), e.g. '135'.")
+        return ''.join(sorted(set(value)))
+
+    def validate_total_seats(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Total seats must be at least 1.")
+        return value
+
+    def validate(self, data):
+        def value(field):
+            return data.get(field, getattr(self.instance, field, None))
+
+        if value('departure_location') == value('arrival_location'):
+            raise serializers.ValidationError("Departure and Arrival locations cannot be the same.")
+        if value('valid_until') < value('valid_from'):
+            raise serializers.ValidationError("valid_until cannot be before valid_from.")
+        if not value('arrival_day_offset') and value('arrival_local_time') <= value('departure_local_time') \
+                and value('departure_location').timezone == value('arrival_location').timezone:
+            raise serializers.ValidationError("Arrival time must be after departure time.")
+        return data
 
 class FlightCreateSerializer(serializers.ModelSerializer):
     """ Serializer for Creating (POST) - accepts airport codes for locations """
@@ -89,6 +211,8 @@ class FlightUpdateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         """Additional validation for updates"""
+        # Events are recorded by update(), in the same transaction as the change
+        self._pending_events = []
         # Make datetime fields timezone-aware
         for field in ['departure_time', 'arrival_time']:
             if field in data and data[field] and timezone.is_naive(data[field]):
@@ -111,7 +235,7 @@ class FlightUpdateSerializer(serializers.ModelSerializer):
                 data['status'] = 'delayed'
                 new_status = 'delayed'
             
-            # Publish events based on changes
+            # Queue events based on changes
             if departure_time_changed:
                 # Flight delayed event
                 event_data = {
@@ -122,7 +246,7 @@ class FlightUpdateSerializer(serializers.ModelSerializer):
                     "status": "delayed",
                     "timestamp": datetime.datetime.now().isoformat()
                 }
-                publish_event('flight_delayed', event_data)
+                self._pending_events.append(('flight_delayed', event_data))
             
             if status_changed and not departure_time_changed:  # Don't publish status change if it was auto-set due to delay
                 if new_status == 'cancelled':
@@ -133,7 +257,7 @@ class FlightUpdateSerializer(serializers.ModelSerializer):
                         "status": "cancelled",
                         "timestamp": datetime.datetime.now().isoformat()
                     }
-                    publish_event('flight_cancelled', event_data)
+                    self._pending_events.append(('flight_cancelled', event_data))
                 elif new_status == 'boarding':
                     event_data = {
                         "flight_id": str(self.instance.flight_id),
@@ -142,6 +266,13 @@ class FlightUpdateSerializer(serializers.ModelSerializer):
                         "status": "boarding",
                         "timestamp": datetime.datetime.now().isoformat()
                     }
-                    publish_event('flight_boarding', event_data)
+                    self._pending_events.append(('flight_boarding', event_data))
         
-        return data
\ No newline at end of file
+        return data
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            for event_type, event_data in getattr(self, '_pending_events', []):
+                publish_event(event_type, event_data)
+        return instance
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .cache import bump_tags, flight_tags
+from .columnar import flight_columns
+from .departures import departures_board
+from .models import Flight, Location
+from .replicas import after_replica_lag
+from .routes import record_changes, route_graph
+from . import search_rows
+
+# Sent inside the writing transaction whenever flights change, including
+# set-based updates that bypass Model.save().
+# kwargs: flights=[(flight_id, departure_location_id, arrival_location_id), ...]
+flights_changed = Signal()
+
+
+def notify_flights_changed(flights):
+    flights = list(flights)
+    if flights:
+        flights_changed.send(sender=Flight, flights=flights)
+
+
+def _invalidate(tags):
+    # Bump now so this process stops serving stale entries immediately, again
+    # after commit so nothing cached from pre-commit reads survives, and once
+    # more when replicas have caught up, for pages refilled from a lagging one.
+    bump_tags(tags)
+    transaction.on_commit(lambda: bump_tags(tags))
+    transaction.on_commit(lambda: after_replica_lag(lambda: bump_tags(tags)))
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def _flight_written(sender, instance, **kwargs):
+    notify_flights_changed([(instance.pk, instance.departure_location_id, instance.arrival_location_id)])
+
+
+@receiver(pre_save, sender=Location)
+def _location_saving(sender, instance, **kwargs):
+    instance._saved_timezone = (
+        Location.objects.filter(pk=instance.pk).values_list('timezone', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def _location_written(sender, instance, **kwargs):
+    # Location data is nested in every flight payload and drives term resolution.
+    _invalidate({'locations', f'loc:{instance.pk}'})
+    # The search projection and columnar index store local departure dates
+    if kwargs.get('created') is False and instance.timezone != getattr(instance, '_saved_timezone', None):
+        notify_flights_changed(
+            Flight.objects.filter(departure_location=instance).values_list(
+                'flight_id', 'departure_location_id', 'arrival_location_id')
+        )
+
+
+@receiver(flights_changed)
+def _update_search_rows(sender, flights, **kwargs):
+    # Inside the writing transaction, so the projection commits or rolls back with it
+    search_rows.refresh(flight_id for flight_id, _, _ in flights)
+
+
+@receiver(flights_changed)
+def _invalidate_search_cache(sender, flights, **kwargs):
+    tags = set()
+    for _, departure_location_id, arrival_location_id in flights:
+        tags |= flight_tags(departure_location_id, arrival_location_id)
+    _invalidate(tags)
+
+
+@receiver(flights_changed)
+def _update_flight_indexes(sender, flights, **kwargs):
+    # Only committed state goes into the route graph, departures boards and columnar index,
+    # so a rollback cannot leave phantom entries.
+    flight_ids = [flight_id for flight_id, _, _ in flights]
+
+    def committed():
+        route_graph.apply(flight_ids)
+        departures_board.apply(flight_ids)
+        flight_columns.apply(flight_ids)
+        record_changes(flight_ids)
+    transaction.on_commit(committed)
@@ -0,0 +1,70 @@
+"""
+Location autocomplete from an in-memory prefix index.
+
+Airport codes, city names and airport names, plus each later word of the
+city and name, are normalized like Location.city_key and kept in one sorted
+array, so every key starting with the typed prefix is a contiguous slice
+found with a bisect. The index is rebuilt from the location map (see
+flights.fast_read) whenever that reloads, i.e. after any location change.
+"""
+import bisect
+import threading
+
+from .fast_read import location_map
+from .models import normalize_city
+
+# Match kinds, best first
+EXACT_CODE, CODE, CITY, NAME, WORD = range(5)
+MATCHES = {EXACT_CODE: 'airport_code', CODE: 'airport_code', CITY: 'city', NAME: 'name', WORD: 'name'}
+
+
+def _keys(location):
+    code = normalize_city(location['airport_code'])
+    yield code, CODE
+    for text, kind in ((location['city'], CITY), (location['name'], NAME)):
+        key = normalize_city(text)
+        yield key, kind
+        for index, char in enumerate(key):
+            if char == ' ':
+                yield key[index + 1:], WORD
+
+
+class LocationSuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None
+        # Sorted [(key, kind, location id)], with the keys split out for bisecting
+        self._entries = []
+        self._keys = []
+
+    def _index(self):
+        locations = location_map.get()
+        if locations is not self._source:
+            entries = sorted(
+                (key, kind, pk) for pk, location in locations.items() for key, kind in _keys(location) if key
+            )
+            with self._lock:
+                self._entries = entries
+                self._keys = [entry[0] for entry in entries]
+                self._source = locations
+        return locations, self._entries, self._keys
+
+    def suggest(self, query, limit):
+        """Up to `limit` locations with a code, city or name starting with `query`, best match first."""
+        prefix = normalize_city(query)
+        if not prefix:
+            return []
+        locations, entries, keys = self._index()
+        best = {}
+        for index in range(bisect.bisect_left(keys, prefix), len(keys)):
+            key, kind, pk = entries[index]
+            if not key.startswith(prefix):
+                break
+            if kind == CODE and key == prefix:
+                kind = EXACT_CODE
+            best[pk] = min(kind, best.get(pk, kind))
+        ranked = sorted(best, key=lambda pk: (best[pk], locations[pk]['city'], locations[pk]['airport_code']))
+        return [{**locations[pk], 'match': MATCHES[best[pk]]} for pk in ranked[:limit]]
+
+
+location_suggestions = LocationSuggestIndex()
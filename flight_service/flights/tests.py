@@ -1,19 +1,44 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import json
+import threading
+import uuid
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import HttpResponse
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.utils import timezone
+from unittest import skipIf
 from unittest.mock import patch
 
 from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
 
-from .models import Location, Flight
+from .models import Location, Flight, FlightSchedule, FlightSearchRow, OutboxEvent, SeatHold
+from .holds import HoldNotActive, create_hold, confirm_hold, expire_holds
+from . import hot_inventory
+from .inventory import reserve_seats
+from .importer import import_flights, parse_csv, parse_ndjson
+from .schedules import generate
+from .routes import route_graph
+from .departures import departures_board
+from .nearby import nearby_index
+from . import columnar
+from .seatmaps import Layout
+from .replicas import ReplicaPinMiddleware, ReplicaRouter, after_replica_lag, replica_lag, replica_reads
+from .operations import change_status
+from .outbox import RelayError, flight_event_key, key_partition, publish_event, relay_batch
+from .codec import decode_event, encode_event, registry
 from .serializers import (
 	LocationSerializer,
 	FlightCreateSerializer,
 	FlightReadSerializer,
 	FlightUpdateSerializer,
 )
+from .search import FlightSearchPlan, cache_key, resolve_location_ids
 
 
 class LocationModelTests(TestCase):
@@ -228,18 +253,18 @@ class FlightAPITests(APITestCase):
 		# Filter by origin airport code
 		res_origin = self.client.get(self.flight_list_url + "?origin=JFK")
 		self.assertEqual(res_origin.status_code, status.HTTP_200_OK)
-		self.assertTrue(all(f["departure_location"]["airport_code"].lower() == "jfk" for f in res_origin.json()))
+		self.assertTrue(all(f["departure_location"]["airport_code"].lower() == "jfk" for f in res_origin.json()["results"]))
 
 		# Filter by destination city substring
 		res_dest_city = self.client.get(self.flight_list_url + "?destination=Los")
 		self.assertEqual(res_dest_city.status_code, status.HTTP_200_OK)
-		self.assertTrue(len(res_dest_city.json()) >= 1)
+		self.assertTrue(len(res_dest_city.json()["results"]) >= 1)
 
 		# Filter by date
 		date_str = (timezone.now() + timezone.timedelta(days=1)).date().isoformat()
 		res_date = self.client.get(self.flight_list_url + f"?date={date_str}")
 		self.assertEqual(res_date.status_code, status.HTTP_200_OK)
-		self.assertTrue(len(res_date.json()) >= 1)
+		self.assertTrue(len(res_date.json()["results"]) >= 1)
 
 	def test_reserve_and_release_seat_requires_service_key(self):
 		flight = Flight.objects.create(
@@ -284,3 +309,1606 @@ class FlightAPITests(APITestCase):
 		# Accept both DRF Response and JsonResponse
 		data = getattr(res, "data", None) or res.json()
 		self.assertEqual(data.get("status"), "healthy")
+
+
+class FlightSearchTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.lax = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.sao = Location.objects.create(name="Guarulhos", airport_code="GRU", city="São Paulo", country="Brazil")
+		self.day = (timezone.now() + timezone.timedelta(days=3)).date()
+		start = timezone.datetime.combine(self.day, timezone.datetime.min.time(), tzinfo=datetime.timezone.utc)
+		self.early = self._flight("AA1", self.jfk, self.lax, start)
+		self.late = self._flight("AA2", self.jfk, self.lax, start + timezone.timedelta(hours=23, minutes=59))
+		self.next_day = self._flight("AA3", self.jfk, self.lax, start + timezone.timedelta(days=1))
+		self.from_sao = self._flight("GR1", self.sao, self.jfk, start + timezone.timedelta(hours=5))
+
+	def _flight(self, number, origin, dest, departure):
+		return Flight.objects.create(
+			flight_number=number,
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=100,
+			available_seats=100,
+			price="100.00",
+		)
+
+	def _numbers(self, query):
+		res = self.client.get(self.url + query)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+		return [f["flight_number"] for f in res.json()["results"]]
+
+	def test_location_keys_are_normalized_on_save(self):
+		self.assertEqual(self.sao.airport_code_key, "GRU")
+		self.assertEqual(self.sao.city_key, "sao paulo")
+
+	def test_exact_code_wins_over_city_match(self):
+		Location.objects.create(name="Laxton Field", airport_code="LXF", city="Lax", country="UK")
+		plan = FlightSearchPlan.from_params({"origin": "lax"})
+		self.assertEqual(plan.origin_ids, [str(self.lax.location_id)])
+
+	def test_code_and_city_terms_are_resolved_separately(self):
+		grunau = Location.objects.create(name="Grünau Field", airport_code="GRN", city="Grünau", country="Germany")
+		self.assertEqual(resolve_location_ids("Grü"), [str(grunau.location_id)])
+		self.assertEqual(resolve_location_ids("gru"), [str(self.sao.location_id)])
+
+	def test_code_and_city_terms_are_cached_separately(self):
+		grunau = Location.objects.create(name="Grünau Field", airport_code="GRN", city="Grünau", country="Germany")
+		self._flight("GN1", grunau, self.jfk, self.from_sao.departure_time)
+		self.assertNotEqual(cache_key({"origin": "GRU"}), cache_key({"origin": "Grü"}))
+		self.assertEqual(cache_key({"origin": " sao  paulo"}), cache_key({"origin": "SÃO PAULO"}))
+		self.assertEqual(self._numbers("?origin=Gr%C3%BC"), ["GN1"])
+		self.assertEqual(self._numbers("?origin=gru"), ["GR1"])
+
+	def test_city_prefix_then_substring(self):
+		self.assertEqual(set(self._numbers("?destination=los")), {"AA1", "AA2", "AA3"})
+		self.assertEqual(self._numbers("?destination=york"), ["GR1"])
+		self.assertEqual(self._numbers("?origin=sao%20PAULO"), ["GR1"])
+
+	def test_unknown_location_returns_empty(self):
+		self.assertEqual(self._numbers("?origin=Nowhere"), [])
+
+	def test_date_is_half_open_utc_range(self):
+		self.assertEqual(self._numbers(f"?origin=JFK&date={self.day.isoformat()}"), ["AA1", "AA2"])
+
+	def test_invalid_date_rejected(self):
+		res = self.client.get(self.url + "?date=tomorrow")
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FlightSearchFilterTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.lax = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.day = datetime.date(2030, 5, 1)
+		start = datetime.datetime(2030, 5, 1, tzinfo=datetime.timezone.utc)
+		# number, departure hour, duration hours, price, available seats, status
+		for number, hour, hours, price, seats, flight_status in [
+			("FL1", 6, 6, "300.00", 50, "scheduled"),
+			("FL2", 9, 5, "150.00", 2, "scheduled"),
+			("FL3", 13, 7, "99.00", 80, "delayed"),
+			("FL4", 18, 4, "450.00", 10, "scheduled"),
+			("FL5", 21, 3, "120.00", 0, "cancelled"),
+		]:
+			departure = start + datetime.timedelta(hours=hour)
+			Flight.objects.create(
+				flight_number=number,
+				departure_location=self.jfk,
+				arrival_location=self.lax,
+				departure_time=departure,
+				arrival_time=departure + datetime.timedelta(hours=hours),
+				total_seats=100,
+				available_seats=seats,
+				price=price,
+				status=flight_status,
+			)
+
+	def _numbers(self, **params):
+		res = self.client.get(self.url, {"origin": "JFK", **params})
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+		return [f["flight_number"] for f in res.json()["results"]]
+
+	def test_filters(self):
+		self.assertEqual(self._numbers(min_price="120", max_price="300"), ["FL1", "FL2", "FL5"])
+		self.assertEqual(self._numbers(date="2030-05-01", departure_after="08:00", departure_before="18:00"), ["FL2", "FL3"])
+		self.assertEqual(self._numbers(departure_after="2030-05-01T18:00:00Z"), ["FL4", "FL5"])
+		self.assertEqual(self._numbers(min_duration="300", max_duration="360"), ["FL1", "FL2"])
+		self.assertEqual(self._numbers(min_seats="10"), ["FL1", "FL3", "FL4"])
+		self.assertEqual(self._numbers(status="delayed,cancelled"), ["FL3", "FL5"])
+		self.assertEqual(self._numbers(status="scheduled", min_seats="5", sort="-price"), ["FL4", "FL1"])
+
+	def test_sorting(self):
+		self.assertEqual(self._numbers(sort="price"), ["FL3", "FL5", "FL2", "FL1", "FL4"])
+		self.assertEqual(self._numbers(sort="-duration"), ["FL3", "FL1", "FL2", "FL4", "FL5"])
+		self.assertEqual(self._numbers(sort="departure"), ["FL1", "FL2", "FL3", "FL4", "FL5"])
+
+	def test_sorted_pages_follow_the_sort(self):
+		seen = []
+		url = self.url + "?origin=JFK&sort=duration&page_size=2"
+		while url:
+			body = self.client.get(url).json()
+			seen.extend(f["flight_number"] for f in body["results"])
+			url = body["next"]
+		self.assertEqual(seen, ["FL5", "FL4", "FL2", "FL1", "FL3"])
+
+	def test_invalid_filters_rejected(self):
+		for params in [
+			{"sort": "seats"}, {"status": "lost"}, {"min_price": "cheap"},
+			{"min_seats": "-1"}, {"departure_after": "08:00"},
+		]:
+			res = self.client.get(self.url, params)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class SearchProjectionTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(
+			name="JFK Airport", airport_code="JFK", city="New York", country="USA", timezone="America/New_York")
+		self.nrt = Location.objects.create(
+			name="Narita", airport_code="NRT", city="Tokyo", country="Japan", timezone="Asia/Tokyo")
+		# 19:30 on May 1st in New York, 01:00 on May 2nd in Tokyo
+		self.evening = self._flight("PJ1", self.jfk, self.nrt, datetime.datetime(2030, 5, 1, 23, 30, tzinfo=datetime.timezone.utc))
+		self.night = self._flight("PJ2", self.nrt, self.jfk, datetime.datetime(2030, 5, 1, 16, 0, tzinfo=datetime.timezone.utc))
+
+	def _flight(self, number, origin, dest, departure):
+		return Flight.objects.create(
+			flight_number=number,
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + datetime.timedelta(hours=13),
+			total_seats=100,
+			available_seats=100,
+			price="900.00",
+		)
+
+	def _numbers(self, **params):
+		res = self.client.get(self.url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+		return [f["flight_number"] for f in res.json()["results"]]
+
+	def test_rows_follow_flight_and_seat_changes(self):
+		row = FlightSearchRow.objects.get(pk=self.evening.pk)
+		self.assertEqual((row.departure_date, row.duration), (datetime.date(2030, 5, 1), datetime.timedelta(hours=13)))
+		reserve_seats(self.evening.pk, 3)
+		change_status('cancelled', flight_ids=[self.night.pk])
+		self.assertEqual(FlightSearchRow.objects.get(pk=self.evening.pk).available_seats, 97)
+		self.assertEqual(FlightSearchRow.objects.get(pk=self.night.pk).status, "cancelled")
+		self.night.delete()
+		self.assertFalse(FlightSearchRow.objects.filter(pk=self.night.pk).exists())
+
+	def test_local_date_agrees_across_backends(self):
+		for backend in ("projection", "flights"):
+			with self.settings(FLIGHT_SEARCH_BACKEND=backend, FLIGHT_SEARCH_CACHE_ENABLED=False):
+				self.assertEqual(self._numbers(local_date="2030-05-01"), ["PJ1"], backend)
+				self.assertEqual(self._numbers(local_date="2030-05-02"), ["PJ2"], backend)
+				self.assertEqual(self._numbers(origin="JFK", local_date="2030-05-02"), [], backend)
+				self.assertEqual(self._numbers(date="2030-05-01", sort="-departure"), ["PJ1", "PJ2"], backend)
+
+	def test_time_zone_change_reprojects_departures(self):
+		self.nrt.timezone = "UTC"
+		self.nrt.save()
+		self.assertEqual(FlightSearchRow.objects.get(pk=self.night.pk).departure_date, datetime.date(2030, 5, 1))
+
+
+@skipIf(columnar.np is None, "numpy is not installed")
+@override_settings(FLIGHT_SEARCH_CACHE_ENABLED=False)
+class ColumnarSearchTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(
+			name="JFK Airport", airport_code="JFK", city="New York", country="USA", timezone="America/New_York")
+		self.lax = Location.objects.create(
+			name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA", timezone="America/Los_Angeles")
+		self.nrt = Location.objects.create(
+			name="Narita", airport_code="NRT", city="Tokyo", country="Japan", timezone="Asia/Tokyo")
+		start = datetime.datetime(2030, 5, 1, tzinfo=datetime.timezone.utc)
+		routes = [(self.jfk, self.lax), (self.lax, self.jfk), (self.jfk, self.nrt), (self.nrt, self.lax)]
+		statuses = ["scheduled", "scheduled", "delayed", "cancelled", "boarding"]
+		self.flights = []
+		for i in range(40):
+			origin, dest = routes[i % len(routes)]
+			# Repeating prices, durations and departure times so the flight_id tiebreaker matters
+			departure = start + datetime.timedelta(hours=(i * 5) % 48)
+			self.flights.append(Flight.objects.create(
+				flight_number=f"CS{i}",
+				departure_location=origin,
+				arrival_location=dest,
+				departure_time=departure,
+				arrival_time=departure + datetime.timedelta(hours=2 + i % 6),
+				total_seats=100,
+				available_seats=(i * 7) % 60,
+				price=f"{100 + (i * 37) % 5 * 50}.50",
+				status=statuses[i % len(statuses)],
+			))
+		self.past = self._past_flight()
+		columnar.flight_columns.load()
+
+	def _past_flight(self):
+		departure = timezone.now() - datetime.timedelta(days=2)
+		return Flight.objects.create(
+			flight_number="CSPAST", departure_location=self.jfk, arrival_location=self.lax,
+			departure_time=departure, arrival_time=departure + datetime.timedelta(hours=5),
+			total_seats=100, available_seats=100, price="100.00",
+		)
+
+	def _pages(self, backend, **params):
+		"""Every page of a search, following next links, then back through previous links."""
+		with self.settings(FLIGHT_SEARCH_BACKEND=backend):
+			pages = []
+			url, query = self.url, {"page_size": 4, **params}
+			while url:
+				res = self.client.get(url, query)
+				self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+				pages.append(res.json())
+				url, query = pages[-1]["next"], None
+			url = pages[-1]["previous"]
+			while url:
+				pages.append(self.client.get(url).json())
+				url = pages[-1]["previous"]
+			return pages
+
+	def _numbers(self, **params):
+		with self.settings(FLIGHT_SEARCH_BACKEND="columnar"):
+			res = self.client.get(self.url, params)
+		return [f["flight_number"] for f in res.json()["results"]]
+
+	def test_results_agree_with_orm(self):
+		searches = [
+			{"date": "2030-05-01"},
+			{"date": "2030-05-02", "sort": "-departure"},
+			{"date": "2030-05-01", "origin": "JFK", "sort": "price"},
+			{"date": "2030-05-01", "destination": "Los Angeles", "sort": "-price"},
+			{"date": "2030-05-02", "sort": "duration", "min_seats": "10"},
+			{"local_date": "2030-05-01", "sort": "-duration", "status": "scheduled,delayed"},
+			{"local_date": "2030-05-02", "origin": "NRT"},
+			{"departure_after": "2030-05-01T12:00:00Z", "min_price": "150.5", "max_price": "250.50"},
+			{"date": "2030-05-01", "departure_after": "06:00", "departure_before": "20:00", "min_duration": "180", "max_duration": "300"},
+			{"date": "2030-05-01", "origin": "Nowhere"},
+		]
+		for params in searches:
+			self.assertEqual(self._pages("columnar", **params), self._pages("projection", **params), params)
+
+	def test_follows_flight_changes(self):
+		first, second = self.flights[0], self.flights[4]
+		with self.captureOnCommitCallbacks(execute=True):
+			change_status('cancelled', flight_ids=[first.pk])
+		with self.captureOnCommitCallbacks(execute=True):
+			second.price = "1.00"
+			second.save()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.flights[8].delete()
+		self.assertEqual(self._numbers(date="2030-05-01", origin="JFK", status="cancelled"), ["CS0"])
+		self.assertEqual(self._numbers(date="2030-05-01", sort="price")[0], "CS4")
+		self.assertNotIn("CS8", self._numbers(date="2030-05-01", page_size=100))
+		self.assertEqual(
+			self._pages("columnar", date="2030-05-01", sort="price"), self._pages("projection", date="2030-05-01", sort="price"))
+
+	def test_changes_are_read_outside_the_lock(self):
+		self.assertIn("CS1", self._numbers(date="2030-05-01", min_seats="2", page_size=100))
+		Flight.objects.filter(pk=self.flights[1].pk).update(available_seats=1)
+		free = lock_free_while_querying(columnar.flight_columns, lambda: columnar.flight_columns.apply([self.flights[1].pk]))
+		self.assertEqual(free, [True])
+		self.assertNotIn("CS1", self._numbers(date="2030-05-01", min_seats="2", page_size=100))
+
+	def test_uncovered_searches_read_the_database(self):
+		self.assertIn("CSPAST", self._numbers(origin="JFK", page_size=100))
+		self.assertEqual(self._pages("columnar", origin="JFK"), self._pages("projection", origin="JFK"))
+
+
+class FlightPaginationTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.base = timezone.now() + timezone.timedelta(days=1)
+		# Two flights share each departure time so the flight_id tiebreaker matters
+		for i in range(10):
+			self._flight(f"PG{i}", self.base + timezone.timedelta(hours=i // 2))
+
+	def _flight(self, number, departure):
+		return Flight.objects.create(
+			flight_number=number,
+			departure_location=self.origin,
+			arrival_location=self.dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=100,
+			available_seats=100,
+			price="100.00",
+		)
+
+	def _walk(self, url):
+		seen = []
+		while url:
+			body = self.client.get(url).json()
+			seen.extend(f["flight_id"] for f in body["results"])
+			url = body["next"]
+		return seen
+
+	def test_walks_every_flight_once_in_order(self):
+		seen = self._walk(self.url + "?page_size=3")
+		expected = [
+			str(pk) for pk in Flight.objects.order_by("departure_time", "flight_id").values_list("flight_id", flat=True)
+		]
+		self.assertEqual(seen, expected)
+
+	def test_cursor_stable_across_inserts_before_it(self):
+		first = self.client.get(self.url + "?page_size=4").json()
+		# A flight inserted before the cursor must not shift the next page
+		self._flight("EARLY", self.base - timezone.timedelta(hours=1))
+		second = self.client.get(first["next"]).json()
+		expected = [
+			str(pk) for pk in Flight.objects.order_by("departure_time", "flight_id").values_list("flight_id", flat=True)
+		][5:9]
+		self.assertEqual([f["flight_id"] for f in second["results"]], expected)
+
+	def test_previous_link_returns_prior_page(self):
+		first = self.client.get(self.url + "?page_size=3").json()
+		self.assertIsNone(first["previous"])
+		second = self.client.get(first["next"]).json()
+		back = self.client.get(second["previous"]).json()
+		self.assertEqual(back["results"], first["results"])
+
+	def test_page_size_clamped_and_filters_kept(self):
+		with self.settings(FLIGHT_MAX_PAGE_SIZE=4):
+			body = self.client.get(self.url + "?origin=JFK&page_size=100").json()
+		self.assertEqual(len(body["results"]), 4)
+		self.assertIn("origin=JFK", body["next"])
+
+	def test_invalid_cursor(self):
+		res = self.client.get(self.url + "?cursor=not-a-cursor")
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FlightSearchCacheTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.lax = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.ord = Location.objects.create(name="O'Hare", airport_code="ORD", city="Chicago", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		self.flight = Flight.objects.create(
+			flight_number="CA1",
+			departure_location=self.jfk,
+			arrival_location=self.lax,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+		)
+
+	def test_repeat_search_served_from_cache(self):
+		first = self.client.get(self.url + "?origin=JFK")
+		with self.assertNumQueries(0):
+			second = self.client.get(self.url + "?origin=%20jfk")
+		self.assertEqual(first.content, second.content)
+
+	def test_seat_change_invalidates_route(self):
+		self.client.get(self.url + "?origin=JFK")
+		reserve_url = reverse("flight-reserve-seat", args=[self.flight.flight_id])
+		self.client.post(reserve_url, HTTP_X_SERVICE_API_KEY=settings.SERVICE_API_KEY)
+		res = self.client.get(self.url + "?origin=JFK")
+		self.assertEqual(res.json()["results"][0]["available_seats"], 9)
+
+	def test_unrelated_route_stays_cached(self):
+		self.client.get(self.url + "?origin=ORD")
+		departure = timezone.now() + timezone.timedelta(days=2)
+		Flight.objects.create(
+			flight_number="CA2",
+			departure_location=self.jfk,
+			arrival_location=self.lax,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+		)
+		with self.assertNumQueries(0):
+			self.client.get(self.url + "?origin=ORD")
+
+
+class FastReadTests(TestCase):
+	def setUp(self):
+		self.origin = Location.objects.create(name="Guarulhos \u2028 Intl", airport_code="GRU", city="São Paulo", country="Brasil")
+		self.dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		for i, price in enumerate(["100.00", "99.5", "0"]):
+			Flight.objects.create(
+				flight_number=f"FR{i}",
+				departure_location=self.origin,
+				arrival_location=self.dest,
+				departure_time=departure + timezone.timedelta(minutes=i, microseconds=i),
+				arrival_time=departure + timezone.timedelta(hours=6),
+				total_seats=100,
+				available_seats=100 - i,
+				price=price,
+			)
+
+	def test_output_is_byte_identical_to_serializer(self):
+		from rest_framework.renderers import JSONRenderer
+		from .fast_read import FLIGHT_VALUES, dumps, render_flights
+
+		queryset = Flight.objects.order_by("departure_time")
+		expected = JSONRenderer().render(FlightReadSerializer(queryset, many=True).data)
+		self.assertEqual(dumps(render_flights(queryset.values(*FLIGHT_VALUES))), expected)
+
+	def test_location_lookups_are_not_per_row(self):
+		from .fast_read import FLIGHT_VALUES, render_flights
+
+		render_flights(Flight.objects.values(*FLIGHT_VALUES))
+		with self.assertNumQueries(1):
+			render_flights(Flight.objects.values(*FLIGHT_VALUES))
+
+
+class SeatInventoryTests(APITestCase):
+	def setUp(self):
+		origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		self.flight = Flight.objects.create(
+			flight_number="SI1",
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+		)
+		self.reserve_url = reverse("flight-reserve-seats", args=[self.flight.flight_id])
+		self.release_url = reverse("flight-release-seats", args=[self.flight.flight_id])
+		self.headers = {"HTTP_X_SERVICE_API_KEY": settings.SERVICE_API_KEY}
+
+	def _post(self, url, seats):
+		return self.client.post(url, {"seats": seats}, format="json", **self.headers)
+
+	def test_reserve_many_in_one_call(self):
+		res = self._post(self.reserve_url, 7)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+		self.assertEqual(res.data["remaining_seats"], 3)
+
+	def test_reserve_is_all_or_nothing(self):
+		self._post(self.reserve_url, 7)
+		res = self._post(self.reserve_url, 4)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		self.assertEqual(res.data["remaining_seats"], 3)
+		self.flight.refresh_from_db()
+		self.assertEqual(self.flight.available_seats, 3)
+
+	def test_release_cannot_exceed_total(self):
+		self._post(self.reserve_url, 2)
+		self.assertEqual(self._post(self.release_url, 2).data["remaining_seats"], 10)
+		res = self._post(self.release_url, 1)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+	def test_requires_service_key_and_valid_count(self):
+		self.assertEqual(self.client.post(self.reserve_url, {"seats": 1}).status_code, status.HTTP_403_FORBIDDEN)
+		self.assertEqual(self._post(self.reserve_url, 0).status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_unknown_flight(self):
+		url = reverse("flight-reserve-seats", args=["00000000-0000-0000-0000-000000000000"])
+		self.assertEqual(self._post(url, 1).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SeatHoldTests(APITestCase):
+	def setUp(self):
+		origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		self.flights = [
+			Flight.objects.create(
+				flight_number=f"SH{i}",
+				departure_location=origin,
+				arrival_location=dest,
+				departure_time=departure,
+				arrival_time=departure + timezone.timedelta(hours=6),
+				total_seats=10,
+				available_seats=10,
+				price="100.00",
+			)
+			for i in range(2)
+		]
+		self.headers = {"HTTP_X_SERVICE_API_KEY": settings.SERVICE_API_KEY}
+
+	def _seats(self, flight):
+		flight.refresh_from_db()
+		return flight.available_seats
+
+	def test_hold_decrements_and_confirm_keeps_seats(self):
+		url = reverse("flight-hold-seats", args=[self.flights[0].flight_id])
+		res = self.client.post(url, {"seats": 3}, format="json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(res.data["remaining_seats"], 7)
+
+		confirm_url = reverse("flight-confirm-hold", args=[self.flights[0].flight_id, res.data["hold_id"]])
+		self.assertEqual(self.client.post(confirm_url, **self.headers).status_code, status.HTTP_200_OK)
+		self.assertEqual(expire_holds(now=timezone.now() + timezone.timedelta(days=1)), 0)
+		self.assertEqual(self._seats(self.flights[0]), 7)
+
+	def test_release_hold_returns_seats_once(self):
+		hold, _ = create_hold(self.flights[0].flight_id, 4)
+		url = reverse("flight-release-hold", args=[self.flights[0].flight_id, hold.hold_id])
+		res = self.client.post(url, **self.headers)
+		self.assertEqual(res.data["remaining_seats"], 10)
+		self.assertEqual(self.client.post(url, **self.headers).status_code, status.HTTP_409_CONFLICT)
+
+	def test_sweeper_expires_in_batches_per_flight(self):
+		for flight in self.flights:
+			create_hold(flight.flight_id, 2)
+			create_hold(flight.flight_id, 1)
+		live, _ = create_hold(self.flights[0].flight_id, 1, ttl_seconds=3600)
+
+		later = timezone.now() + timezone.timedelta(minutes=30)
+		self.assertEqual(expire_holds(batch_size=3, now=later), 3)
+		self.assertEqual(expire_holds(batch_size=3, now=later), 1)
+		self.assertEqual(expire_holds(batch_size=3, now=later), 0)
+		self.assertEqual(self._seats(self.flights[0]), 9)
+		self.assertEqual(self._seats(self.flights[1]), 10)
+		self.assertEqual(SeatHold.objects.get(pk=live.pk).status, "active")
+
+	def test_expired_hold_cannot_be_confirmed(self):
+		hold, _ = create_hold(self.flights[0].flight_id, 1)
+		SeatHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+		with self.assertRaises(HoldNotActive):
+			confirm_hold(self.flights[0].flight_id, hold.hold_id)
+
+
+@override_settings(HOT_INVENTORY_STORE="memory")
+class HotInventoryTests(APITestCase):
+	def setUp(self):
+		# A fresh in-memory store per test
+		hot_inventory._store_kind = None
+		origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		self.flight = Flight.objects.create(
+			flight_number="HOT1",
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=6),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+		)
+		self.headers = {"HTTP_X_SERVICE_API_KEY": settings.SERVICE_API_KEY}
+
+	def _seats(self):
+		self.flight.refresh_from_db()
+		return self.flight.available_seats
+
+	def test_reservations_are_written_behind(self):
+		url = reverse("flight-hot-inventory", args=[self.flight.flight_id])
+		admin_headers = {"HTTP_X_USER_ID": "123", "HTTP_X_USER_EMAIL": "admin@example.com", "HTTP_X_USER_ROLE": "ADMIN"}
+		self.assertEqual(
+			self.client.post(url, {"enabled": True}, format="json", **self.headers).status_code,
+			status.HTTP_403_FORBIDDEN
+		)
+		res = self.client.post(url, {"enabled": True}, format="json", **admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertTrue(res.data["hot_inventory"])
+
+		self.assertEqual(reserve_seats(self.flight.flight_id, 4), 6)
+		self.assertEqual(self._seats(), 10)
+		self.assertEqual(hot_inventory.flush(), 1)
+		self.assertEqual(self._seats(), 6)
+		self.assertEqual(hot_inventory.flush(), 0)
+
+	def test_store_rejects_overbooking(self):
+		hot_inventory.enable(self.flight.flight_id)
+		res = self.client.post(
+			reverse("flight-reserve-seats", args=[self.flight.flight_id]), {"seats": 11}, format="json", **self.headers
+		)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		self.assertEqual(res.data["remaining_seats"], 10)
+
+	def test_expired_holds_return_seats_to_store(self):
+		hot_inventory.enable(self.flight.flight_id)
+		create_hold(self.flight.flight_id, 3)
+		self.assertEqual(expire_holds(now=timezone.now() + timezone.timedelta(hours=1)), 1)
+		self.assertEqual(hot_inventory.get_seat_store().get(self.flight.flight_id), 10)
+
+	def test_reconcile_reseeds_empty_store(self):
+		hot_inventory.enable(self.flight.flight_id)
+		reserve_seats(self.flight.flight_id, 2)
+		hot_inventory.flush()
+		hot_inventory._store_kind = None  # store restarted empty
+		self.assertEqual(hot_inventory.reconcile(), 1)
+		self.assertEqual(reserve_seats(self.flight.flight_id, 1), 7)
+
+	def test_store_outage_only_affects_hot_flights(self):
+		store = hot_inventory.get_seat_store()
+		url = reverse("flight-reserve-seats", args=[self.flight.flight_id])
+		with patch.object(store, "take", side_effect=ConnectionError("down")) as take:
+			res = self.client.post(url, {"seats": 2}, format="json", **self.headers)
+			self.assertEqual(res.status_code, status.HTTP_200_OK)
+			take.assert_not_called()
+			hot_inventory.enable(self.flight.flight_id)
+			res = self.client.post(url, {"seats": 2}, format="json", **self.headers)
+			self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+	def test_failed_hold_gives_store_seats_back(self):
+		hot_inventory.enable(self.flight.flight_id)
+		with patch("flights.holds.SeatHold.objects.create", side_effect=RuntimeError("insert failed")):
+			with self.assertRaises(RuntimeError):
+				create_hold(self.flight.flight_id, 3)
+		self.assertEqual(hot_inventory.get_seat_store().get(self.flight.flight_id), 10)
+
+	def test_disable_writes_back_final_count(self):
+		hot_inventory.enable(self.flight.flight_id)
+		reserve_seats(self.flight.flight_id, 5)
+		hot_inventory.disable(self.flight.flight_id)
+		self.assertEqual(self._seats(), 5)
+		self.assertFalse(self.flight.hot_inventory)
+		self.assertEqual(reserve_seats(self.flight.flight_id, 1), 4)
+		self.assertEqual(self._seats(), 4)
+
+
+class FlightImportTests(APITestCase):
+	def setUp(self):
+		Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.url = reverse("flight-import-flights")
+		self.headers = {
+			"HTTP_X_USER_ID": "123",
+			"HTTP_X_USER_EMAIL": "admin@example.com",
+			"HTTP_X_USER_ROLE": "ADMIN",
+		}
+
+	def test_csv_import_reports_bad_rows(self):
+		body = (
+			"flight_number,departure_location,arrival_location,departure_time,arrival_time,total_seats,available_seats,price\n"
+			"IM1,jfk,LAX,2030-01-01T08:00:00Z,2030-01-01T14:00:00Z,100,,199.99\n"
+			"IM2,JFK,XXX,2030-01-01T08:00:00Z,2030-01-01T14:00:00Z,100,100,199.99\n"
+			"IM3,LAX,JFK,2030-01-02T08:00:00Z,2030-01-02T07:00:00Z,100,100,199.99\n"
+			"IM4,LAX,JFK,2030-01-02T08:00:00Z,2030-01-02T14:00:00Z,100,90,1.5\n"
+		)
+		with patch("flights.importer.publish_event"):
+			res = self.client.generic("POST", self.url, body, content_type="text/csv", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(res.data["created"], 2)
+		self.assertEqual([error["line"] for error in res.data["errors"]], [3, 4])
+		self.assertIn("arrival_location", res.data["errors"][0]["errors"])
+		self.assertEqual(Flight.objects.get(flight_number="IM1").available_seats, 100)
+
+	def test_ndjson_import_in_chunks_publishes_per_chunk(self):
+		lines = [
+			json.dumps({
+				"flight_number": f"ND{i}",
+				"departure_location": "JFK",
+				"arrival_location": "LAX",
+				"departure_time": "2030-02-01T08:00:00Z",
+				"arrival_time": "2030-02-01T14:00:00Z",
+				"total_seats": 50,
+				"price": "99.00",
+			})
+			for i in range(5)
+		] + ["not json"]
+		with patch("flights.importer.publish_event") as publish:
+			with self.captureOnCommitCallbacks(execute=True):
+				result = import_flights(parse_ndjson(lines), chunk_size=2)
+		self.assertEqual(result["created"], 5)
+		self.assertEqual(result["errors"][0]["line"], 6)
+		self.assertEqual(publish.call_count, 3)
+		self.assertEqual([call.args[1]["count"] for call in publish.call_args_list], [2, 2, 1])
+		self.assertEqual(Flight.objects.filter(flight_number__startswith="ND").count(), 5)
+
+	def test_ndjson_seat_counts_must_be_integers(self):
+		row = {
+			"flight_number": "NI1",
+			"departure_location": "JFK",
+			"arrival_location": "LAX",
+			"departure_time": "2030-02-01T08:00:00Z",
+			"arrival_time": "2030-02-01T14:00:00Z",
+			"price": "99.00",
+		}
+		lines = [json.dumps({**row, "total_seats": seats}) for seats in (99.5, True, 100.0)]
+		result = import_flights(parse_ndjson(lines), dry_run=True)
+		self.assertEqual(result["created"], 1)
+		self.assertEqual(
+			[error["errors"] for error in result["errors"]],
+			[{"total_seats": "A valid integer is required."}] * 2
+		)
+
+	def test_dry_run_saves_nothing(self):
+		rows = parse_csv([
+			"flight_number,departure_location,arrival_location,departure_time,arrival_time,total_seats,price\n",
+			"DR1,JFK,LAX,2030-01-01T08:00:00,2030-01-01T14:00:00,100,10\n",
+		])
+		self.assertEqual(import_flights(rows, dry_run=True)["created"], 1)
+		self.assertFalse(Flight.objects.exists())
+
+	def test_unsupported_content_type(self):
+		res = self.client.generic("POST", self.url, "{}", content_type="application/json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+class FlightScheduleTests(APITestCase):
+	def setUp(self):
+		self.origin = Location.objects.create(
+			name="JFK Airport", airport_code="JFK", city="New York", country="USA", timezone="America/New_York"
+		)
+		self.dest = Location.objects.create(
+			name="LHR Airport", airport_code="LHR", city="London", country="UK", timezone="Europe/London"
+		)
+		self.headers = {
+			"HTTP_X_USER_ID": "123",
+			"HTTP_X_USER_EMAIL": "admin@example.com",
+			"HTTP_X_USER_ROLE": "ADMIN",
+		}
+		# A Monday in winter, so both zones are on standard time
+		self.now = datetime.datetime(2030, 1, 7, 12, 0, tzinfo=datetime.timezone.utc)
+		self.schedule = FlightSchedule.objects.create(
+			flight_number="SC100",
+			departure_location=self.origin,
+			arrival_location=self.dest,
+			days_of_week="135",
+			departure_local_time=datetime.time(18, 30),
+			arrival_local_time=datetime.time(6, 45),
+			arrival_day_offset=1,
+			valid_from=datetime.date(2030, 1, 1),
+			valid_until=datetime.date(2030, 1, 31),
+			total_seats=200,
+			price="450.00",
+		)
+
+	def _generate(self):
+		return generate(self.schedule, horizon_days=14, now=self.now)
+
+	def test_generates_local_times_over_horizon(self):
+		self.assertEqual(self._generate(), {"created": 7, "updated": 0, "removed": 0, "cancelled": 0})
+		first = Flight.objects.order_by("departure_time").first()
+		self.assertEqual(first.service_date, datetime.date(2030, 1, 7))
+		self.assertEqual(first.departure_time, datetime.datetime(2030, 1, 7, 23, 30, tzinfo=datetime.timezone.utc))
+		self.assertEqual(first.arrival_time, datetime.datetime(2030, 1, 8, 6, 45, tzinfo=datetime.timezone.utc))
+		self.schedule.refresh_from_db()
+		self.assertEqual(self.schedule.generated_until, datetime.date(2030, 1, 21))
+
+	def test_regeneration_only_touches_changed_dates(self):
+		self._generate()
+		self.assertEqual(self._generate(), {"created": 0, "updated": 0, "removed": 0, "cancelled": 0})
+
+		booked = Flight.objects.get(service_date=datetime.date(2030, 1, 9))
+		Flight.objects.filter(pk=booked.pk).update(available_seats=150)
+		self.schedule.days_of_week = "15"
+		self.schedule.total_seats = 180
+		self.schedule.save()
+		result = self._generate()
+		self.assertEqual(result, {"created": 0, "updated": 5, "removed": 1, "cancelled": 1})
+		booked.refresh_from_db()
+		self.assertEqual(booked.status, "cancelled")
+		self.assertFalse(Flight.objects.filter(service_date=datetime.date(2030, 1, 16)).exists())
+		self.assertEqual(Flight.objects.get(service_date=datetime.date(2030, 1, 11)).available_seats, 180)
+
+	def test_booked_flights_keep_route_and_announce_new_times(self):
+		self._generate()
+		booked = Flight.objects.get(service_date=datetime.date(2030, 1, 9))
+		Flight.objects.filter(pk=booked.pk).update(available_seats=150)
+		other = Flight.objects.get(service_date=datetime.date(2030, 1, 11))
+		gatwick = Location.objects.create(
+			name="LGW Airport", airport_code="LGW", city="London", country="UK", timezone="Europe/London"
+		)
+		self.schedule.arrival_location = gatwick
+		self.schedule.departure_local_time = datetime.time(20, 0)
+		self.schedule.save()
+		with patch("flights.schedules.notify_flights_changed") as notify:
+			self.assertEqual(self._generate()["updated"], 7)
+		# Searches cached for the old route are invalidated too
+		self.assertIn((other.pk, self.origin.pk, self.dest.pk), notify.call_args[0][0])
+
+		booked.refresh_from_db()
+		other.refresh_from_db()
+		self.assertEqual((booked.arrival_location_id, booked.status), (self.dest.pk, "delayed"))
+		self.assertEqual((other.arrival_location_id, other.status), (gatwick.pk, "scheduled"))
+		events = OutboxEvent.objects.filter(event_type="flight_delayed")
+		self.assertEqual([event.payload["flight_id"] for event in events], [str(booked.pk)])
+		self.assertEqual(events[0].payload["new_departure_time"], booked.departure_time.isoformat())
+
+	def test_regeneration_keeps_delays_and_edits(self):
+		self._generate()
+		delayed = Flight.objects.get(service_date=datetime.date(2030, 1, 9))
+		change_status("delayed", flight_ids=[delayed.pk], delay=datetime.timedelta(hours=3))
+		edited = Flight.objects.get(service_date=datetime.date(2030, 1, 11))
+		Flight.objects.filter(pk=edited.pk).update(price="399.00")
+		delayed.refresh_from_db()
+		self.assertEqual(self._generate(), {"created": 0, "updated": 0, "removed": 0, "cancelled": 0})
+
+		self.schedule.price = "500.00"
+		self.schedule.save()
+		self.assertEqual(self._generate()["updated"], 5)
+		kept = Flight.objects.get(pk=delayed.pk)
+		self.assertEqual((kept.departure_time, kept.status, kept.price), (delayed.departure_time, "delayed", delayed.price))
+		self.assertEqual(str(Flight.objects.get(pk=edited.pk).price), "399.00")
+		self.assertEqual(str(Flight.objects.get(service_date=datetime.date(2030, 1, 7)).price), "500.00")
+
+	def test_hot_flights_are_cancelled_not_deleted(self):
+		self._generate()
+		hot = Flight.objects.get(service_date=datetime.date(2030, 1, 9))
+		Flight.objects.filter(pk=hot.pk).update(hot_inventory=True)
+		self.schedule.days_of_week = "15"
+		self.schedule.save()
+		self.assertEqual(self._generate()["cancelled"], 1)
+		hot.refresh_from_db()
+		self.assertEqual(hot.status, "cancelled")
+
+	def test_create_via_api_generates_flights(self):
+		payload = {
+			"flight_number": "SC200",
+			"departure_location": "LHR",
+			"arrival_location": "JFK",
+			"days_of_week": "7",
+			"departure_local_time": "10:00",
+			"arrival_local_time": "13:00",
+			"valid_from": "2099-01-01",
+			"valid_until": "2099-01-31",
+			"total_seats": 150,
+			"price": "300.00",
+		}
+		res = self.client.post(reverse("flightschedule-list"), payload, format="json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+		self.assertEqual(res.data["generated"]["created"], 0)  # outside the horizon
+
+		payload["days_of_week"] = "8"
+		res = self.client.post(reverse("flightschedule-list"), payload, format="json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConnectionSearchTests(APITestCase):
+	def setUp(self):
+		self.locations = {
+			code: Location.objects.create(name=f"{code} Airport", airport_code=code, city=city, country="USA")
+			for code, city in [("JFK", "New York"), ("ORD", "Chicago"), ("DEN", "Denver"), ("LAX", "Los Angeles")]
+		}
+		self.day = datetime.datetime(2030, 3, 1, tzinfo=datetime.timezone.utc)
+		self.direct = self._flight("JFK", "LAX", 8, 14)
+		self._flight("JFK", "ORD", 7, 9)
+		self._flight("ORD", "LAX", 9, 13, minutes=30)  # too tight a connection
+		self._flight("ORD", "LAX", 11, 15)
+		self._flight("ORD", "DEN", 10, 12)
+		self._flight("DEN", "LAX", 13, 15)
+		route_graph.load()
+		self.url = reverse("flight-connections")
+
+	def _flight(self, origin, destination, departs, arrives, minutes=0):
+		return Flight.objects.create(
+			flight_number=f"{origin}{destination}{departs}",
+			departure_location=self.locations[origin],
+			arrival_location=self.locations[destination],
+			departure_time=self.day + datetime.timedelta(hours=departs, minutes=minutes),
+			arrival_time=self.day + datetime.timedelta(hours=arrives),
+			total_seats=100,
+			available_seats=100,
+			price="100.00",
+		)
+
+	def _search(self, **params):
+		params = {"origin": "JFK", "destination": "LAX", "date": "2030-03-01", **params}
+		res = self.client.get(self.url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [[flight["flight_number"] for flight in itinerary["flights"]] for itinerary in res.json()["results"]]
+
+	def test_itineraries_respect_connection_times_and_stops(self):
+		self.assertEqual(
+			self._search(),
+			[["JFKLAX8"], ["JFKORD7", "ORDLAX11"], ["JFKORD7", "ORDDEN10", "DENLAX13"]]
+		)
+		self.assertEqual(self._search(max_stops=0), [["JFKLAX8"]])
+		self.assertEqual(self._search(min_connection_minutes=100), [["JFKLAX8"], ["JFKORD7", "ORDLAX11"]])
+
+	def test_graph_follows_flight_changes(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			self.direct.status = "cancelled"
+			self.direct.save()
+		self.assertNotIn(["JFKLAX8"], self._search())
+		with self.captureOnCommitCallbacks(execute=True):
+			self._flight("JFK", "LAX", 6, 12)
+		self.assertEqual(self._search()[0], ["JFKLAX6"])
+
+	def test_missing_parameters(self):
+		res = self.client.get(self.url, {"origin": "JFK"})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SeatMapTests(APITestCase):
+	def setUp(self):
+		origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + datetime.timedelta(days=2)
+		self.flight = Flight.objects.create(
+			flight_number="SM1",
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + datetime.timedelta(hours=5),
+			total_seats=12,
+			available_seats=12,
+			price="100.00",
+		)
+		self.map_url = f"/api/v1/flights/{self.flight.flight_id}/seatmap/"
+		self.admin_map_url = f"/api/v1/admin/flights/{self.flight.flight_id}/seatmap/"
+		self.reserve_url = reverse("flight-reserve-seats", args=[self.flight.flight_id])
+		self.release_url = reverse("flight-release-seats", args=[self.flight.flight_id])
+		self.admin_headers = {"HTTP_X_USER_ID": "123", "HTTP_X_USER_EMAIL": "admin@example.com", "HTTP_X_USER_ROLE": "ADMIN"}
+		self.service_headers = {"HTTP_X_SERVICE_API_KEY": settings.SERVICE_API_KEY}
+		res = self.client.put(self.admin_map_url, {"columns": "AB-CD", "rows": 3}, format="json", **self.admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+
+	def _seats(self, url, seat_numbers):
+		return self.client.post(
+			url, {"seats": len(seat_numbers), "seat_numbers": seat_numbers}, format="json", **self.service_headers
+		)
+
+	def test_layout_must_match_capacity(self):
+		res = self.client.put(self.admin_map_url, {"columns": "ABC-DEF", "rows": 3}, format="json", **self.admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		res = self.client.put(self.admin_map_url, {"columns": "A--B", "rows": 6}, format="json", **self.admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_claimed_seats_show_on_the_map(self):
+		res = self._seats(self.reserve_url, ["1A", "2d"])
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+		self.assertEqual(res.data["remaining_seats"], 10)
+		body = self.client.get(self.map_url).json()
+		self.assertEqual(body["rows"], ["X.-..", "..-.X", "..-.."])
+		self.assertEqual(body["taken_seats"], 2)
+		self.flight.refresh_from_db()
+		self.assertEqual(self.flight.available_seats, 10)
+
+	def test_taken_seats_are_not_sold_twice(self):
+		self._seats(self.reserve_url, ["1A"])
+		res = self._seats(self.reserve_url, ["1B", "1A"])
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		self.assertEqual(res.data["seat_numbers"], ["1A"])
+		self.flight.refresh_from_db()
+		self.assertEqual(self.flight.available_seats, 11)
+		res = self._seats(self.reserve_url, ["4A"])
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_release_frees_named_seats(self):
+		self._seats(self.reserve_url, ["3C", "3D"])
+		res = self._seats(self.release_url, ["3D", "1A"])
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+		res = self._seats(self.release_url, ["3D"])
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+		self.assertEqual(self.client.get(self.map_url).json()["rows"][2], "..-X.")
+		res = self.client.put(self.admin_map_url, {"columns": "ABCD", "rows": 3}, format="json", **self.admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+	def test_count_only_reservations_are_assigned_seats(self):
+		self._seats(self.reserve_url, ["1A"])
+		res = self.client.post(self.reserve_url, {"seats": 2}, format="json", **self.service_headers)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+		self.assertEqual((res.data["seat_numbers"], res.data["remaining_seats"]), (["1B", "1C"], 9))
+		res = self.client.post(
+			reverse("flight-reserve-seat", args=[self.flight.flight_id]), format="json", **self.service_headers
+		)
+		self.assertEqual(res.data["seat_numbers"], ["1D"])
+		self.assertEqual(self.client.get(self.map_url).json()["rows"][0], "XX-XX")
+		res = self.client.post(self.reserve_url, {"seats": 9}, format="json", **self.service_headers)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+		# Giving seats back and holding them still need seat numbers
+		res = self.client.post(self.release_url, {"seats": 1}, format="json", **self.service_headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		res = self.client.post(
+			reverse("flight-hold-seats", args=[self.flight.flight_id]), {"seats": 2}, format="json", **self.service_headers
+		)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		self.flight.refresh_from_db()
+		self.assertEqual(self.flight.available_seats, 8)
+
+	def test_layout_needs_an_unsold_flight(self):
+		Flight.objects.filter(pk=self.flight.pk).update(available_seats=11)
+		res = self.client.put(self.admin_map_url, {"columns": "ABCD", "rows": 3}, format="json", **self.admin_headers)
+		self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+	def test_layout_bitmap_helpers(self):
+		layout = Layout("ABC-DEF", 30, first_row=10)
+		mask = layout.mask(["10A", "39F", "12C"])
+		self.assertEqual(mask.bit_count(), 3)
+		self.assertEqual(layout.seat_numbers(mask), ["10A", "12C", "39F"])
+
+
+def lock_free_while_querying(index, apply):
+	"""Run `apply` and report, for each query it made, whether another thread could take the index lock."""
+	free = []
+
+	def probe():
+		acquired = index._lock.acquire(blocking=False)
+		if acquired:
+			index._lock.release()
+		free.append(acquired)
+
+	def wrapper(execute, sql, params, many, context):
+		thread = threading.Thread(target=probe)
+		thread.start()
+		thread.join()
+		return execute(sql, params, many, context)
+
+	with connection.execute_wrapper(wrapper):
+		apply()
+	return free
+
+
+class DeparturesBoardTests(APITestCase):
+	def setUp(self):
+		self.jfk = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.lax = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.now = timezone.now()
+		self._flight("DB1", -120, status="departed")  # outside the lookback window
+		self._flight("DB2", -10, status="departed")
+		self.next = self._flight("DB3", 60)
+		self._flight("DB4", 180, status="cancelled")
+		self._flight("DB5", 300)
+		self._flight("DB6", 30, origin=self.lax, dest=self.jfk)
+		departures_board.load()
+		self.url = "/api/v1/locations/jfk/departures/"
+
+	def _flight(self, number, minutes, status="scheduled", origin=None, dest=None):
+		departure = self.now + datetime.timedelta(minutes=minutes)
+		return Flight.objects.create(
+			flight_number=number,
+			departure_location=origin or self.jfk,
+			arrival_location=dest or self.lax,
+			departure_time=departure,
+			arrival_time=departure + datetime.timedelta(hours=5),
+			total_seats=100,
+			available_seats=100,
+			price="100.00",
+			status=status,
+		)
+
+	def _board(self, **params):
+		res = self.client.get(self.url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return [(flight["flight_number"], flight["status"]) for flight in res.json()["departures"]]
+
+	def test_lists_next_departures_with_statuses(self):
+		self.assertEqual(
+			self._board(),
+			[("DB2", "departed"), ("DB3", "scheduled"), ("DB4", "cancelled"), ("DB5", "scheduled")]
+		)
+		self.assertEqual(self._board(limit=2), [("DB2", "departed"), ("DB3", "scheduled")])
+		res = self.client.get(self.url)
+		self.assertEqual(res.json()["location"]["airport_code"], "JFK")
+		self.assertEqual(res.json()["departures"][0]["arrival_location"]["airport_code"], "LAX")
+
+	def test_polling_does_not_query(self):
+		self._board()
+		with self.assertNumQueries(0):
+			self._board()
+
+	def test_board_follows_flight_changes(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			self.next.status = "delayed"
+			self.next.departure_time = self.now + datetime.timedelta(minutes=240)
+			self.next.arrival_time = self.next.departure_time + datetime.timedelta(hours=5)
+			self.next.save()
+		with self.captureOnCommitCallbacks(execute=True):
+			self._flight("DB7", 20)
+		self.assertEqual(
+			self._board(),
+			[("DB2", "departed"), ("DB7", "scheduled"), ("DB4", "cancelled"), ("DB3", "delayed"), ("DB5", "scheduled")]
+		)
+
+	def test_changes_are_read_outside_the_lock(self):
+		Flight.objects.filter(pk=self.next.pk).update(status="boarding")
+		free = lock_free_while_querying(departures_board, lambda: departures_board.apply([self.next.pk]))
+		self.assertEqual(free, [True])
+		self.assertIn(("DB3", "boarding"), self._board())
+
+	def test_seat_changes_keep_the_entry(self):
+		key = str(self.next.pk)
+		entry = departures_board._flights[key]
+		Flight.objects.filter(pk=self.next.pk).update(available_seats=99)
+		departures_board.apply([self.next.pk])
+		self.assertIs(departures_board._flights[key], entry)
+
+	def test_unknown_airport(self):
+		res = self.client.get("/api/v1/locations/XXX/departures/")
+		self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+		res = self.client.get(self.url, {"limit": 0})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LocationSuggestTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/locations/suggest/"
+		for code, name, city in [
+			("JFK", "John F. Kennedy International", "New York"),
+			("LGA", "LaGuardia", "New York"),
+			("LHR", "London Heathrow", "London"),
+			("LCY", "London City Airport", "London"),
+			("NRT", "Narita International", "Tōkyō"),
+		]:
+			Location.objects.create(name=name, airport_code=code, city=city, country="X")
+
+	def _suggest(self, q, **params):
+		res = self.client.get(self.url, {"q": q, **params})
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+		return [(location["airport_code"], location["match"]) for location in res.json()["results"]]
+
+	def test_ranks_code_then_city_then_name_matches(self):
+		self.assertEqual(self._suggest("jfk"), [("JFK", "airport_code")])
+		self.assertEqual(
+			self._suggest("L"),
+			[("LCY", "airport_code"), ("LHR", "airport_code"), ("LGA", "airport_code")]
+		)
+		self.assertEqual(self._suggest("lon"), [("LCY", "city"), ("LHR", "city")])
+		self.assertEqual(self._suggest("new  y"), [("JFK", "city"), ("LGA", "city")])
+		self.assertEqual(self._suggest("heath"), [("LHR", "name")])
+		self.assertEqual(self._suggest("Intern"), [("JFK", "name"), ("NRT", "name")])
+		self.assertEqual(self._suggest("tokyo"), [("NRT", "city")])
+		self.assertEqual(self._suggest("L", limit=1), [("LCY", "airport_code")])
+		self.assertEqual(self._suggest("zzz"), [])
+
+	def test_follows_admin_location_changes(self):
+		self.assertEqual(self._suggest("osa"), [])
+		headers = {"HTTP_X_USER_ID": "1", "HTTP_X_USER_EMAIL": "admin@example.com", "HTTP_X_USER_ROLE": "ADMIN"}
+		res = self.client.post(
+			"/api/v1/admin/locations/",
+			{"name": "Kansai International", "airport_code": "KIX", "city": "Osaka", "country": "Japan"},
+			format="json", **headers
+		)
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual(self._suggest("osa"), [("KIX", "city")])
+
+	def test_requires_query(self):
+		res = self.client.get(self.url)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NearbySearchTests(APITestCase):
+	def setUp(self):
+		self.url = "/api/v1/flights/"
+		self.jfk = Location.objects.create(
+			name="JFK Airport", airport_code="JFK", city="New York", country="USA", latitude=40.6413, longitude=-73.7781)
+		departure = datetime.datetime(2030, 5, 1, 8, tzinfo=datetime.timezone.utc)
+		# Gatwick ~40 km, City ~35 km, Stansted ~66 km and Manchester ~243 km from Heathrow
+		for code, city, latitude, longitude in [
+			("LHR", "London", 51.47, -0.4543),
+			("LGW", "Crawley", 51.1537, -0.1821),
+			("LCY", "London", 51.5048, 0.0495),
+			("STN", "Stansted", 51.885, 0.235),
+			("MAN", "Manchester", 53.3537, -2.275),
+			("XXX", "Nowhere", None, None),
+		]:
+			location = Location.objects.create(
+				name=f"{code} Airport", airport_code=code, city=city, country="UK", latitude=latitude, longitude=longitude)
+			departure += datetime.timedelta(hours=1)
+			Flight.objects.create(
+				flight_number=f"NB{code}", departure_location=location, arrival_location=self.jfk,
+				departure_time=departure, arrival_time=departure + datetime.timedelta(hours=8),
+				total_seats=100, available_seats=100, price="500.00",
+			)
+
+	def _numbers(self, **params):
+		res = self.client.get(self.url, params)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.content)
+		return [f["flight_number"] for f in res.json()["results"]]
+
+	def test_origin_within_radius(self):
+		self.assertEqual(self._numbers(origin="LHR"), ["NBLHR"])
+		self.assertEqual(self._numbers(origin="LHR", origin_within_km="50"), ["NBLHR", "NBLGW", "NBLCY"])
+		self.assertEqual(self._numbers(origin="LHR", origin_within_km="70"), ["NBLHR", "NBLGW", "NBLCY", "NBSTN"])
+		self.assertEqual(
+			self._numbers(origin="London", origin_within_km="250", date="2030-05-01"),
+			["NBLHR", "NBLGW", "NBLCY", "NBSTN", "NBMAN"]
+		)
+		# Airports without coordinates match only themselves
+		self.assertEqual(self._numbers(origin="XXX", origin_within_km="1000"), ["NBXXX"])
+
+	def test_invalid_radius(self):
+		for params in ({"origin_within_km": "50"}, {"origin": "LHR", "origin_within_km": "-1"},
+					   {"origin": "LHR", "origin_within_km": "5000"}):
+			res = self.client.get(self.url, params)
+			self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+	def test_grid_wraps_around_the_antimeridian(self):
+		west = Location.objects.create(name="West", airport_code="WST", city="W", country="F", latitude=-16.0, longitude=179.9)
+		east = Location.objects.create(name="East", airport_code="EST", city="E", country="F", latitude=-16.0, longitude=-179.9)
+		self.assertEqual(nearby_index.within([str(west.pk)], 25), sorted([str(west.pk), str(east.pk)]))
+		self.assertEqual(nearby_index.within([str(west.pk)], 15), [str(west.pk)])
+
+	def test_coordinates_are_given_together(self):
+		headers = {"HTTP_X_USER_ID": "1", "HTTP_X_USER_EMAIL": "admin@example.com", "HTTP_X_USER_ROLE": "ADMIN"}
+		payload = {"name": "Oslo", "airport_code": "OSL", "city": "Oslo", "country": "Norway", "latitude": 60.19}
+		res = self.client.post("/api/v1/admin/locations/", payload, format="json", **headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+		res = self.client.post("/api/v1/admin/locations/", {**payload, "longitude": 11.1}, format="json", **headers)
+		self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+		self.assertEqual((res.data["latitude"], res.data["longitude"]), (60.19, 11.1))
+
+
+class FareCalendarTests(APITestCase):
+	def setUp(self):
+		self.origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.url = reverse("flight-calendar")
+		for day, hour, price, seats in [(1, 8, "250.00", 10), (1, 18, "199.50", 0), (1, 20, "300.00", 5), (3, 9, "120.00", 2)]:
+			self._flight(day, hour, price, seats)
+		self._flight(1, 8, "1.00", 10, status="cancelled")
+		self._flight(1, 8, "1.00", 10, origin=self.dest, dest=self.origin)
+
+	def _flight(self, day, hour, price, seats, status="scheduled", origin=None, dest=None):
+		departure = datetime.datetime(2030, 4, day, hour, tzinfo=datetime.timezone.utc)
+		return Flight.objects.create(
+			flight_number=f"CA{day}{hour}",
+			departure_location=origin or self.origin,
+			arrival_location=dest or self.dest,
+			departure_time=departure,
+			arrival_time=departure + datetime.timedelta(hours=5),
+			total_seats=10,
+			available_seats=seats,
+			price=price,
+			status=status,
+		)
+
+	def _calendar(self):
+		res = self.client.get(self.url, {"origin": "new york", "destination": "LAX", "month": "2030-04"})
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		return res.json()["days"]
+
+	def test_groups_per_day(self):
+		self.assertEqual(self._calendar(), [
+			{"date": "2030-04-01", "min_price": "250.00", "flights": 3, "available_seats": 15},
+			{"date": "2030-04-03", "min_price": "120.00", "flights": 1, "available_seats": 2},
+		])
+
+	def test_route_change_refreshes_cached_month(self):
+		self._calendar()
+		self._flight(30, 23, "80.00", 1)
+		self.assertEqual(self._calendar()[-1], {"date": "2030-04-30", "min_price": "80.00", "flights": 1, "available_seats": 1})
+
+	def test_invalid_month(self):
+		res = self.client.get(self.url, {"origin": "JFK", "destination": "LAX", "month": "2030-13"})
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(APITestCase):
+	def setUp(self):
+		self.origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+
+	def test_location_list_revalidates_and_is_precompressed(self):
+		url = "/api/v1/locations/"  # reverse() resolves to the admin route
+		res = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+		self.assertEqual(res["Content-Encoding"], "gzip")
+		self.assertEqual(json.loads(gzip.decompress(res.content)), json.loads(self.client.get(url).content))
+		etag = res["ETag"]
+		for refused in ("gzip;q=0, deflate", "identity, gzip ; Q=0.0", "*;q=0"):
+			self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING=refused).has_header("Content-Encoding"), refused)
+		res = self.client.get(url, HTTP_ACCEPT_ENCODING="br, *;q=0.5")
+		self.assertEqual(res["Content-Encoding"], "gzip")
+
+		with self.assertNumQueries(0):
+			res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(res["ETag"], etag)
+
+		Location.objects.create(name="ORD Airport", airport_code="ORD", city="Chicago", country="USA")
+		res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.json()), 3)
+		self.assertNotEqual(res["ETag"], etag)
+
+	def test_flight_list_etag_follows_route_changes(self):
+		url = "/api/v1/flights/"
+		params = {"origin": "JFK"}
+		etag = self.client.get(url, params)["ETag"]
+		with self.assertNumQueries(0):
+			res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+		Flight.objects.create(
+			flight_number="ET1",
+			departure_location=self.origin,
+			arrival_location=self.dest,
+			departure_time=timezone.now() + timezone.timedelta(days=1),
+			arrival_time=timezone.now() + timezone.timedelta(days=1, hours=5),
+			total_seats=10,
+			available_seats=10,
+			price="10.00",
+		)
+		res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(res.status_code, status.HTTP_200_OK)
+		self.assertEqual(len(res.json()["results"]), 1)
+
+
+class BulkFlightStatusTests(APITestCase):
+	def setUp(self):
+		self.jfk = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		self.lax = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		self.start = timezone.now() + timezone.timedelta(hours=2)
+		self.flights = [
+			self._flight(f"IR{i}", self.jfk, self.lax, self.start + timezone.timedelta(hours=i)) for i in range(3)
+		]
+		self.departed = self._flight("IR9", self.jfk, self.lax, self.start, status="departed")
+		self.other = self._flight("IR8", self.lax, self.jfk, self.start)
+		self.url = reverse("flight-bulk-status")
+		self.headers = {
+			"HTTP_X_USER_ID": "123",
+			"HTTP_X_USER_EMAIL": "admin@example.com",
+			"HTTP_X_USER_ROLE": "ADMIN",
+		}
+
+	def _flight(self, number, origin, dest, departure, status="scheduled"):
+		return Flight.objects.create(
+			flight_number=number,
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=5),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+			status=status,
+		)
+
+	def test_delay_by_airport_is_one_batch_event(self):
+		payload = {
+			"status": "delayed",
+			"departure_location": "jfk",
+			"departure_until": (self.start + timezone.timedelta(hours=1, minutes=30)).isoformat(),
+			"delay_minutes": 90,
+		}
+		with patch("flights.operations.publish_event") as publish:
+			with self.captureOnCommitCallbacks(execute=True):
+				res = self.client.post(self.url, payload, format="json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+		self.assertEqual(res.data["updated"], 2)
+
+		flight = Flight.objects.get(pk=self.flights[0].pk)
+		self.assertEqual(flight.status, "delayed")
+		self.assertEqual(flight.departure_time, self.flights[0].departure_time + timezone.timedelta(minutes=90))
+		self.assertEqual(Flight.objects.get(pk=self.flights[2].pk).status, "scheduled")
+		self.assertEqual(Flight.objects.get(pk=self.departed.pk).status, "departed")
+
+		# One batch per partition, on the partition of its flights' single-flight events
+		bodies = []
+		for call in publish.call_args_list:
+			event_type, body = call.args
+			self.assertEqual(event_type, "flight_delayed_batch")
+			self.assertEqual(
+				{key_partition(flight_event_key(f["flight_id"])) for f in body["flights"]},
+				{key_partition(call.kwargs["key"])}
+			)
+			bodies.extend(body["flights"])
+		self.assertEqual(len(bodies), 2)
+		self.assertEqual(bodies[0]["departure_location"], "JFK")
+		self.assertIn("new_departure_time", bodies[0])
+
+	@override_settings(FLIGHT_EVENT_KEY_BUCKETS=1)
+	def test_flights_sharing_a_key_share_a_batch(self):
+		with patch("flights.operations.publish_event") as publish:
+			change_status("cancelled", flight_ids=[f.pk for f in self.flights])
+		publish.assert_called_once()
+		self.assertEqual(len(publish.call_args.args[1]["flights"]), 3)
+
+	@override_settings(KAFKA_TOPIC_PARTITIONS=1)
+	def test_flights_on_one_partition_share_a_batch(self):
+		with patch("flights.operations.publish_event") as publish:
+			change_status("cancelled", flight_ids=[f.pk for f in self.flights])
+		publish.assert_called_once()
+		self.assertEqual(len(publish.call_args.args[1]["flights"]), 3)
+
+	def test_cancel_by_ids(self):
+		ids = [str(self.flights[1].pk), str(self.departed.pk), str(self.other.pk)]
+		with patch("flights.operations.publish_event"):
+			res = self.client.post(self.url, {"status": "cancelled", "flight_ids": ids}, format="json", **self.headers)
+		self.assertEqual(res.data["updated"], 2)
+		self.assertEqual(Flight.objects.filter(status="cancelled").count(), 2)
+
+	def test_delay_requires_minutes(self):
+		res = self.client.post(self.url, {"status": "delayed", "departure_location": "JFK"}, format="json", **self.headers)
+		self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FakeKafkaProducer:
+	def __init__(self, fail=False):
+		self.fail = fail
+		self.messages = []
+		self._callbacks = []
+
+	def produce(self, topic, value, key, headers, on_delivery):
+		self.messages.append((topic, decode_event(value), key))
+		self._callbacks.append(on_delivery)
+
+	def poll(self, timeout):
+		return 0
+
+	def flush(self, timeout):
+		for callback in self._callbacks:
+			callback("broker down" if self.fail else None, None)
+		self._callbacks = []
+		return 0
+
+
+class OutboxTests(APITestCase):
+	def setUp(self):
+		origin = Location.objects.create(name="JFK Airport", airport_code="JFK", city="New York", country="USA")
+		dest = Location.objects.create(name="LAX Airport", airport_code="LAX", city="Los Angeles", country="USA")
+		departure = timezone.now() + timezone.timedelta(days=1)
+		self.flight = Flight.objects.create(
+			flight_number="OB1",
+			departure_location=origin,
+			arrival_location=dest,
+			departure_time=departure,
+			arrival_time=departure + timezone.timedelta(hours=5),
+			total_seats=10,
+			available_seats=10,
+			price="100.00",
+		)
+
+	def test_invalid_update_records_no_event(self):
+		self.flight.status = "departed"
+		self.flight.save()
+		serializer = FlightUpdateSerializer(instance=self.flight, data={"status": "cancelled"}, partial=True)
+		self.assertFalse(serializer.is_valid())
+		self.assertFalse(OutboxEvent.objects.exists())
+
+	def test_update_records_event_and_relay_drains_in_order(self):
+		serializer = FlightUpdateSerializer(instance=self.flight, data={"status": "cancelled"}, partial=True)
+		self.assertTrue(serializer.is_valid(), serializer.errors)
+		serializer.save()
+		serializer = FlightUpdateSerializer(
+			instance=Flight.objects.create(
+				flight_number="OB2",
+				departure_location=self.flight.departure_location,
+				arrival_location=self.flight.arrival_location,
+				departure_time=self.flight.departure_time,
+				arrival_time=self.flight.arrival_time,
+				total_seats=10,
+				available_seats=10,
+			),
+			data={"status": "boarding"},
+			partial=True,
+		)
+		self.assertTrue(serializer.is_valid(), serializer.errors)
+		serializer.save()
+		self.assertEqual(OutboxEvent.objects.count(), 2)
+
+		with self.assertRaises(RelayError):
+			relay_batch(FakeKafkaProducer(fail=True))
+		self.assertEqual(OutboxEvent.objects.count(), 2)
+
+		producer = FakeKafkaProducer()
+		self.assertEqual(relay_batch(producer), 2)
+		self.assertEqual([message[1]["event_type"] for message in producer.messages], ["flight_cancelled", "flight_boarding"])
+		self.assertEqual(producer.messages[0][0], "flight_events")
+		self.assertEqual(producer.messages[0][2], flight_event_key(self.flight.pk).encode())
+		self.assertEqual(producer.messages[0][1]["data"]["flight_number"], "OB1")
+		self.assertFalse(OutboxEvent.objects.exists())
+
+
+	def test_relay_records_batch_size_and_delivery_latency(self):
+		from prometheus_client import REGISTRY
+
+		def sample(name):
+			return REGISTRY.get_sample_value(name) or 0.0
+
+		before = {name: sample(name) for name in (
+			"outbox_relay_batch_size_count", "outbox_relay_batch_size_sum", "outbox_delivery_seconds_count")}
+		publish_event("flight_boarding", {"flight_id": str(self.flight.pk)})
+		publish_event("flight_departed", {"flight_id": str(self.flight.pk)})
+		self.assertEqual(relay_batch(FakeKafkaProducer()), 2)
+		self.assertEqual(sample("outbox_relay_batch_size_count") - before["outbox_relay_batch_size_count"], 1)
+		self.assertEqual(sample("outbox_relay_batch_size_sum") - before["outbox_relay_batch_size_sum"], 2)
+		self.assertEqual(sample("outbox_delivery_seconds_count") - before["outbox_delivery_seconds_count"], 2)
+
+
+	def test_relay_once_fails_on_a_failed_batch(self):
+		publish_event("flight_boarding", {"flight_id": str(self.flight.pk)})
+		with patch("flights.management.commands.relay_outbox.create_producer", return_value=FakeKafkaProducer(fail=True)):
+			with self.assertRaises(CommandError):
+				call_command("relay_outbox", "--once", stdout=io.StringIO())
+		self.assertEqual(OutboxEvent.objects.count(), 1)
+
+
+class EventCodecTests(TestCase):
+	def _flight_body(self, **extra):
+		return {
+			"flight_id": str(uuid.uuid4()),
+			"flight_number": "EC1",
+			"departure_time": "2030-01-01T10:00:00+00:00",
+			"status": "cancelled",
+			"timestamp": "2030-01-01T09:00:00.123456",
+			**extra,
+		}
+
+	def test_flight_event_round_trips_in_binary(self):
+		key, body = uuid.uuid4(), self._flight_body()
+		value = encode_event("flight_cancelled", key, body)
+		self.assertEqual(value[:1], b"\x00")
+		json_value = json.dumps({"event_type": "flight_cancelled", "idempotency_key": str(key), "data": body})
+		self.assertLess(len(value), len(json_value) * 0.6)
+		self.assertEqual(
+			decode_event(value),
+			{"event_type": "flight_cancelled", "idempotency_key": str(key), "data": body},
+		)
+
+	def test_large_batches_are_compressed(self):
+		body = {"flights": [self._flight_body() for _ in range(50)], "timestamp": "2030-01-01T09:00:00"}
+		value = encode_event("flight_cancelled_batch", uuid.uuid4(), body)
+		self.assertEqual(value[1], 1)
+		self.assertEqual(decode_event(value)["data"], body)
+
+	def test_events_without_a_fitting_schema_stay_json(self):
+		key = uuid.uuid4()
+		for event_type, body in (
+			("flight_cancelled", self._flight_body(gate="B12")),
+			("flight_cancelled", self._flight_body(flight_id="not-a-uuid")),
+			("seat_map_changed", {"flight_id": str(uuid.uuid4())}),
+		):
+			value = encode_event(event_type, key, body)
+			self.assertEqual(json.loads(value), {"event_type": event_type, "idempotency_key": str(key), "data": body})
+			self.assertEqual(decode_event(value)["data"], body)
+
+	@override_settings(EVENT_ENCODING="json")
+	def test_json_encoding_setting(self):
+		self.assertEqual(encode_event("flight_cancelled", uuid.uuid4(), self._flight_body())[:1], b"{")
+
+	def test_registry_covers_every_flight_status(self):
+		for value, _ in Flight.STATUS_CHOICES:
+			self.assertEqual(registry.for_event_type(f"flight_{value}")["subject"], "flight_event")
+			self.assertEqual(registry.for_event_type(f"flight_{value}_batch")["subject"], "flight_event_batch")
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1", "replica_2"])
+class ReplicaRoutingTests(SimpleTestCase):
+	def setUp(self):
+		self.router = ReplicaRouter()
+		self.lags = {"replica_1": 0.5, "replica_2": 30.0}
+		patcher = patch.object(replica_lag, "lag", side_effect=lambda alias: self.lags[alias])
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def _read_db(self):
+		return self.router.db_for_read(Flight)
+
+	def test_only_replica_blocks_read_from_fresh_replicas(self):
+		self.assertEqual(self._read_db(), "default")
+		with replica_reads():
+			self.assertEqual(self._read_db(), "replica_1")
+			self.assertEqual(self.router.db_for_write(Flight), "default")
+		self.lags["replica_1"] = None  # unreachable
+		with replica_reads():
+			self.assertEqual(self._read_db(), "default")
+
+	def test_clients_that_wrote_are_pinned_to_the_primary(self):
+		def view(request):
+			with replica_reads():
+				seen.append(self._read_db())
+				if request.method == "POST":
+					self.router.db_for_write(Flight)
+			return HttpResponse()
+
+		seen = []
+		middleware = ReplicaPinMiddleware(view)
+		factory = RequestFactory()
+		response = middleware(factory.get("/"))
+		self.assertNotIn(settings.DATABASE_REPLICA_PIN_COOKIE, response.cookies)
+		response = middleware(factory.post("/"))
+		self.assertIn(settings.DATABASE_REPLICA_PIN_COOKIE, response.cookies)
+		request = factory.get("/")
+		request.COOKIES[settings.DATABASE_REPLICA_PIN_COOKIE] = "1"
+		middleware(request)
+		self.assertEqual(seen, ["replica_1", "replica_1", "default"])
+
+	@override_settings(DATABASE_REPLICA_MAX_LAG_SECONDS=0.05)
+	def test_delayed_invalidations_share_one_thread(self):
+		calls = []
+		done = threading.Event()
+		threads = threading.active_count()
+		for i in range(50):
+			after_replica_lag(lambda i=i: (calls.append(i), len(calls) == 50 and done.set()))
+		self.assertLessEqual(threading.active_count(), threads + 1)
+		self.assertTrue(done.wait(5))
+		self.assertEqual(calls, list(range(50)))
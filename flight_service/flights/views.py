@@ -4,18 +4,142 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import serializers 
 from django.db.models import F, Q
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+import csv
 import datetime
+import functools
 
-from .models import Location, Flight
-from .serializers import LocationSerializer, FlightReadSerializer, FlightCreateSerializer, FlightUpdateSerializer
+from .models import Location, Flight, FlightSchedule, SeatMap, normalize_airport_code
+from .serializers import LocationSerializer, FlightReadSerializer, FlightCreateSerializer, FlightUpdateSerializer, SeatSelectionSerializer, SeatMapLayoutSerializer, SeatHoldSerializer, HotInventorySerializer, FlightScheduleSerializer, ConnectionQuerySerializer, DeparturesQuerySerializer, LocationSuggestQuerySerializer, BulkFlightStatusSerializer
 from .permissions import IsAdminOrReadOnly, IsAdmin, IsServiceAuthenticated
+from .search import FlightSearchPlan, SearchError, cache_key
+from .search_rows import search_queryset
+from .columnar import flight_columns
+from .cache import search_cache
+from .fast_read import FLIGHT_VALUES, dumps, location_list_body, location_map, render_flights
+from .conditional import not_modified, version_etag
+from .inventory import InventoryError, InventoryUnavailable, FlightNotFound
+from .importer import FORMATS, PARSERS, import_flights
+from . import schedules
+from .holds import HoldNotActive, create_hold, confirm_hold, release_hold
+from . import hot_inventory
+from .hot_inventory import get_seat_store
+from .pagination import FlightKeysetPagination
+from .routes import route_graph
+from .departures import departures_board, render_departures
+from .suggest import location_suggestions
+from .fares import fare_calendar
+from .operations import change_status
+from .outbox import publish_event
+from .replicas import ReplicaReadMixin
+from .seatmaps import InvalidSeats, claim_seats, free_seats, release_unassigned, render_seat_map, reserve_unassigned, set_layout
 
-class PublicLocationViewSet(viewsets.ReadOnlyModelViewSet):
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip; `gzip;q=0` (or `*;q=0`) refuses it."""
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def search_flights(view, request):
+    """
+    Shared list implementation for the public and admin flight endpoints.
+
+    Rendered pages are cached as JSON bytes keyed by the normalized query and
+    invalidated through the location tags of the plan (see flights.cache).
+    """
+    try:
+        plan = FlightSearchPlan.from_params(request.query_params)
+    except SearchError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    key = f"{request.scheme}://{request.get_host()}{request.path}?{cache_key(request.query_params)}"
+    etag = version_etag(key, plan.cache_tags)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    body, stamp = search_cache.lookup(key, plan.cache_tags)
+    if body is None:
+        view.keyset_ordering = plan.ordering
+        if settings.FLIGHT_SEARCH_BACKEND == 'columnar' and flight_columns.covers(plan):
+            page = view.paginator.paginate_fetch(functools.partial(flight_columns.fetch, plan), Flight, request, view)
+        else:
+            # duration is not rendered but may be part of the keyset cursor
+            queryset = plan.apply(search_queryset()).values(*FLIGHT_VALUES, 'duration')
+            page = view.paginate_queryset(queryset)
+        body = dumps(view.get_paginated_response(render_flights(page)).data)
+        search_cache.store(stamp, body)
+    response = HttpResponse(body, content_type='application/json')
+    if etag is not None:
+        response['ETag'] = etag
+    return response
+
+class PublicLocationViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Served from a prebuilt (and pre-gzipped) body; revalidates with If-None-Match"""
+        etag = version_etag('locations', ['locations'])
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        body, compressed = location_list_body.get(etag)
+        if accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(compressed, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Locations whose airport code, city or airport name starts with `q`, ranked, from the in-memory index"""
+        params = LocationSuggestQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        results = location_suggestions.suggest(params.validated_data['q'], params.validated_data['limit'])
+        return HttpResponse(dumps({"results": results}), content_type='application/json')
+
+    @action(detail=False, methods=['get'], url_path=r'(?P<code>[^/.]+)/departures')
+    def departures(self, request, code=None):
+        """Next departures from an airport, with their statuses, served from the in-memory board"""
+        params = DeparturesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        code = normalize_airport_code(code)
+        locations = location_map.get()
+        location_id = next(
+            (pk for pk, location in locations.items() if normalize_airport_code(location['airport_code']) == code),
+            None,
+        )
+        if location_id is None:
+            return Response({"error": "Location not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        departures_board.sync()
+        departures = departures_board.next_departures(location_id, params.validated_data['limit'])
+        body = {"location": locations[location_id], "departures": render_departures(departures)}
+        return HttpResponse(dumps(body), content_type='application/json')
+
 class AdminLocationViewSet(viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
@@ -36,44 +160,103 @@ class AdminLocationViewSet(viewsets.ModelViewSet):
                 {"error": "Cannot delete location that is used by existing flights"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        if FlightSchedule.objects.filter(
+            Q(departure_location=location) | Q(arrival_location=location)
+        ).exists():
+            return Response(
+                {"error": "Cannot delete location that is used by flight schedules"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return super().destroy(request, *args, **kwargs)
 
-class PublicFlightViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Flight.objects.all().order_by('departure_time')
+class PublicFlightViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Flight.objects.select_related('departure_location', 'arrival_location').order_by('departure_time')
     permission_classes = [AllowAny]
-    pagination_class = None
+    pagination_class = FlightKeysetPagination
+    replica_actions = ('list', 'retrieve', 'seatmap')
 
     def get_serializer_class(self):
         return FlightReadSerializer
 
     def list(self, request, *args, **kwargs):
+        return search_flights(self, request)
 
-        queryset = Flight.objects.all().order_by('departure_time')
-        
-        origin = request.query_params.get('origin')
-        destination = request.query_params.get('destination')
-        date = request.query_params.get('date')
+    @action(detail=True, methods=['get'])
+    def seatmap(self, request, pk=None):
+        """Cabin layout with taken seats, one string per row ('.' free, 'X' taken, '-' aisle)"""
+        try:
+            seat_map = SeatMap.objects.filter(pk=pk).first()
+        except DjangoValidationError:
+            seat_map = None
+        if seat_map is None:
+            return Response({"error": "Seat map not found"}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(dumps(render_seat_map(seat_map)), content_type='application/json')
 
-        if origin:
-            queryset = queryset.filter(departure_location__airport_code__iexact=origin) | \
-                       queryset.filter(departure_location__city__icontains=origin)
-        
-        if destination:
-            queryset = queryset.filter(arrival_location__airport_code__iexact=destination) | \
-                       queryset.filter(arrival_location__city__icontains=destination)
-            
-        if date:
-            queryset = queryset.filter(departure_time__date=date)
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Lowest price and seat summary per day of a month for a route"""
+        missing = [name for name in ('origin', 'destination', 'month') if not request.query_params.get(name)]
+        if missing:
+            return Response(
+                {"error": f"Missing required parameters: {', '.join(missing)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            body = fare_calendar(
+                request.query_params['origin'], request.query_params['destination'], request.query_params['month']
+            )
+        except SearchError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return HttpResponse(body, content_type='application/json')
 
-        serializer = FlightReadSerializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=['get'])
+    def connections(self, request):
+        """Itineraries with up to two stops, served from the in-memory route graph"""
+        params = ConnectionQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        try:
+            plan = FlightSearchPlan.from_params(query)
+        except SearchError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        itineraries = []
+        if not plan.is_empty:
+            route_graph.sync()
+            min_connection = query.get('min_connection_minutes')
+            itineraries = route_graph.connections(
+                plan.origin_ids, plan.destination_ids, plan.departure_from, plan.departure_until,
+                max_stops=query['max_stops'],
+                seats=query['seats'],
+                min_connection=datetime.timedelta(minutes=min_connection) if min_connection else None,
+                limit=query['limit'],
+            )
+
+        flight_ids = {edge.flight_id for itinerary in itineraries for edge in itinerary}
+        flights = {
+            flight['flight_id']: flight
+            for flight in render_flights(Flight.objects.filter(pk__in=flight_ids).values(*FLIGHT_VALUES))
+        } if flight_ids else {}
+        results = []
+        for itinerary in itineraries:
+            if any(str(edge.flight_id) not in flights for edge in itinerary):
+                continue  # deleted since the graph last synced
+            results.append({
+                "departure_time": flights[str(itinerary[0].flight_id)]["departure_time"],
+                "arrival_time": flights[str(itinerary[-1].flight_id)]["arrival_time"],
+                "duration_minutes": int((itinerary[-1].arrival_time - itinerary[0].departure_time).total_seconds() // 60),
+                "stops": len(itinerary) - 1,
+                "flights": [flights[str(edge.flight_id)] for edge in itinerary],
+            })
+        return HttpResponse(dumps({"results": results}), content_type='application/json')
 
 class AdminFlightViewSet(viewsets.ModelViewSet):
-    queryset = Flight.objects.all().order_by('departure_time')
+    queryset = Flight.objects.select_related('departure_location', 'arrival_location').order_by('departure_time')
     permission_classes = [IsAdmin] 
     
-    pagination_class = None 
+    pagination_class = FlightKeysetPagination
     
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
@@ -84,6 +267,7 @@ class AdminFlightViewSet(viewsets.ModelViewSet):
             return FlightUpdateSerializer
         return FlightReadSerializer
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         old_status = instance.status
@@ -95,6 +279,7 @@ class AdminFlightViewSet(viewsets.ModelViewSet):
             self._publish_flight_status_change(instance, new_status)
         return response
 
+    @transaction.atomic
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
         old_status = instance.status
@@ -106,7 +291,6 @@ class AdminFlightViewSet(viewsets.ModelViewSet):
         return response
 
     def _publish_flight_status_change(self, flight, new_status):
-        from .producer import publish_event
         event_type = f"flight_{new_status.lower()}"
         event_data = {
             "flight_id": str(flight.flight_id),
@@ -135,70 +319,242 @@ class AdminFlightViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
     def list(self, request, *args, **kwargs):
+        return search_flights(self, request)
 
-        queryset = Flight.objects.all().order_by('departure_time')
-        
-        origin = request.query_params.get('origin')
-        destination = request.query_params.get('destination')
-        date = request.query_params.get('date')
-
-        if origin:
-            queryset = queryset.filter(departure_location__airport_code__iexact=origin) | \
-                       queryset.filter(departure_location__city__icontains=origin)
-        
-        if destination:
-            queryset = queryset.filter(arrival_location__airport_code__iexact=destination) | \
-                       queryset.filter(arrival_location__city__icontains=destination)
-            
-        if date:
-            queryset = queryset.filter(departure_time__date=date)
-
-        serializer = FlightReadSerializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_flights(self, request):
+        """
+        Bulk-create flights from a CSV (text/csv) or NDJSON (application/x-ndjson)
+        request body. The body is streamed, never loaded whole.
+        """
+        content_type = request.content_type.split(';')[0].strip().lower()
+        parser = PARSERS.get(FORMATS.get(content_type))
+        if parser is None:
+            return Response(
+                {"error": "Send text/csv or application/x-ndjson"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        try:
+            result = import_flights(parser(request._request))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Could not read import: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not result["created"] and not result["failed"]:
+            return Response({"error": "No rows to import"}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=response_status)
 
     @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated]) 
     def reserve_seat(self, request, pk=None):
+        return self._change_seats(reserve_unassigned, pk, 1, "Seat reserved")
 
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated])
+    def release_seat(self, request, pk=None):
+        return self._change_seats(release_unassigned, pk, 1, "Seat released")
+
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated])
+    def reserve_seats(self, request, pk=None):
+        """Reserve several seats at once, optionally naming them; all or nothing."""
+        serializer = SeatSelectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seat_numbers = serializer.validated_data.get('seat_numbers')
+        if seat_numbers:
+            return self._change_seats(claim_seats, pk, seat_numbers, "Seats reserved")
+        return self._change_seats(reserve_unassigned, pk, serializer.validated_data['seats'], "Seats reserved")
+
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated])
+    def release_seats(self, request, pk=None):
+        """Release several seats at once, optionally naming them; never exceeds total_seats."""
+        serializer = SeatSelectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seat_numbers = serializer.validated_data.get('seat_numbers')
+        if seat_numbers:
+            return self._change_seats(free_seats, pk, seat_numbers, "Seats released")
+        return self._change_seats(release_unassigned, pk, serializer.validated_data['seats'], "Seats released")
+
+    @action(detail=True, methods=['put'], url_path='seatmap')
+    def set_seatmap(self, request, pk=None):
+        """Set the cabin layout; its seat count must equal total_seats and no seat may be taken"""
+        serializer = SeatMapLayoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         try:
-            flight = self.get_object()
-            
-            if flight.available_seats < 1:
-                return Response(
-                    {"error": "Flight is full"}, 
-                    status=status.HTTP_409_CONFLICT
-                )
+            seat_map = set_layout(pk, **serializer.validated_data)
+        except (FlightNotFound, DjangoValidationError):
+            return Response({"error": "Flight not found"}, status=status.HTTP_404_NOT_FOUND)
+        except InvalidSeats as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InventoryError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return HttpResponse(dumps(render_seat_map(seat_map)), content_type='application/json')
 
-            flight.available_seats = F('available_seats') - 1
-            flight.save()
-            flight.refresh_from_db()
-            
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated])
+    def hold_seats(self, request, pk=None):
+        """Hold seats for checkout; they are released automatically unless confirmed in time."""
+        serializer = SeatHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold, remaining = create_hold(pk, serializer.validated_data['seats'],
+                                          serializer.validated_data.get('ttl_seconds'))
+        except (FlightNotFound, DjangoValidationError):
+            return Response({"error": "Flight not found"}, status=status.HTTP_404_NOT_FOUND)
+        except InventoryUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except InvalidSeats as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InventoryError as e:
             return Response(
-                {"message": "Seat reserved", "remaining_seats": flight.available_seats}, 
-                status=status.HTTP_200_OK
+                {"error": str(e), "remaining_seats": getattr(e, 'available_seats', None)},
+                status=status.HTTP_409_CONFLICT
             )
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "hold_id": str(hold.hold_id),
+                "seats": hold.seats,
+                "expires_at": hold.expires_at.isoformat(),
+                "remaining_seats": remaining,
+            },
+            status=status.HTTP_201_CREATED
+        )
 
-    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated])
-    def release_seat(self, request, pk=None):
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated],
+            url_path=r'holds/(?P<hold_id>[^/.]+)/confirm')
+    def confirm_hold(self, request, pk=None, hold_id=None):
+        try:
+            confirm_hold(pk, hold_id)
+        except (HoldNotActive, DjangoValidationError):
+            return Response({"error": "Hold is not active"}, status=status.HTTP_409_CONFLICT)
+        return Response({"message": "Hold confirmed", "hold_id": hold_id}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'], permission_classes=[IsServiceAuthenticated],
+            url_path=r'holds/(?P<hold_id>[^/.]+)/release')
+    def release_hold(self, request, pk=None, hold_id=None):
         try:
-            flight = self.get_object()
-            
-            flight.available_seats = F('available_seats') + 1
-            flight.save()
-            flight.refresh_from_db()
-            
+            remaining = release_hold(pk, hold_id)
+        except (HoldNotActive, DjangoValidationError):
+            return Response({"error": "Hold is not active"}, status=status.HTTP_409_CONFLICT)
+        except InventoryUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(
+            {"message": "Hold released", "hold_id": hold_id, "remaining_seats": remaining},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """Delay, cancel or board many flights at once, e.g. when an airport closes"""
+        serializer = BulkFlightStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        delay = datetime.timedelta(minutes=data['delay_minutes']) if 'delay_minutes' in data else None
+        changed = change_status(
+            data['status'],
+            flight_ids=data.get('flight_ids'),
+            departure_location_id=data['departure_location'].pk if 'departure_location' in data else None,
+            departure_from=data.get('departure_from'),
+            departure_until=data.get('departure_until'),
+            delay=delay,
+        )
+        return Response(
+            {"updated": len(changed), "flight_ids": [str(flight_id) for flight_id in changed]},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['post'])
+    def hot_inventory(self, request, pk=None):
+        """Move a flight's seat count into (or out of) the hot inventory store."""
+        serializer = HotInventorySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        flight = self.get_object()
+        if serializer.validated_data['enabled']:
+            if get_seat_store() is None:
+                return Response(
+                    {"error": "Hot inventory is not configured"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            hot_inventory.enable(flight.flight_id)
+        else:
+            hot_inventory.disable(flight.flight_id)
+        flight.refresh_from_db()
+        return Response(
+            {"hot_inventory": flight.hot_inventory, "available_seats": flight.available_seats},
+            status=status.HTTP_200_OK
+        )
+
+    def _change_seats(self, operation, pk, seats, message):
+        """`seats` is a count, or a list of seat numbers for the seat map operations"""
+        try:
+            remaining = operation(pk, seats)
+            if isinstance(remaining, tuple):
+                # A count of seats assigned on a seat map (see seatmaps.reserve_unassigned)
+                remaining, seats = remaining
+        except (FlightNotFound, DjangoValidationError):
+            return Response({"error": "Flight not found"}, status=status.HTTP_404_NOT_FOUND)
+        except InventoryUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except InvalidSeats as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InventoryError as e:
             return Response(
-                {"message": "Seat released", "remaining_seats": flight.available_seats}, 
-                status=status.HTTP_200_OK
+                {
+                    "error": str(e),
+                    "remaining_seats": getattr(e, 'available_seats', None),
+                    **({"seat_numbers": e.seat_numbers} if hasattr(e, 'seat_numbers') else {}),
+                },
+                status=status.HTTP_409_CONFLICT
             )
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        body = {"message": message, "seats": seats, "remaining_seats": remaining}
+        if isinstance(seats, list):
+            body.update(seats=len(seats), seat_numbers=seats)
+        return Response(body, status=status.HTTP_200_OK)
 
 
 from rest_framework.decorators import api_view
 
 @api_view(['GET'])
 def health_check(request):
-    return Response({'status': 'healthy'}, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response({'status': 'healthy'}, status=status.HTTP_200_OK)
+
+class AdminFlightScheduleViewSet(viewsets.ModelViewSet):
+    """
+    Recurring flight templates. Saving a schedule regenerates its flights over
+    the rolling horizon; only dates whose flight actually changes are written.
+    """
+    queryset = FlightSchedule.objects.select_related('departure_location', 'arrival_location').order_by('flight_number')
+    serializer_class = FlightScheduleSerializer
+    permission_classes = [IsAdmin]
+    pagination_class = None
+
+    def perform_create(self, serializer):
+        self.generated = schedules.generate(serializer.save())
+
+    def perform_update(self, serializer):
+        self.generated = schedules.generate(serializer.save())
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.data['generated'] = self.generated
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response.data['generated'] = self.generated
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate first so unbooked future flights are removed and booked ones cancelled"""
+        schedule = self.get_object()
+        schedule.is_active = False
+        schedule.save(update_fields=['is_active', 'updated_at'])
+        schedules.generate(schedule)
+        return super().destroy(request, *args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def generate(self, request, pk=None):
+        """Extend or re-sync the schedule's flights; optional `horizon_days` in the body"""
+        horizon_days = request.data.get('horizon_days')
+        try:
+            horizon_days = int(horizon_days) if horizon_days is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "horizon_days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if horizon_days is not None and not 1 <= horizon_days <= 730:
+            return Response({"error": "horizon_days must be between 1 and 730"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(schedules.generate(self.get_object(), horizon_days=horizon_days), status=status.HTTP_200_OK)
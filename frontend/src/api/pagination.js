@@ -0,0 +1,4 @@
+// Paginated list responses carry a `next` link; we only keep its cursor so the
+// follow-up request goes through the same base URL (and Ingress) as the first.
+export const nextCursor = (data) =>
+  data?.next ? new URL(data.next, window.location.origin).searchParams.get('cursor') : null;
@@ -1,5 +1,6 @@
 import React, { useEffect, useState, useContext } from "react";
 import api from "../api/axios";
+import { nextCursor } from "../api/pagination";
 import AuthContext from "../context/AuthContext";
 import toast from "react-hot-toast";
 import { Plane, Calendar, User, Search, RefreshCw, X, Check, AlertCircle, Clock, MapPin, Ticket } from "lucide-react";
@@ -20,8 +21,15 @@ const AdminBookings = () => {
   const fetchFlights = async () => {
     setIsLoadingFlights(true);
     try {
-      const res = await api.get('/flights/');
-      setFlights(res.data);
+      // Follow the cursor until the last page so every flight is listed
+      let all = [];
+      let cursor = null;
+      do {
+        const res = await api.get('/flights/', { params: cursor ? { cursor } : {} });
+        all = all.concat(res.data.results);
+        cursor = nextCursor(res.data);
+      } while (cursor);
+      setFlights(all);
     } catch (err) {
       console.error("Error fetching flights:", err);
       toast.error("Failed to load flights");
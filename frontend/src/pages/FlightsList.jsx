@@ -1,28 +1,33 @@
 import React, { useState, useEffect } from "react";
 import { Link } from "react-router-dom";
 import api from "../api/axios";
+import { nextCursor } from "../api/pagination";
 import toast from "react-hot-toast";
 
 const FlightsList = () => {
   const [flights, setFlights] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filters, setFilters] = useState({ from: "", to: "", date: "" });
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchFlights = async () => {
-    setLoading(true);
+  // Without a cursor this reloads the list; with one it appends the next page
+  const fetchFlights = async (after = null) => {
+    after ? setLoadingMore(true) : setLoading(true);
     try {
       const res = await api.get("/flights/", {
-        params: { ...filters, _t: Math.random() },
+        params: { ...filters, ...(after && { cursor: after }), _t: Math.random() },
         headers: {
           'Cache-Control': 'no-cache',
           'Pragma': 'no-cache'
         }
       });
-      setFlights(res.data);
+      setFlights(prev => after ? [...prev, ...res.data.results] : res.data.results);
+      setCursor(nextCursor(res.data));
     } catch (err) {
       console.error("Error fetching flights:", err);
     } finally {
-      setLoading(false);
+      after ? setLoadingMore(false) : setLoading(false);
     }
   };
 
@@ -79,7 +84,7 @@ const FlightsList = () => {
               onChange={e => setFilters({...filters, date: e.target.value})}
             />
             <button
-              onClick={fetchFlights}
+              onClick={() => fetchFlights()}
               className="bg-blue-600 hover:bg-blue-700 text-white font-medium py-2 px-4 rounded-md transition-colors"
             >
               Apply Filters
@@ -133,7 +138,7 @@ const FlightsList = () => {
               onChange={e => setFilters({...filters, date: e.target.value})}
             />
             <button
-              onClick={fetchFlights}
+              onClick={() => fetchFlights()}
               className="bg-blue-600 hover:bg-blue-700 text-white font-medium py-2 px-4 rounded-md transition-colors"
             >
               Apply Filters
@@ -204,6 +209,18 @@ const FlightsList = () => {
             ))
           )}
         </div>
+
+        {cursor && (
+          <div className="text-center mt-6">
+            <button
+              onClick={() => fetchFlights(cursor)}
+              disabled={loadingMore}
+              className="bg-white hover:bg-gray-50 text-blue-600 border border-blue-600 font-medium py-2 px-6 rounded-md transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load More Flights"}
+            </button>
+          </div>
+        )}
       </div>
     );
   }
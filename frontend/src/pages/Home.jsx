@@ -1,6 +1,7 @@
 import React, { useEffect, useState, useContext } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import api from "../api/axios";
+import { nextCursor } from "../api/pagination";
 import AuthContext from "../context/AuthContext";
 
 const Home = () => {
@@ -8,16 +9,19 @@ const Home = () => {
   const navigate = useNavigate();
   const [flights, setFlights] = useState([]);
   const [filters, setFilters] = useState({ from: "", to: "", date: "" });
+  const [cursor, setCursor] = useState(null);
 
-  const fetchFlights = async () => {
+  // Without a cursor this starts a new search; with one it appends the next page
+  const fetchFlights = async (after = null) => {
     const res = await api.get("/flights/", { 
-      params: { ...filters, _t: Math.random() },
+      params: { ...filters, ...(after && { cursor: after }), _t: Math.random() },
       headers: {
         'Cache-Control': 'no-cache',
         'Pragma': 'no-cache'
       }
     });
-    setFlights(res.data);
+    setFlights(prev => after ? [...prev, ...res.data.results] : res.data.results);
+    setCursor(nextCursor(res.data));
   };
 
   useEffect(() => {
@@ -54,7 +58,7 @@ const Home = () => {
             onChange={e => setFilters({...filters, date: e.target.value})}
           />
           <button
-            onClick={fetchFlights}
+            onClick={() => fetchFlights()}
             className="bg-blue-600 hover:bg-blue-700 text-white font-medium py-2 px-4 rounded-md transition-colors"
           >
             Search Flights
@@ -101,6 +105,17 @@ const Home = () => {
           </div>
         ))}
       </div>
+
+      {cursor && (
+        <div className="text-center mt-8">
+          <button
+            onClick={() => fetchFlights(cursor)}
+            className="bg-white hover:bg-gray-50 text-blue-600 border border-blue-600 font-medium py-2 px-6 rounded-md transition-colors"
+          >
+            Load More Flights
+          </button>
+        </div>
+      )}
     </div>
   );
 };
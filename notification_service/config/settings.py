@@ -123,6 +123,11 @@ KAFKA_BROKERS = os.environ.get(
     'KAFKA_BROKERS',
     'kafka.airlines.svc.cluster.local:9092'
 ).split(',')
+# 'binary' sends events that have a schema in event_schemas/ in the compact
+# binary encoding; 'json' keeps the JSON envelope. Consumers read both.
+EVENT_ENCODING = os.environ.get('EVENT_ENCODING', 'binary')
+# Threads processing consumed events in parallel, one key per thread at a time
+KAFKA_CONSUMER_WORKERS = int(os.environ.get('KAFKA_CONSUMER_WORKERS', 8))
 
 # CORS settings for frontend access
 CORS_ALLOWED_ORIGINS = [
@@ -0,0 +1,147 @@
+"""
+Parallel, per-key ordered processing of Kafka messages.
+
+Each message goes to one of `workers` threads, chosen by a hash of its key.
+Messages that share a key (the same booking or flight) are therefore handled
+one at a time and in offset order, while different keys run in parallel.
+Offsets are committed per partition only up to the first message that is
+still being processed. A restart may redeliver finished messages, which are
+deduplicated by idempotency key, but never skips an unfinished one.
+"""
+import collections
+import queue
+import threading
+import time
+import zlib
+
+from confluent_kafka import TopicPartition
+
+COMMIT_INTERVAL_SECONDS = 1.0
+# Messages waiting per worker before polling pauses
+WORKER_QUEUE_SIZE = 100
+
+
+class OffsetTracker:
+    """Per-partition offsets in flight, and how far each partition is contiguously done."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (topic, partition) -> OrderedDict of offset -> done, in offset order
+        self._partitions = {}
+
+    def add(self, topic, partition, offset):
+        with self._lock:
+            self._partitions.setdefault((topic, partition), collections.OrderedDict())[offset] = False
+
+    def done(self, topic, partition, offset):
+        with self._lock:
+            offsets = self._partitions.get((topic, partition))
+            if offsets is not None and offset in offsets:
+                offsets[offset] = True
+
+    def committable(self):
+        """
+        (topic, partition, next_offset) for every partition that has advanced
+        since the last call; next_offset is one past the last contiguous done offset.
+        """
+        advanced = []
+        with self._lock:
+            for (topic, partition), offsets in self._partitions.items():
+                last = None
+                while offsets and next(iter(offsets.values())):
+                    last, _ = offsets.popitem(last=False)
+                if last is not None:
+                    advanced.append((topic, partition, last + 1))
+        return advanced
+
+    def forget(self, partitions):
+        with self._lock:
+            for topic, partition in partitions:
+                self._partitions.pop((topic, partition), None)
+
+    def pending(self):
+        with self._lock:
+            return sum(len(offsets) for offsets in self._partitions.values())
+
+
+class KeyedWorkerPool:
+    def __init__(self, handler, workers):
+        self.handler = handler
+        self.tracker = OffsetTracker()
+        self._queues = [queue.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(q,), name=f'kafka-worker-{i}', daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, message):
+        """Queue a message behind earlier ones with the same key; blocks while that worker is full."""
+        self.tracker.add(message.topic(), message.partition(), message.offset())
+        index = zlib.crc32(message.key() or b'') % len(self._queues)
+        self._queues[index].put(message)
+
+    def drain(self):
+        """Wait until every submitted message has been processed."""
+        for q in self._queues:
+            q.join()
+
+    def stop(self):
+        self.drain()
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self, q):
+        while True:
+            message = q.get()
+            if message is None:
+                q.task_done()
+                return
+            try:
+                self.handler(message)
+            except Exception as e:
+                # As before, a message that cannot be processed is dropped rather than retried forever
+                print(f" [!] Error processing message at {message.topic()}[{message.partition()}]@{message.offset()}: {e}")
+            finally:
+                self.tracker.done(message.topic(), message.partition(), message.offset())
+                q.task_done()
+
+
+def commit_processed(consumer, tracker, asynchronous=True):
+    offsets = [TopicPartition(topic, partition, offset) for topic, partition, offset in tracker.committable()]
+    if offsets:
+        consumer.commit(offsets=offsets, asynchronous=asynchronous)
+
+
+def consume(consumer, topics, handler, workers):
+    """
+    Poll `topics` forever, handing messages to a KeyedWorkerPool and
+    committing finished offsets every COMMIT_INTERVAL_SECONDS.
+    """
+    pool = KeyedWorkerPool(handler, workers)
+
+    def on_revoke(consumer, partitions):
+        # Finish and commit everything from the partitions we are losing
+        pool.drain()
+        commit_processed(consumer, pool.tracker, asynchronous=False)
+        pool.tracker.forget([(p.topic, p.partition) for p in partitions])
+
+    consumer.subscribe(topics, on_revoke=on_revoke)
+    last_commit = time.monotonic()
+    try:
+        while True:
+            message = consumer.poll(0.2)
+            if message is not None:
+                if message.error():
+                    print(f" [!] Kafka error: {message.error()}")
+                else:
+                    pool.submit(message)
+            if time.monotonic() - last_commit >= COMMIT_INTERVAL_SECONDS:
+                commit_processed(consumer, pool.tracker)
+                last_commit = time.monotonic()
+    finally:
+        pool.stop()
+        commit_processed(consumer, pool.tracker, asynchronous=False)
@@ -1,10 +1,12 @@
 import uuid
 from types import SimpleNamespace
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 from unittest.mock import Mock, patch
 
+from notifications.codec import DecodeError, FLAG_ZLIB, MAGIC, decode_event, encode_event
+from notifications.consumer import handle_message, start_consumer
 from notifications.models import Notification
 
 
@@ -128,3 +130,122 @@ class NotificationAPITests(APITestCase):
 		self.assertEqual(res.status_code, status.HTTP_200_OK)
 		data = getattr(res, "data", None) or res.json()
 		self.assertEqual(data.get("status"), "healthy")
+
+
+class FakeMessage:
+	def __init__(self, value, key=b"flight-1", partition=0):
+		self._value, self._key, self._partition = value, key, partition
+
+	def value(self):
+		return self._value
+
+	def headers(self):
+		return []
+
+	def key(self):
+		return self._key
+
+	def partition(self):
+		return self._partition
+
+
+@override_settings(EVENT_ENCODING="binary")
+@patch("notifications.consumer.async_to_sync", new=lambda send: send)
+@patch("notifications.consumer.get_channel_layer")
+@patch("notifications.consumer.Notification")
+class HandleMessageTests(TestCase):
+	def _flight_payload(self, user_bookings):
+		return {
+			"flight_id": str(uuid.uuid4()),
+			"flight_number": "AB123",
+			"status": "cancelled",
+			"timestamp": "2024-01-01T00:00:00Z",
+			"userBookings": user_bookings,
+		}
+
+	def test_binary_event_notifies_every_booking(self, mock_notification, mock_layer):
+		mock_notification.objects.return_value.first.return_value = None
+		user_bookings = [
+			{"user_id": str(uuid.uuid4()), "booking_id": str(uuid.uuid4())} for _ in range(30)
+		]
+		key = uuid.uuid4()
+		value = encode_event("flight_cancelled", key, self._flight_payload(user_bookings))
+		# Enough bookings to take the compressed, column-by-column path
+		self.assertEqual(value[:1], MAGIC)
+		self.assertTrue(value[1] & FLAG_ZLIB)
+
+		handle_message(FakeMessage(value))
+
+		saved = [call.kwargs for call in mock_notification.call_args_list]
+		self.assertEqual(
+			[(n["user_id"], n["booking_id"]) for n in saved],
+			[(b["user_id"], b["booking_id"]) for b in user_bookings],
+		)
+		self.assertEqual({n["event_idempotency_key"] for n in saved}, {str(key)})
+		self.assertEqual(saved[0]["message"], "Flight AB123 has been cancelled.")
+		self.assertEqual(mock_layer.return_value.group_send.call_count, 30)
+
+	def test_binary_flight_batch_is_decoded(self, mock_notification, mock_layer):
+		mock_notification.objects.return_value.first.return_value = None
+		flights = [
+			{"flight_id": str(uuid.uuid4()), "flight_number": f"AB{n}", "status": "cancelled", "timestamp": "2024-01-01T00:00:00Z"}
+			for n in range(20)
+		]
+		value = encode_event("flight_cancelled_batch", uuid.uuid4(), {"flights": flights, "timestamp": "2024-01-01T00:00:00Z"})
+		self.assertEqual(value[:1], MAGIC)
+		self.assertEqual(decode_event(value)["data"]["flights"], flights)
+
+		# Raw batches carry no bookings; the booking service expands them per flight
+		handle_message(FakeMessage(value))
+		mock_notification.assert_not_called()
+		mock_layer.return_value.group_send.assert_not_called()
+
+	def test_duplicate_event_is_skipped(self, mock_notification, mock_layer):
+		key = uuid.uuid4()
+		mock_notification.objects.return_value.first.return_value = Mock()
+		user_bookings = [{"user_id": str(uuid.uuid4()), "booking_id": str(uuid.uuid4())}]
+		value = encode_event("flight_delayed", key, self._flight_payload(user_bookings))
+
+		handle_message(FakeMessage(value))
+
+		mock_notification.objects.assert_called_once_with(event_idempotency_key=str(key))
+		mock_notification.assert_not_called()
+		mock_layer.return_value.group_send.assert_not_called()
+
+	def test_duplicate_booking_event_is_skipped(self, mock_notification, mock_layer):
+		key = uuid.uuid4()
+		mock_notification.objects.return_value.first.return_value = Mock()
+		value = encode_event("booking_cancelled", key, {
+			"booking_id": str(uuid.uuid4()),
+			"user_id": str(uuid.uuid4()),
+			"flight_id": str(uuid.uuid4()),
+			"timestamp": "2024-01-01T00:00:00Z",
+		})
+
+		handle_message(FakeMessage(value))
+
+		mock_notification.objects.assert_called_once_with(idempotency_key=str(key))
+		mock_notification.assert_not_called()
+
+	def test_malformed_message_raises_decode_error(self, mock_notification, mock_layer):
+		value = encode_event("flight_delayed", uuid.uuid4(), self._flight_payload([]))
+		with self.assertRaises(DecodeError):
+			handle_message(FakeMessage(value[:len(value) // 2]))
+		with self.assertRaises(DecodeError):
+			handle_message(FakeMessage(MAGIC + bytes([FLAG_ZLIB, 1]) + b"not zlib"))
+		mock_notification.assert_not_called()
+
+
+class StartConsumerTests(TestCase):
+	@override_settings(KAFKA_CONSUMER_WORKERS=3)
+	@patch("notifications.consumer.consume")
+	@patch("notifications.consumer.Consumer")
+	def test_offsets_are_committed_by_the_keyed_pool(self, mock_consumer, mock_consume):
+		start_consumer()
+
+		config = mock_consumer.call_args.args[0]
+		self.assertFalse(config["enable.auto.commit"])
+		mock_consume.assert_called_once_with(
+			mock_consumer.return_value, ["booking_events"], handle_message, 3
+		)
+		mock_consumer.return_value.close.assert_called_once()